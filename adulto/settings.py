@@ -151,12 +151,24 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
+# Video uploads are streamed to disk by core.upload_handlers; anything else
+# bigger than this is spooled to a temporary file rather than kept in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB of non-file form data
 FILE_UPLOAD_PERMISSIONS = 0o644
+VIDEO_UPLOAD_MAX_SIZE = int(os.getenv('VIDEO_UPLOAD_MAX_SIZE', str(300 * 1024 * 1024)))  # 300MB
+UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('UPLOAD_MAX_CHUNK_SIZE', str(8 * 1024 * 1024)))  # 8MB
 
 # Large file upload settings
 # FILE_UPLOAD_TEMP_DIR = '/tmp/django_uploads'
+# Chunked uploads are assembled here and renamed into MEDIA_ROOT, so keep it
+# on the same filesystem as MEDIA_ROOT (otherwise the rename becomes a copy)
+UPLOAD_TEMP_DIR = os.getenv('UPLOAD_TEMP_DIR', os.path.join(BASE_DIR, 'upload_tmp'))
+# Rendered media library thumbnails (see core/library_thumbnails.py)
+THUMBNAIL_CACHE_DIR = os.getenv('THUMBNAIL_CACHE_DIR', os.path.join(BASE_DIR, 'thumbnail_cache'))
+# The media library index is resynced with media/videos in the background at
+# most this often (seconds); `manage.py scan_media_library` runs it on demand
+MEDIA_LIBRARY_SCAN_INTERVAL = 300
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 DATA_UPLOAD_MAX_NUMBER_FILES = 100
 
@@ -200,13 +212,22 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
 # Cache settings for better performance
+# Page cache invalidation and shared counters need a cache shared by all
+# workers in production, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'unique-snowflake'),
     }
 }
 
+# Anonymous full-page cache for public listings (invalidated by catalog version)
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+PAGE_CACHE_TIMEOUT = 600  # seconds
+
+# Approximate listing totals ("Page X of Y") are cached for this many seconds
+PAGINATION_COUNT_CACHE_TIMEOUT = 300
+
 # Static files optimization
 STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 
@@ -217,6 +238,40 @@ SECURE_HSTS_PRELOAD = True
 
 # Video Scheduling Configuration
 VIDEO_SCHEDULING_ENABLED = True
+# One process, elected through a MySQL advisory lock, publishes scheduled
+# videos; it sleeps until the next publish time but at most this long, and
+# the others retry the election at this interval (seconds)
+VIDEO_SCHEDULER_MAX_SLEEP = 30
+VIDEO_SCHEDULER_LEADER_RETRY = 30
+
+# Buffered view counting: 'local' flushes each process straight to the DB,
+# 'cache' spills into a shared cache drained by `manage.py flush_view_counts`.
+VIEW_COUNT_BACKEND = os.getenv('VIEW_COUNT_BACKEND', 'local')
+VIEW_COUNT_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', '30'))  # seconds
+
+# Player beacons are held in a bounded in-memory ring buffer per process
+PLAYBACK_BEACON_BUFFER_SIZE = 50000
+PLAYBACK_BEACON_FLUSH_INTERVAL = 30  # seconds
+
+# Media processing queue (`manage.py run_workers`): failed jobs are retried
+# after JOB_RETRY_BASE_DELAY * 2**(attempt - 1) seconds, up to the max delay,
+# and a running job whose worker went away is requeued after JOB_LOCK_TIMEOUT
+JOB_RETRY_BASE_DELAY = 30  # seconds
+JOB_RETRY_MAX_DELAY = 3600  # seconds
+JOB_LOCK_TIMEOUT = 900  # seconds
+
+# Number of precomputed related videos kept per video
+RELATED_VIDEOS_COUNT = 12
+
+# Navbar popular tags: how many to show, and the half-life in days used to
+# favour tags on recent videos (0 ranks by active video count only).
+POPULAR_TAGS_COUNT = int(os.getenv('POPULAR_TAGS_COUNT', '10'))
+POPULAR_TAGS_HALF_LIFE_DAYS = float(os.getenv('POPULAR_TAGS_HALF_LIFE_DAYS', '0'))
+
+# Trending score of the popular listings (see core/trending.py)
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_WINDOW_DAYS = int(os.getenv('TRENDING_WINDOW_DAYS', '7'))
+TRENDING_LIKE_WEIGHT = 5
 
 # Internal media path used by reverse proxy for protected streaming.
 VIDEO_INTERNAL_MEDIA_PREFIX = os.getenv('VIDEO_INTERNAL_MEDIA_PREFIX', '/protected-media/')
\ No newline at end of file
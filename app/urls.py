@@ -6,6 +6,7 @@ urlpatterns = [
     path('videos/', views.videos, name='videos'),
     path('video/<slug:slug>/', views.video_detail, name='video_detail'),
     path('stream/<int:video_id>/', views.stream_video, name='stream_video'),
+    path('stream/<int:video_id>/beacon/', views.playback_beacon, name='playback_beacon'),
     path('categories/', views.categories, name='categories'),
     path('tags/', views.tags, name='tags'),
     path('latest/', views.latest, name='latest'),
@@ -10,20 +10,26 @@ from django.contrib.auth import authenticate
 import os
 import mimetypes
 import json
-from core.models import Video, Category, Tag, Comment, CMS, DMCAReport
+from core.models import Video, Category, Tag, Comment, CMS, DMCAReport, RelatedVideo
 from django.contrib.auth.decorators import login_required
 from core.forms import CommentForm, DMCAReportForm
-
+from core.counters import view_counts
+from core.playback import parse_beacon, playback_beacons
+from core.ads import ad_registry
+from core.search import search_videos
+from core.pagination import paginate
+from core.trending import TRENDING_ORDERING, trending_videos
+from core.page_cache import cache_public_page
+
+@cache_public_page
 def home(request):
     """Home page view with categories and videos"""
     categories = Category.objects.all()
     videos = Video.objects.filter(is_active=True) 
     tags = Tag.objects.all()
     
-    # Pagination
-    paginator = Paginator(videos, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination (newest first)
+    page_obj = paginate(request, videos, ('-created_at', '-id'))
     
     context = {
         'categories': categories,
@@ -58,13 +64,8 @@ def videos(request):
         except Tag.DoesNotExist:
             pass
     
-    # Sort videos by creation date (newest first)
-    videos = videos.order_by('-created_at')
-    
-    # Pagination
-    paginator = Paginator(videos, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Sort videos by creation date (newest first), keyset paginated
+    page_obj = paginate(request, videos, ('-created_at', '-id'))
     
     context = {
         'categories': categories,
@@ -79,23 +80,26 @@ def videos(request):
 
 def video_detail(request, slug):
     """Video detail page"""
-    from core.models import Ad
-    
     video = get_object_or_404(Video, slug=slug, is_active=True)
-    # Increment view count
-    video.views += 1
-    video.save(update_fields=['views'])
-    
-    # Get related videos (same categories, only active)
-    related_videos = Video.objects.filter(
-        category__in=video.category.all(),
-        is_active=True
-    ).exclude(id=video.id).distinct()
+    # Buffer the view; it is written to the DB in bulk by the flusher
+    view_counts.record(video.id)
+    video.views += view_counts.pending(video.id)
+    
+    # Get related videos from the precomputed table (best match first)
+    related_videos = [
+        entry.related for entry in RelatedVideo.objects.filter(
+            video=video, related__is_active=True
+        ).select_related('related').order_by('-score')[:settings.RELATED_VIDEOS_COUNT]
+    ]
+    if not related_videos:
+        # Not computed yet: fall back to the newest videos in the same categories
+        related_videos = Video.objects.filter(
+            category__in=video.category.all(),
+            is_active=True
+        ).exclude(id=video.id).distinct()[:settings.RELATED_VIDEOS_COUNT]
     
-    # Get popular videos for sidebar (top 6 by views)
-    popular_videos = Video.objects.filter(
-        is_active=True
-    ).exclude(id=video.id).order_by('-views')[:6]
+    # Get popular videos for sidebar (top 6 trending)
+    popular_videos = trending_videos().exclude(id=video.id)[:6]
     
     # Get approved comments
     comments = Comment.objects.filter(video=video, is_approved=True).select_related('user')
@@ -104,7 +108,7 @@ def video_detail(request, slug):
     comment_form = CommentForm(user=request.user)
     
     # Debug: Check if instream video ad exists
-    instream_ad = Ad.objects.filter(placement='video-instream', ad_type='instream-video').first()
+    instream_ad = ad_registry.get('video-instream', 'instream-video', active_only=False)
     debug_info = {
         'instream_ad_exists': instream_ad is not None,
         'instream_ad_active': instream_ad.is_active if instream_ad else False,
@@ -121,6 +125,7 @@ def video_detail(request, slug):
     }
     return render(request, 'site/video_detail.html', context)
 
+@cache_public_page
 def categories(request):
     """Categories page"""
     categories = Category.objects.all()
@@ -129,6 +134,7 @@ def categories(request):
     }
     return render(request, 'site/categories.html', context)
 
+@cache_public_page
 def tags(request):
     """Tags page"""
     tags = Tag.objects.all()
@@ -137,28 +143,26 @@ def tags(request):
     }
     return render(request, 'site/tags.html', context)
 
+@cache_public_page
 def latest(request):
     """Latest videos page"""
-    videos = Video.objects.filter(is_active=True).order_by('-created_at')
+    videos = Video.objects.filter(is_active=True)
     
-    # Pagination
-    paginator = Paginator(videos, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination (newest first)
+    page_obj = paginate(request, videos, ('-created_at', '-id'))
     
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'site/latest.html', context)
 
+@cache_public_page
 def popular(request):
     """Popular videos page"""
-    videos = Video.objects.filter(is_active=True).order_by('-views')
+    videos = Video.objects.filter(is_active=True)
     
-    # Pagination
-    paginator = Paginator(videos, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination (trending first, then most viewed)
+    page_obj = paginate(request, videos, TRENDING_ORDERING)
     
     context = {
         'page_obj': page_obj,
@@ -276,6 +280,27 @@ def stream_video(request, video_id):
     return response
 
 
+@require_http_methods(["POST"])
+@csrf_exempt
+def playback_beacon(request, video_id):
+    """
+    Receive a start/progress/complete beacon from the player.
+    Buffered in memory only; no database access in the request.
+    """
+    if len(request.body) > 1024:
+        return HttpResponse(status=413)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+
+    beacon = parse_beacon(video_id, data)
+    if beacon is None:
+        return HttpResponse(status=400)
+    playback_beacons.record(beacon)
+    return HttpResponse(status=204)
+
+
 def search(request):
     """Comprehensive search functionality"""
     query = request.GET.get('q', '').strip()
@@ -285,16 +310,8 @@ def search(request):
     search_tags = []
     
     if query:
-        # Search in videos (title, description, uploader name)
-        video_results = Video.objects.filter(
-            is_active=True
-        ).filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(uploader__name__icontains=query) |
-            Q(category__name__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct().order_by('-created_at')
+        # Search in videos through the inverted token index
+        video_hits = search_videos(query)
         
         # Search in categories
         search_categories = Category.objects.filter(
@@ -308,14 +325,16 @@ def search(request):
             Q(slug__icontains=query)
         ).distinct()
         
-        # Combine all video results
-        results = video_results
-        total_results = results.count()
-        
-        # Pagination
-        paginator = Paginator(results, 20)  # 20 videos per page
+        # Pagination (the paginator runs the only COUNT)
+        paginator = Paginator(video_hits, 20)  # 20 videos per page
         page_number = request.GET.get('page')
         page_obj = paginator.get_page(page_number)
+        total_results = paginator.count
+        
+        # Load the videos for this page only, keeping the ranked order
+        video_ids = [hit['video_id'] for hit in page_obj.object_list]
+        videos_by_id = Video.objects.select_related('uploader').prefetch_related('category', 'tags').in_bulk(video_ids)
+        page_obj.object_list = [videos_by_id[video_id] for video_id in video_ids if video_id in videos_by_id]
     else:
         page_obj = None
     
@@ -374,6 +393,7 @@ def submit_comment(request, video_id):
             comment = form.save(commit=False)
             comment.video = video
             comment.save()
+            view_counts.record_comment(video.id)
             
             # Return success response with comment data
             return JsonResponse({
@@ -418,6 +438,7 @@ def toggle_like(request, video_id):
         # In a real application, you might want to track individual likes per user/IP
         video.likes += 1
         video.save(update_fields=['likes'])
+        view_counts.record_like(video.id)
         
         return JsonResponse({
             'success': True,
@@ -467,6 +488,7 @@ def submit_dmca_report(request):
         }, status=400)
 
 
+@cache_public_page
 def cms_page(request, slug):
     """Display a CMS page"""
     try:
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import User, Category, Tag, Video, Settings, CMS, AgeVerification, Ad, DMCAReport
+from .models import User, Category, Tag, Video, Settings, CMS, AgeVerification, Ad, DMCAReport, Job
+from .ads import ad_registry
+from . import jobs
 
 
 @admin.register(User)
@@ -11,7 +13,7 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-	list_display = ("name", "slug", "description", "image")
+	list_display = ("name", "slug", "description", "image", "active_video_count", "video_count")
 	search_fields = ("name", "slug", "description")
 	prepopulated_fields = {"slug": ("name",)}
 	list_editable = ("description",)
@@ -19,7 +21,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-	list_display = ("name", "slug")
+	list_display = ("name", "slug", "active_video_count", "video_count")
 	search_fields = ("name", "slug")
 	prepopulated_fields = {"slug": ("name",)}
 
@@ -40,26 +42,18 @@ class VideoAdmin(admin.ModelAdmin):
 	has_thumbnail.short_description = "Has Thumbnail"
 	
 	def generate_thumbnails_action(self, request, queryset):
-		"""Generate thumbnails for selected videos"""
-		success_count = 0
-		error_count = 0
+		"""Queue thumbnail generation for selected videos"""
+		queued_count = 0
 		
 		for video in queryset:
 			if video.video_file and not video.thumbnail:
-				try:
-					if video.generate_thumbnail():
-						video.save(update_fields=['thumbnail'])
-						success_count += 1
-					else:
-						error_count += 1
-				except Exception as e:
-					error_count += 1
-					self.message_user(request, f"Error generating thumbnail for {video.title}: {e}", level='ERROR')
+				jobs.enqueue('probe_media', video)
+				queued_count += 1
 		
-		if success_count > 0:
-			self.message_user(request, f"Successfully generated {success_count} thumbnails", level='SUCCESS')
-		if error_count > 0:
-			self.message_user(request, f"Failed to generate {error_count} thumbnails", level='WARNING')
+		if queued_count > 0:
+			self.message_user(request, f"Queued thumbnail generation for {queued_count} videos", level='SUCCESS')
+		else:
+			self.message_user(request, "All selected videos already have thumbnails", level='WARNING')
 	
 	generate_thumbnails_action.short_description = "Generate thumbnails for selected videos"
 
@@ -260,6 +254,12 @@ class AdAdmin(admin.ModelAdmin):
 	ad_placement_guide.allow_tags = True
 	
 	
+	def changelist_view(self, request, extra_context=None):
+		"""Show when the compiled ad registry was last built"""
+		extra_context = extra_context or {}
+		extra_context['ad_registry'] = ad_registry.current()
+		return super().changelist_view(request, extra_context=extra_context)
+	
 	def get_readonly_fields(self, request, obj=None):
 		"""Make placement and ad_type readonly after creation"""
 		if obj:  # editing an existing object
@@ -304,3 +304,20 @@ class DMCAReportAdmin(admin.ModelAdmin):
 		if obj and obj.reviewed_by:
 			readonly.extend(['reviewed_by', 'reviewed_at'])
 		return readonly
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+	list_display = ("kind", "video", "status", "attempts", "run_at", "locked_by", "finished_at")
+	list_filter = ("status", "kind")
+	search_fields = ("video__title", "last_error")
+	raw_id_fields = ("video",)
+	readonly_fields = ("created_at", "locked_at", "finished_at")
+	actions = ["retry_jobs_action"]
+	
+	def retry_jobs_action(self, request, queryset):
+		"""Queue failed jobs again"""
+		retried = jobs.retry_jobs(queryset)
+		self.message_user(request, f"Queued {retried} failed jobs again", level='SUCCESS')
+	
+	retry_jobs_action.short_description = "Retry selected failed jobs"
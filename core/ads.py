@@ -0,0 +1,142 @@
+"""
+Compiled ad placement registry.
+
+Every ad row and the banner alias rules are compiled into one frozen lookup
+the first time it is needed and again only after an ``Ad`` changes. A
+version number in the shared cache says when that happened; each process
+recompiles lazily when its copy is older. Templates (through the
+``cms_and_settings`` context processor), ``Ad.get_ad_by_placement_and_type``
+and the video page all read from the same compiled lookup.
+
+Keys follow the template conventions: ``"{placement}-{ad_type}"``,
+``"{placement}"`` and, for banners, ``"{placement}-banner"``. Homepage banner
+slots without an ad of their own borrow the working video-detail banner.
+"""
+
+import threading
+import time
+from types import MappingProxyType
+
+from django.core.cache import cache
+from django.utils import timezone
+
+ADS_VERSION_KEY = 'ads:version'
+
+# Homepage banner slots that borrow the working video-detail banner script
+FORCED_BANNER_KEYS = (
+    'header-top',
+    'header-top-banner',
+    'incontent',
+    'incontent-banner',
+    'sidebar',
+    'sidebar-banner',
+    'home-bottom',
+    'home-bottom-banner',
+)
+# Where the borrowed banner script is taken from, first match wins
+FORCED_BANNER_SOURCES = (
+    'video-below-player-banner',
+    'video-sidebar-banner',
+    'video-below-player',
+    'video-sidebar',
+)
+
+
+def ads_version():
+    """Current ads version, initialised from the clock on first use"""
+    version = cache.get(ADS_VERSION_KEY)
+    if version is None:
+        cache.add(ADS_VERSION_KEY, int(time.time()), None)
+        version = cache.get(ADS_VERSION_KEY)
+    return version
+
+
+def bump_ads_version():
+    """Make every process recompile its ad lookup"""
+    try:
+        cache.incr(ADS_VERSION_KEY)
+    except ValueError:
+        cache.add(ADS_VERSION_KEY, int(time.time()), None)
+
+
+class CompiledAds:
+    """Read-only ad lookups built from one snapshot of the Ad table"""
+
+    def __init__(self, ads, version):
+        self.version = version
+        self.built_at = timezone.now()
+
+        by_format = {}
+        scripts = {}
+        exists = {}
+        for ad in ads:
+            by_format[(ad.placement, ad.ad_type)] = ad
+            keys = [f"{ad.placement}-{ad.ad_type}", ad.placement]
+            if ad.ad_type == 'banner':
+                keys.append(f"{ad.placement}-banner")
+            for key in keys:
+                exists[key] = True
+                if ad.is_active:
+                    scripts[key] = ad.get_ad_script()
+
+        forced_banner_script = next(
+            (scripts[key] for key in FORCED_BANNER_SOURCES if scripts.get(key)), None
+        )
+        if forced_banner_script:
+            for key in FORCED_BANNER_KEYS:
+                # Preserve existing explicit mappings; only backfill missing aliases.
+                scripts.setdefault(key, forced_banner_script)
+                exists[key] = True
+
+        self.by_format = MappingProxyType(by_format)
+        self.scripts = MappingProxyType(scripts)
+        self.exists = MappingProxyType(exists)
+
+    def get(self, placement, ad_type, active_only=True):
+        """Return the Ad for a placement and format, or None"""
+        ad = self.by_format.get((placement, ad_type))
+        if ad is None or (active_only and not ad.is_active):
+            return None
+        return ad
+
+    def __len__(self):
+        return len(self.by_format)
+
+
+class AdRegistry:
+    """Holds the compiled ads of this process, recompiled on version change"""
+
+    def __init__(self):
+        self.compiled = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        """Return the compiled lookup, recompiling it if it is out of date"""
+        version = ads_version()
+        compiled = self.compiled
+        if compiled is not None and compiled.version == version:
+            return compiled
+
+        from core.models import Ad
+
+        with self.lock:
+            if self.compiled is None or self.compiled.version != version:
+                self.compiled = CompiledAds(list(Ad.objects.all()), version)
+            return self.compiled
+
+    def get(self, placement, ad_type, active_only=True):
+        return self.current().get(placement, ad_type, active_only)
+
+    def template_context(self):
+        """The ``ads`` and ``ads_exist`` lookups used by ad templates"""
+        compiled = self.current()
+        return {'ads': compiled.scripts, 'ads_exist': compiled.exists}
+
+    def invalidate(self):
+        """Recompile here and in every other process"""
+        self.compiled = None
+        bump_ads_version()
+
+
+# Global ad registry instance
+ad_registry = AdRegistry()
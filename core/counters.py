@@ -0,0 +1,258 @@
+"""
+Write-behind view counter.
+
+Page hits are accumulated in memory and written to the database in bulk
+``UPDATE ... SET views = views + n`` statements, so a popular video costs one
+write per flush interval instead of one write per page view.
+
+Views, likes and comments are buffered per video in 15-minute buckets. A
+flush applies the views to ``Video.views`` and adds the counts to the
+``VideoHourlyStats`` rollup the trending score is computed from and to the
+``VideoDailyStats`` rollup behind the video analytics. Every UTC offset in
+use is a multiple of 15 minutes, so each bucket falls in exactly one hour
+and one local day.
+
+Two modes are supported (``VIEW_COUNT_BACKEND`` setting):
+
+- ``local``: each process flushes its own buffer straight to the database.
+- ``cache``: each process spills its buffer into the shared cache and the
+  ``flush_view_counts`` management command drains it to the database. This
+  needs a cache backend shared between processes (memcached, redis, ...).
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PENDING_CACHE_KEY = 'view_counts:pending:buckets'
+LOCK_CACHE_KEY = 'view_counts:lock'
+LOCK_TIMEOUT = 10
+
+
+# Buffered counts are keyed by (video_id, metric, bucket start timestamp)
+BUCKET_SECONDS = 900
+
+
+def current_bucket():
+    """Start of the current 15-minute bucket as a UNIX timestamp"""
+    return int(time.time()) // BUCKET_SECONDS * BUCKET_SECONDS
+
+
+def add_to_rollup(model, bucket_field, deltas):
+    """
+    Add {(video_id, bucket): {metric: n}} to a per-video rollup table with
+    unique (video, bucket) rows. Missing rows are created first, then rows
+    sharing the same bucket and increments get one ``F()`` UPDATE, so
+    concurrent flushers never overwrite each other.
+    """
+    if not deltas:
+        return 0
+
+    model.objects.bulk_create(
+        [model(video_id=video_id, **{bucket_field: bucket}) for video_id, bucket in deltas],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+    groups = defaultdict(list)
+    for (video_id, bucket), metrics in deltas.items():
+        increments = tuple(sorted((metric, n) for metric, n in metrics.items() if n > 0))
+        if increments:
+            groups[(bucket, increments)].append(video_id)
+
+    updated = 0
+    for (bucket, increments), video_ids in groups.items():
+        updated += model.objects.filter(video_id__in=video_ids, **{bucket_field: bucket}).update(
+            **{metric: F(metric) + n for metric, n in increments}
+        )
+    return updated
+
+
+def write_counts(counts):
+    """
+    Apply buffered {(video_id, metric, bucket): n} counts: views to the video
+    totals, views and likes to the hourly rollup, everything to the daily one.
+    """
+    from core.models import VideoDailyStats, VideoHourlyStats
+
+    views = Counter()
+    hourly = defaultdict(Counter)
+    daily = defaultdict(Counter)
+    for (video_id, metric, bucket), n in counts.items():
+        if metric == 'views':
+            views[video_id] += n
+        if metric in ('views', 'likes'):
+            hour = datetime.fromtimestamp(bucket // 3600 * 3600, tz=dt_timezone.utc)
+            hourly[(video_id, hour)][metric] += n
+        day = timezone.localtime(datetime.fromtimestamp(bucket, tz=dt_timezone.utc)).date()
+        daily[(video_id, day)][metric] += n
+
+    # All or nothing, so a caller restoring the counts after an error never
+    # applies views that were already written
+    with transaction.atomic():
+        updated = write_view_counts(views)
+        add_to_rollup(VideoHourlyStats, 'hour', hourly)
+        add_to_rollup(VideoDailyStats, 'date', daily)
+    return updated
+
+
+def write_view_counts(counts):
+    """
+    Apply a {video_id: increment} mapping to the database.
+    Videos sharing the same increment are updated with a single UPDATE.
+    """
+    from core.models import Video
+
+    by_increment = defaultdict(list)
+    for video_id, increment in counts.items():
+        if increment > 0:
+            by_increment[increment].append(video_id)
+
+    updated = 0
+    for increment, video_ids in by_increment.items():
+        updated += Video.objects.filter(pk__in=video_ids).update(views=F('views') + increment)
+    return updated
+
+
+class cache_lock:
+    """Best-effort cross-process lock built on the atomic ``cache.add``"""
+
+    def __init__(self, key=LOCK_CACHE_KEY, timeout=LOCK_TIMEOUT, wait=5.0):
+        self.key = key
+        self.timeout = timeout
+        self.wait = wait
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.wait
+        while not cache.add(self.key, 1, self.timeout):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Could not acquire cache lock {self.key}')
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        cache.delete(self.key)
+
+
+def drain_shared_view_counts():
+    """Take every pending count out of the shared cache and return it"""
+    with cache_lock():
+        pending = cache.get(PENDING_CACHE_KEY) or {}
+        cache.delete(PENDING_CACHE_KEY)
+    return pending
+
+
+class ViewCountBuffer:
+    """
+    In-process accumulator for video views with a background flusher thread.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.views = Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+
+    @property
+    def backend(self):
+        return getattr(settings, 'VIEW_COUNT_BACKEND', 'local')
+
+    @property
+    def interval(self):
+        return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 30)
+
+    def record(self, video_id, count=1, metric='views'):
+        """Record a view, like or comment for a video; starts the flusher on first use"""
+        with self.lock:
+            self.counts[(video_id, metric, current_bucket())] += count
+            if metric == 'views':
+                self.views[video_id] += count
+        if not self.running:
+            self.start()
+
+    def record_like(self, video_id):
+        """Record a like for the rollups (the total is saved by the view)"""
+        self.record(video_id, metric='likes')
+
+    def record_comment(self, video_id):
+        """Record a comment for the daily rollup"""
+        self.record(video_id, metric='comments')
+
+    def pending(self, video_id):
+        """Views recorded in this process that are not yet flushed"""
+        with self.lock:
+            return self.views.get(video_id, 0)
+
+    def take(self):
+        """Swap out the current buffer and return its contents"""
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.views = Counter()
+        return counts
+
+    def restore(self, counts):
+        """Put counts back after a failed flush so they are not lost"""
+        with self.lock:
+            self.counts.update(counts)
+            for (video_id, metric, _), n in counts.items():
+                if metric == 'views':
+                    self.views[video_id] += n
+
+    def flush(self):
+        """Flush buffered views to the database (or the shared cache)"""
+        counts = self.take()
+        if not counts:
+            return 0
+
+        try:
+            if self.backend == 'cache':
+                with cache_lock():
+                    pending = Counter(cache.get(PENDING_CACHE_KEY) or {})
+                    pending.update(counts)
+                    cache.set(PENDING_CACHE_KEY, dict(pending), None)
+                return len(counts)
+            return write_counts(counts)
+        except Exception as e:
+            logger.error(f"Error flushing view counts: {e}")
+            self.restore(counts)
+            return 0
+        finally:
+            close_old_connections()
+
+    def start(self):
+        """Start the flusher in a background thread"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_flusher, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the flusher and write out whatever is left"""
+        self.running = False
+        self.flush()
+
+    def _run_flusher(self):
+        """Main flusher loop"""
+        while self.running:
+            time.sleep(self.interval)
+            self.flush()
+
+
+# Global view counter instance
+view_counts = ViewCountBuffer()
+
+atexit.register(view_counts.stop)
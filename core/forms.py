@@ -1,6 +1,7 @@
 from django import forms
 import os
 from .models import Category, Tag, Video, Comment, CMS, Settings, AgeVerification, Ad, DMCAReport
+from .uploads import max_video_size
 
 
 class CategoryForm(forms.ModelForm):
@@ -106,10 +107,10 @@ class VideoForm(forms.ModelForm):
                 return None
         
         if video_file:
-            # Check file size (300MB limit)
-            max_size = 300 * 1024 * 1024  # 300MB in bytes
+            # Check file size (VIDEO_UPLOAD_MAX_SIZE, 300MB by default)
+            max_size = max_video_size()
             if video_file.size > max_size:
-                raise forms.ValidationError(f"File size too large. Maximum allowed size is 300MB. Your file is {video_file.size / (1024 * 1024):.1f}MB.")
+                raise forms.ValidationError(f"File size too large. Maximum allowed size is {max_size / (1024 * 1024):.0f}MB. Your file is {video_file.size / (1024 * 1024):.1f}MB.")
             
             # Check file extension - only MP4 allowed
             allowed_extensions = ['.mp4']
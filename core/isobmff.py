@@ -0,0 +1,335 @@
+"""
+Reading MP4/MOV (ISO base media file format) metadata without decoding.
+
+An MP4 is a tree of boxes, each starting with a 32-bit size and a four
+character type. Duration, frame size and codec all live in the small
+``moov`` box, so ``read_mp4_info`` maps the file and hops from box header
+to box header (``moov/mvhd``, ``moov/trak/tkhd``, ``trak/mdia/mdhd``,
+``hdlr``, ``stsd`` and ``stts``) without touching the media data. That
+costs a few page faults whatever the size of the file, and the duration is
+the container's exact one rather than OpenCV's frame count / fps estimate,
+which is wrong for variable frame rate files.
+
+Anything that isn't a plain, non-fragmented ISO-BMFF file yields None and
+callers fall back to OpenCV (see core.media.probe_media).
+
+Files written with the moov box after the media data (what most encoders do
+unless asked for "faststart") make a browser fetch the end of the file
+before it can start playing. ``faststart`` rewrites them with the moov box
+first.
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from collections import namedtuple
+
+# Duration in microseconds; frame_count/fps from the video track's sample
+# table (0 if unknown)
+Mp4Info = namedtuple('Mp4Info', ['duration_us', 'width', 'height', 'codec', 'frame_count', 'fps'])
+
+# Top-level boxes an ISO-BMFF file can start with
+LEADING_BOXES = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot', b'uuid'}
+
+
+class _Box:
+    __slots__ = ('type', 'offset', 'start', 'end')
+
+    def __init__(self, type, offset, start, end):
+        self.type = type
+        # Header, payload and end offsets
+        self.offset = offset
+        self.start = start
+        self.end = end
+
+
+def _iter_boxes(buf, start, end):
+    """Yield the boxes laid out between two offsets"""
+    offset = start
+    while offset + 8 <= end:
+        size, type = struct.unpack_from('>I4s', buf, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack_from('>Q', buf, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            # Extends to the end of the enclosing box
+            size = end - offset
+        if size < header or offset + size > end:
+            return
+        yield _Box(type, offset, offset + header, offset + size)
+        offset += size
+
+
+def _child(buf, box, type):
+    for child in _iter_boxes(buf, box.start, box.end):
+        if child.type == type:
+            return child
+    return None
+
+
+def _full_box_times(buf, box):
+    """(timescale, duration) of an mvhd or mdhd box"""
+    version = buf[box.start]
+    if version == 1:
+        timescale, duration = struct.unpack_from('>IQ', buf, box.start + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', buf, box.start + 12)
+    return timescale, duration
+
+
+def _track_size(buf, tkhd):
+    """Display width and height (16.16 fixed point) of a tkhd box"""
+    offset = tkhd.start + (88 if buf[tkhd.start] == 1 else 76)
+    if offset + 8 > tkhd.end:
+        return 0, 0
+    width, height = struct.unpack_from('>II', buf, offset)
+    return width >> 16, height >> 16
+
+
+def _handler(buf, mdia):
+    hdlr = _child(buf, mdia, b'hdlr')
+    if hdlr is None or hdlr.start + 12 > hdlr.end:
+        return None
+    return bytes(buf[hdlr.start + 8:hdlr.start + 12])
+
+
+def _sample_table(buf, mdia):
+    minf = _child(buf, mdia, b'minf')
+    return _child(buf, minf, b'stbl') if minf is not None else None
+
+
+def _sample_entry(buf, stbl):
+    """Codec and coded width/height of the first stsd (sample description) entry"""
+    stsd = _child(buf, stbl, b'stsd')
+    # version/flags, entry count, then the first entry's size and format
+    if stsd is None or stsd.start + 16 > stsd.end:
+        return '', 0, 0
+    entry = stsd.start + 8
+    codec = bytes(buf[entry + 4:entry + 8]).decode('latin-1').strip('\x00 ')
+    # A visual sample entry has its width and height 24 bytes into the body
+    if entry + 36 > stsd.end:
+        return codec, 0, 0
+    width, height = struct.unpack_from('>HH', buf, entry + 32)
+    return codec, width, height
+
+
+def _sample_count(buf, stbl):
+    stts = _child(buf, stbl, b'stts')
+    if stts is None or stts.start + 8 > stts.end:
+        return 0
+    entries = struct.unpack_from('>I', buf, stts.start + 4)[0]
+    entries = min(entries, (stts.end - stts.start - 8) // 8)
+    return sum(
+        struct.unpack_from('>I', buf, stts.start + 8 + 8 * i)[0] for i in range(entries)
+    )
+
+
+def parse_moov(buf, moov):
+    """Mp4Info from a moov box, or None if it has no usable duration"""
+    mvhd = _child(buf, moov, b'mvhd')
+    if mvhd is None:
+        return None
+    timescale, duration = _full_box_times(buf, mvhd)
+    duration_us = duration * 1000000 // timescale if timescale else 0
+
+    width = height = frame_count = 0
+    codec = ''
+    fps = 0.0
+    for trak in _iter_boxes(buf, moov.start, moov.end):
+        if trak.type != b'trak':
+            continue
+        mdia = _child(buf, trak, b'mdia')
+        if mdia is None or _handler(buf, mdia) != b'vide':
+            continue
+        tkhd = _child(buf, trak, b'tkhd')
+        if tkhd is not None:
+            width, height = _track_size(buf, tkhd)
+        mdhd = _child(buf, mdia, b'mdhd')
+        track_timescale, track_duration = _full_box_times(buf, mdhd) if mdhd is not None else (0, 0)
+        if not duration_us and track_timescale:
+            duration_us = track_duration * 1000000 // track_timescale
+        stbl = _sample_table(buf, mdia)
+        if stbl is not None:
+            codec, coded_width, coded_height = _sample_entry(buf, stbl)
+            if not width or not height:
+                width, height = coded_width, coded_height
+            frame_count = _sample_count(buf, stbl)
+            if frame_count and track_duration and track_timescale:
+                fps = frame_count * track_timescale / track_duration
+        break
+
+    if not duration_us:
+        # Fragmented files keep their durations in the fragments
+        return None
+    return Mp4Info(duration_us, width, height, codec, frame_count, fps)
+
+
+def read_mp4_info(path):
+    """
+    Duration, frame size and codec of an MP4/MOV file from its moov box, or
+    None if the file isn't one (or can't be read that way)
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < 16:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if buf[4:8] not in LEADING_BOXES:
+                    return None
+                for box in _iter_boxes(buf, 0, len(buf)):
+                    if box.type == b'moov':
+                        return parse_moov(buf, box)
+    except (OSError, ValueError, struct.error, IndexError):
+        return None
+    return None
+
+
+# Faststart
+
+# Boxes on the way from moov to the chunk offset tables
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class _NeedsCo64(Exception):
+    pass
+
+
+def _box_header(type, payload_size):
+    if payload_size + 8 > 0xFFFFFFFF:
+        return struct.pack('>I4sQ', 1, type, payload_size + 16)
+    return struct.pack('>I4s', payload_size + 8, type)
+
+
+def _relocated(buf, box, shift, co64):
+    """A copy of ``box`` with every chunk offset below it moved by ``shift``"""
+    if box.type in CONTAINER_BOXES:
+        children = list(_iter_boxes(buf, box.start, box.end))
+        if (children[-1].end if children else box.start) != box.end:
+            raise ValueError(f'Unexpected data in {box.type!r} box')
+        payload = b''.join(_relocated(buf, child, shift, co64) for child in children)
+    elif box.type in (b'stco', b'co64'):
+        wide = box.type == b'co64'
+        count = struct.unpack_from('>I', buf, box.start + 4)[0]
+        offsets = struct.unpack_from(f'>{count}{"Q" if wide else "I"}', buf, box.start + 8)
+        offsets = [offset + shift for offset in offsets]
+        if not wide and not co64 and offsets and max(offsets) > 0xFFFFFFFF:
+            raise _NeedsCo64()
+        wide = wide or co64
+        payload = bytes(buf[box.start:box.start + 8]) + struct.pack(f'>{count}{"Q" if wide else "I"}', *offsets)
+        return _box_header(b'co64' if wide else b'stco', len(payload)) + payload
+    else:
+        return bytes(buf[box.offset:box.end])
+    return _box_header(box.type, len(payload)) + payload
+
+
+def _faststart_layout(buf):
+    """
+    The top-level boxes of a file whose moov follows its media data, or
+    None if the file is already streamable or can't be safely rewritten
+    """
+    boxes = list(_iter_boxes(buf, 0, len(buf)))
+    if not boxes or boxes[-1].end != len(buf):
+        # Trailing data we don't understand
+        return None
+    types = [box.type for box in boxes]
+    if types.count(b'moov') != 1 or b'moof' in types:
+        return None
+    moov = types.index(b'moov')
+    if b'mdat' not in types[:moov] or b'mdat' in types[moov:]:
+        return None
+    return boxes
+
+
+def needs_faststart(path):
+    """Whether an MP4/MOV file has its moov box after the media data"""
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < 16:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return buf[4:8] in LEADING_BOXES and _faststart_layout(buf) is not None
+    except (OSError, ValueError):
+        return False
+
+
+def _copy_range(src, dst, start, length, digest):
+    buffer = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    src.seek(start)
+    while length:
+        read = src.readinto(view[:min(length, COPY_BUFFER_SIZE)])
+        if not read:
+            raise ValueError('File truncated while copying')
+        dst.write(view[:read])
+        digest.update(view[:read])
+        length -= read
+
+
+def faststart(path):
+    """
+    Move the moov box of an MP4/MOV file in front of its media data, so
+    playback can start without first fetching the end of the file. The
+    chunk offsets (stco, or co64 once they pass 4GB) are shifted by the
+    moov's size. The media data is streamed into a temporary file next to
+    the original, which then replaces it.
+
+    Returns the SHA-256 of the rewritten file, or '' if there was nothing
+    to do.
+    """
+    with open(path, 'rb') as src:
+        stat = os.fstat(src.fileno())
+        if stat.st_size < 16:
+            return ''
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[4:8] not in LEADING_BOXES:
+                return ''
+            boxes = _faststart_layout(buf)
+            if boxes is None:
+                return ''
+            moov = next(box for box in boxes if box.type == b'moov')
+            # The relocated moov's own size is the shift; converting stco
+            # to co64 grows it, so settle the size first
+            shift = moov.end - moov.offset
+            co64 = False
+            while True:
+                try:
+                    relocated = _relocated(buf, moov, shift, co64)
+                except _NeedsCo64:
+                    co64 = True
+                    continue
+                if len(relocated) == shift:
+                    break
+                shift = len(relocated)
+
+        first_mdat = next(i for i, box in enumerate(boxes) if box.type == b'mdat')
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.faststart-')
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                for i, box in enumerate(boxes):
+                    if i == first_mdat:
+                        dst.write(relocated)
+                        digest.update(relocated)
+                    if box is not moov:
+                        _copy_range(src, dst, box.offset, box.end - box.offset, digest)
+                dst.flush()
+                os.fsync(dst.fileno())
+            shutil.copymode(path, tmp)
+            current = os.stat(path)
+            if (current.st_ino, current.st_size, current.st_mtime_ns) != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+                # Replaced or modified while we were copying
+                os.remove(tmp)
+                return ''
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    return digest.hexdigest()
@@ -0,0 +1,211 @@
+"""
+Database-backed queue for media processing.
+
+Saving a video used to run OpenCV inside the request (duration extraction and
+thumbnail generation), holding a web worker for as long as the decode took.
+Saves now only ``enqueue`` a ``probe_media`` ``Job`` row, which reads both
+with a single open of the file, and a ``faststart`` job for new MP4s (see
+core.isobmff); ``manage.py run_workers`` claims queued jobs and runs them in
+a process pool.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of
+worker processes (on any number of hosts) can poll the same table without
+handing out a job twice. The OpenCV work itself is a pure function of the
+file path (see core.media) run in a child process; the result is written
+back by the parent, which is the only side holding a database connection.
+
+A failed job is queued again after an exponential backoff until it has used
+``max_attempts``; a job whose worker died while running it is recovered
+once its lock is older than ``JOB_LOCK_TIMEOUT``.
+"""
+
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core import isobmff, media, media_assets
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def retry_base_delay():
+    return getattr(settings, 'JOB_RETRY_BASE_DELAY', 30)
+
+
+def retry_max_delay():
+    return getattr(settings, 'JOB_RETRY_MAX_DELAY', 3600)
+
+
+def lock_timeout():
+    return getattr(settings, 'JOB_LOCK_TIMEOUT', 900)
+
+
+def worker_name():
+    """Identifies the claiming process in ``Job.locked_by``"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(kind, video):
+    """
+    Queue a job for a video once the current transaction commits, unless
+    one of the same kind is already waiting or running
+    """
+    from core.models import Job
+
+    video_id = video.pk
+
+    def create():
+        if not Job.objects.filter(kind=kind, video_id=video_id, status__in=ACTIVE_STATUSES).exists():
+            Job.objects.create(kind=kind, video_id=video_id)
+
+    transaction.on_commit(create)
+
+
+def _needs_probe(video):
+    return not video.duration or not video.thumbnail
+
+
+def _probe_task(video):
+    # The poster frame is only decoded if the video still needs one
+    return media.probe_media, video.video_file.path, not video.thumbnail
+
+
+def _apply_probe(video, probe):
+    if not video.apply_probe(probe):
+        raise ValueError(f'Could not read {video.video_file.name}')
+
+
+def _needs_faststart(video):
+    return isobmff.needs_faststart(video.video_file.path)
+
+
+def _faststart_task(video):
+    return isobmff.faststart, video.video_file.path
+
+
+def _apply_faststart(video, sha256):
+    # '' if another job or the faststart_videos command got there first
+    if sha256:
+        media_assets.rewrote_asset(video.video_file.name, sha256)
+
+
+# Handlers: kind -> (is_needed(video), task(video) -> (function, *args) run
+# in a child process, apply(video, result) in the worker)
+PROBE_HANDLER = (_needs_probe, _probe_task, _apply_probe)
+HANDLERS = {
+    'probe_media': PROBE_HANDLER,
+    'faststart': (_needs_faststart, _faststart_task, _apply_faststart),
+    # Jobs queued before the single probe replaced them
+    'extract_duration': PROBE_HANDLER,
+    'generate_thumbnail': PROBE_HANDLER,
+}
+
+
+def claim_jobs(limit, worker_id):
+    """Mark up to ``limit`` runnable jobs as running by this worker and return them"""
+    from core.models import Job
+
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids).update(
+            status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(id__in=ids).select_related('video').order_by('run_at', 'id'))
+
+
+def prepare_job(job):
+    """
+    The (function, *args) to run in a child process for a claimed job, or
+    None if there is nothing left to do, in which case the job is finished
+    """
+    is_needed, task, _ = HANDLERS[job.kind]
+    video = job.video
+    if not video.video_file or not is_needed(video):
+        finish_job(job)
+        return None
+    return task(video)
+
+
+def complete_job(job, result):
+    """Write back what the child process computed"""
+    _, _, apply = HANDLERS[job.kind]
+    if result is None:
+        raise ValueError(f'Could not read {job.video.video_file.name}')
+    apply(job.video, result)
+    finish_job(job)
+
+
+def finish_job(job):
+    job.status = 'done'
+    job.finished_at = timezone.now()
+    job.last_error = ''
+    job.save(update_fields=['status', 'finished_at', 'last_error'])
+
+
+def retry_delay(attempts):
+    return min(retry_base_delay() * 2 ** max(attempts - 1, 0), retry_max_delay())
+
+
+def fail_job(job, error):
+    """Queue the job again after a backoff, or give up on it"""
+    job.last_error = str(error) or error.__class__.__name__
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        job.finished_at = timezone.now()
+        logger.error(f'{job} gave up after {job.attempts} attempts: {job.last_error}')
+    else:
+        job.status = 'queued'
+        job.run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+        logger.warning(f'{job} failed (attempt {job.attempts}), retrying at {job.run_at}: {job.last_error}')
+    job.save(update_fields=['status', 'finished_at', 'run_at', 'last_error'])
+
+
+def recover_stale_jobs():
+    """Requeue jobs whose worker stopped while running them; returns how many"""
+    from core.models import Job
+
+    stale = Job.objects.filter(status='running', locked_at__lt=timezone.now() - timedelta(seconds=lock_timeout()))
+    given_up = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=timezone.now(), last_error='Worker stopped while running the job',
+    )
+    return given_up + stale.update(status='queued', run_at=timezone.now())
+
+
+def retry_jobs(queryset):
+    """Queue failed jobs again with a fresh set of attempts"""
+    return queryset.filter(status='failed').update(
+        status='queued', attempts=0, run_at=timezone.now(), finished_at=None,
+    )
+
+
+def job_stats():
+    """Job counts by status and the latest failures, for the dashboard"""
+    from core.models import Job
+
+    counts = dict(Job.objects.values_list('status').annotate(count=Count('id')).order_by())
+    return {
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'done': counts.get('done', 0),
+        'failed': counts.get('failed', 0),
+        'ready': Job.objects.filter(status='queued', run_at__lte=timezone.now()).count(),
+        'recent_failures': list(
+            Job.objects.filter(status='failed').select_related('video').order_by('-finished_at')[:5]
+        ),
+    }
@@ -0,0 +1,164 @@
+"""
+Disk cache of media library thumbnails.
+
+A thumbnail is rendered once per version of a file: the cache key hashes the
+file name, size and mtime (plus the output format), so replacing a file
+yields a new key and the stale image is simply never asked for again
+(``generate_library_thumbnails --prune`` removes those). The key doubles as
+the HTTP ETag, which lets the library page revalidate its grid with 304s.
+
+Concurrent requests for a thumbnail that isn't cached yet are coalesced:
+whoever takes the key's lock renders it while the others wait and then read
+the result. The lock is an ``flock`` on a file next to the image, so it
+holds across all worker processes. Files that can't be decoded are
+remembered with an empty marker so they aren't decoded on every request.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+from core import media
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows
+    fcntl = None
+
+# Library grid thumbnails fit in a 300px square
+LIBRARY_THUMBNAIL_SIZE = (300, 300)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+def thumbnail_cache_dir():
+    return getattr(settings, 'THUMBNAIL_CACHE_DIR', None) or os.path.join(tempfile.gettempdir(), 'thumbnail_cache')
+
+
+def library_file_path(filename):
+    """Path of a file in media/videos, or None if there is no such file"""
+    if not filename or os.path.basename(filename) != filename or filename.startswith('.'):
+        return None
+    path = os.path.join(settings.MEDIA_ROOT, 'videos', filename)
+    return path if os.path.isfile(path) else None
+
+
+def negotiate_format(request):
+    """WebP for browsers that accept it, JPEG otherwise"""
+    return 'webp' if 'image/webp' in request.META.get('HTTP_ACCEPT', '') else 'jpeg'
+
+
+def thumbnail_key(filename, stat, fmt):
+    raw = f'{filename}\0{stat.st_size}\0{stat.st_mtime_ns}\0{LIBRARY_THUMBNAIL_SIZE}\0{fmt}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached_path(key, fmt):
+    return os.path.join(thumbnail_cache_dir(), key[:2], f'{key}.{fmt}')
+
+
+class _KeyLocks:
+    """One lock per key while someone holds or waits for it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+
+    def acquire(self, key):
+        with self.lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+
+    def release(self, key):
+        with self.lock:
+            entry = self.locks[key]
+            entry[0].release()
+            entry[1] -= 1
+            if not entry[1]:
+                del self.locks[key]
+
+
+_key_locks = _KeyLocks()
+
+
+def _render(source, path, fmt):
+    """Render into the cache, or leave a marker if the video can't be read"""
+    pil_format, _ = FORMATS[fmt]
+    content = media.render_thumbnail(source, size=LIBRARY_THUMBNAIL_SIZE, format=pil_format)
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content or b'')
+        os.replace(tmp, path if content else path + '.none')
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def get_thumbnail(filename, fmt='jpeg', stat=None):
+    """
+    Path and key (ETag) of the cached thumbnail of a library file, rendering
+    it first if needed. Raises FileNotFoundError for a missing file and
+    ThumbnailError if no frame can be read.
+    """
+    source = library_file_path(filename)
+    if source is None:
+        raise FileNotFoundError(filename)
+    stat = stat or os.stat(source)
+    key = thumbnail_key(filename, stat, fmt)
+    path = cached_path(key, fmt)
+
+    if not os.path.exists(path) and not os.path.exists(path + '.none'):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Threads of this process queue up here, other processes on the flock
+        _key_locks.acquire(key)
+        try:
+            with open(path + '.lock', 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    if not os.path.exists(path) and not os.path.exists(path + '.none'):
+                        _render(source, path, fmt)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            # The lock file stays: removing it could let a waiter and a
+            # newcomer lock different files. Pruning removes stale ones.
+            _key_locks.release(key)
+
+    if not os.path.exists(path):
+        raise ThumbnailError(f'Cannot read a frame of {filename}')
+    return path, key
+
+
+def prune_cache(keep_keys):
+    """Remove cached thumbnails whose key is not in ``keep_keys``; returns how many"""
+    removed = 0
+    root = thumbnail_cache_dir()
+    if not os.path.isdir(root):
+        return 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.startswith('.tmp-'):
+                # Being rendered
+                continue
+            if name.split('.', 1)[0] not in keep_keys:
+                try:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
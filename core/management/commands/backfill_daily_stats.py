@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from core.counters import add_to_rollup
+from core.models import Comment, Video, VideoDailyStats
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+
+class Command(BaseCommand):
+    help = 'Seed VideoDailyStats history from existing video totals and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of videos processed per batch (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        video_ids = list(Video.objects.order_by('pk').values_list('pk', flat=True))
+        seeded = 0
+        for start in range(0, len(video_ids), batch_size):
+            seeded += self.backfill(video_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Seeded daily stats for {seeded} of {len(video_ids)} videos.'))
+
+    def backfill(self, video_ids):
+        """
+        Comments are counted on the day they were posted. Views and likes not
+        yet in the rollup are spread evenly from the upload day to the day
+        before the first recorded day. Running it again adds nothing.
+        """
+        today = timezone.localdate()
+        recorded = {
+            row['video_id']: row
+            for row in VideoDailyStats.objects.filter(video_id__in=video_ids).values('video_id').annotate(
+                views=Sum('views'), likes=Sum('likes'), first_date=Min('date'),
+            )
+        }
+        recorded_comments = {
+            (video_id, date): comments
+            for video_id, date, comments in VideoDailyStats.objects.filter(
+                video_id__in=video_ids, comments__gt=0
+            ).values_list('video_id', 'date', 'comments')
+        }
+        posted_comments = (
+            Comment.objects.filter(video_id__in=video_ids)
+            .annotate(date=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+            .values_list('video_id', 'date')
+            .annotate(count=Count('id'))
+        )
+
+        deltas = defaultdict(Counter)
+        for video_id, date, count in posted_comments:
+            missing = count - recorded_comments.get((video_id, date), 0)
+            if missing > 0:
+                deltas[(video_id, date)]['comments'] += missing
+
+        for video in Video.objects.filter(pk__in=video_ids).only('pk', 'views', 'likes', 'created_at'):
+            row = recorded.get(video.pk, {})
+            first_day = timezone.localtime(video.created_at).date()
+            last_day = row['first_date'] - timedelta(days=1) if row else today
+            days = [first_day + timedelta(days=i) for i in range(max(1, (last_day - first_day).days + 1))]
+            for metric, total in (('views', video.views), ('likes', video.likes)):
+                missing = total - (row.get(metric) or 0)
+                if missing <= 0:
+                    continue
+                base, extra = divmod(missing, len(days))
+                for i, day in enumerate(days):
+                    if base + (i < extra):
+                        deltas[(video.pk, day)][metric] += base + (i < extra)
+
+        add_to_rollup(VideoDailyStats, 'date', deltas)
+        return len({video_id for video_id, _ in deltas})
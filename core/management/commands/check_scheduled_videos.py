@@ -5,7 +5,7 @@ class Command(BaseCommand):
     help = 'Check and publish any videos that are scheduled for release'
 
     def handle(self, *args, **options):
-        result = publish_scheduled_videos()
+        video_ids = publish_scheduled_videos()
         self.stdout.write(
-            self.style.SUCCESS(f'Video check completed: {result}')
+            self.style.SUCCESS(f'Video check completed: Published {len(video_ids)} video(s)')
         )
@@ -1,19 +1,21 @@
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 import os
-import tempfile
-import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from core.models import UploadSession
+from core.uploads import discard_upload_session, session_file_path, upload_temp_dir
 
 
 class Command(BaseCommand):
-    help = 'Clean up old video chunk files from temporary directory'
+    help = 'Clean up abandoned resumable uploads and their partial files'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--older-than',
             type=int,
             default=24,
-            help='Delete chunks older than X hours (default: 24)',
+            help='Delete uploads untouched for X hours (default: 24)',
         )
         parser.add_argument(
             '--dry-run',
@@ -24,62 +26,47 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         older_than_hours = options['older_than']
         dry_run = options['dry_run']
-        
-        temp_dir = os.path.join(tempfile.gettempdir(), 'video_chunks')
-        
-        if not os.path.exists(temp_dir):
-            self.stdout.write(self.style.WARNING('No chunk directory found'))
-            return
-        
-        cutoff_time = datetime.now() - timedelta(hours=older_than_hours)
+        cutoff_time = timezone.now() - timedelta(hours=older_than_hours)
+
+        # Sessions nobody has sent a chunk to since the cutoff
         deleted_count = 0
-        total_size = 0
-        
-        for item in os.listdir(temp_dir):
-            item_path = os.path.join(temp_dir, item)
-            
-            if os.path.isdir(item_path):
-                # Check if directory is older than cutoff
-                dir_mtime = datetime.fromtimestamp(os.path.getmtime(item_path))
-                
-                if dir_mtime < cutoff_time:
-                    if dry_run:
-                        self.stdout.write(f'Would delete: {item_path}')
-                    else:
-                        try:
-                            import shutil
-                            shutil.rmtree(item_path)
-                            self.stdout.write(f'Deleted: {item_path}')
-                            deleted_count += 1
-                        except Exception as e:
-                            self.stdout.write(
-                                self.style.ERROR(f'Error deleting {item_path}: {e}')
-                            )
-                else:
-                    # Calculate size for reporting
-                    dir_size = self.get_directory_size(item_path)
-                    total_size += dir_size
-        
+        freed = 0
+        for session in UploadSession.objects.filter(updated_at__lt=cutoff_time).exclude(status='assembling'):
+            path = session_file_path(session)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if dry_run:
+                self.stdout.write(f'Would delete: {session}')
+            else:
+                discard_upload_session(session)
+                self.stdout.write(f'Deleted: {session}')
+            deleted_count += 1
+            freed += size
+
+        # Files left behind without a session
+        sessions_dir = upload_temp_dir('sessions')
+        known = {os.path.basename(session_file_path(session)) for session in UploadSession.objects.only('upload_id')}
+        for name in os.listdir(sessions_dir):
+            path = os.path.join(sessions_dir, name)
+            if name in known or datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc) >= cutoff_time:
+                continue
+            size = os.path.getsize(path)
+            if dry_run:
+                self.stdout.write(f'Would delete orphaned file: {path}')
+            else:
+                try:
+                    os.remove(path)
+                    self.stdout.write(f'Deleted orphaned file: {path}')
+                except OSError as e:
+                    self.stdout.write(self.style.ERROR(f'Error deleting {path}: {e}'))
+                    continue
+            deleted_count += 1
+            freed += size
+
         if dry_run:
             self.stdout.write(
-                self.style.WARNING(f'Dry run: Would delete {deleted_count} directories')
+                self.style.WARNING(f'Dry run: Would delete {deleted_count} uploads ({freed / (1024*1024):.2f} MB)')
             )
         else:
             self.stdout.write(
-                self.style.SUCCESS(f'Cleaned up {deleted_count} old chunk directories')
+                self.style.SUCCESS(f'Cleaned up {deleted_count} abandoned uploads ({freed / (1024*1024):.2f} MB)')
             )
-        
-        self.stdout.write(f'Total size of remaining chunks: {total_size / (1024*1024):.2f} MB')
-
-    def get_directory_size(self, path):
-        """Calculate total size of directory"""
-        total_size = 0
-        try:
-            for dirpath, dirnames, filenames in os.walk(path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    if os.path.exists(filepath):
-                        total_size += os.path.getsize(filepath)
-        except Exception:
-            pass
-        return total_size
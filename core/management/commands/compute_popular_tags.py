@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from core.popular_tags import compute_popular_tags
+from core.page_cache import bump_catalog_version
+from core.site_chrome import bump_chrome_version
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute the popular tags ranking shown in the navbar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=None,
+            help='Number of tags to rank (default: settings.POPULAR_TAGS_COUNT)',
+        )
+        parser.add_argument(
+            '--half-life',
+            type=float,
+            default=None,
+            help='Recency half-life in days, 0 to disable (default: settings.POPULAR_TAGS_HALF_LIFE_DAYS)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and recompute every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=3600,
+            help='Seconds between runs in --loop mode (default: 3600)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            ranked = compute_popular_tags(half_life_days=options['half_life'], limit=options['count'])
+            # The navbar is part of the chrome snapshot and of cached pages
+            bump_chrome_version()
+            bump_catalog_version()
+            self.stdout.write(
+                self.style.SUCCESS(f'Ranked {ranked} popular tags in {time.monotonic() - started:.1f}s.')
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from core.related import rebuild_related_videos
+from core.models import RelatedVideo
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related videos table from shared categories and tags'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of videos written per transaction (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = rebuild_related_videos(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Computed related videos for {processed} videos '
+                f'({RelatedVideo.objects.count()} rows) in {time.monotonic() - started:.1f}s.'
+            )
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from core.trending import compute_trending_scores
+from core.page_cache import bump_catalog_version
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute time-decayed trending scores from the hourly views/likes rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and recompute every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=3600,
+            help='Seconds between runs in --loop mode (default: 3600)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            scored = compute_trending_scores()
+            # The popular page is served from the page cache
+            bump_catalog_version()
+            self.stdout.write(
+                self.style.SUCCESS(f'Scored {scored} trending videos in {time.monotonic() - started:.1f}s.')
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
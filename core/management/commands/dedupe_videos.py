@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from core.media_assets import file_sha256
+from core.models import MediaAsset, Video
+from core.page_cache import bump_catalog_version
+from collections import defaultdict
+import os
+
+
+class Command(BaseCommand):
+    help = 'Hash the files under media/videos and collapse identical copies into one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be collapsed without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        videos_dir = os.path.join(settings.MEDIA_ROOT, 'videos')
+        if not os.path.isdir(videos_dir):
+            self.stdout.write(self.style.WARNING('No media/videos directory found'))
+            return
+
+        known = {asset.file: asset for asset in MediaAsset.objects.all()}
+        by_hash = defaultdict(list)
+        hashed = 0
+        with os.scandir(videos_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                name = f'videos/{entry.name}'
+                size = entry.stat().st_size
+                asset = known.get(name)
+                if asset is not None and asset.sha256 and asset.size == size:
+                    sha256 = asset.sha256
+                else:
+                    sha256 = file_sha256(entry.path)
+                    hashed += 1
+                by_hash[sha256].append((name, size, entry.stat().st_mtime))
+        self.stdout.write(f'Hashed {hashed} new or changed files')
+
+        references = dict(
+            Video.objects.filter(video_file__startswith='videos/')
+            .values_list('video_file').annotate(count=Count('id'))
+        )
+        registered = {asset.sha256: asset.file for asset in known.values() if asset.sha256}
+        collapsed = relinked = 0
+        freed = 0
+        for sha256, files in by_hash.items():
+            # Keep the registered copy, else the most used one, else the oldest
+            files.sort(key=lambda f: (f[0] != registered.get(sha256), -references.get(f[0], 0), f[2], f[0]))
+            keep, size, _ = files[0]
+            duplicates = [name for name, _, _ in files[1:]]
+            for name in duplicates:
+                self.stdout.write(f'{"Would collapse" if dry_run else "Collapsing"} {name} -> {keep}')
+            if dry_run:
+                collapsed += len(duplicates)
+                freed += size * len(duplicates)
+                continue
+
+            with transaction.atomic():
+                MediaAsset.objects.filter(file__in=[name for name, _, _ in files]).exclude(sha256=sha256).delete()
+                asset, _ = MediaAsset.objects.update_or_create(sha256=sha256, defaults={'file': keep, 'size': size})
+                relinked += Video.objects.filter(video_file__in=duplicates).update(video_file=keep, media_asset=asset)
+                Video.objects.filter(video_file=keep).exclude(media_asset=asset).update(media_asset=asset)
+            for name in duplicates:
+                try:
+                    os.remove(os.path.join(settings.MEDIA_ROOT, name))
+                    collapsed += 1
+                    freed += size
+                except OSError as e:
+                    self.stdout.write(self.style.ERROR(f'Error deleting {name}: {e}'))
+
+        if relinked:
+            # Cached pages still point at the removed copies
+            bump_catalog_version()
+
+        summary = f'{collapsed} duplicate files ({freed / (1024 * 1024):.2f} MB)'
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'Dry run: Would collapse {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Collapsed {summary}, relinked {relinked} videos'))
@@ -1,5 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from django.core.management.base import BaseCommand
+from core import media
 from core.models import Video
+from core.page_cache import bump_catalog_version
+import os
 
 
 class Command(BaseCommand):
@@ -11,46 +15,66 @@ class Command(BaseCommand):
             action='store_true',
             help='Force re-extraction of duration for all videos',
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Number of files read at once (default: 8)',
+        )
 
     def handle(self, *args, **options):
         force = options['force']
-        
+
+        videos = Video.objects.exclude(video_file='').exclude(video_file__isnull=True)
         if force:
-            videos = Video.objects.filter(video_file__isnull=False)
             self.stdout.write(f'Processing {videos.count()} videos (force mode)...')
         else:
-            videos = Video.objects.filter(
-                video_file__isnull=False,
-                duration=0
-            )
+            videos = videos.filter(duration=0)
             self.stdout.write(f'Processing {videos.count()} videos without duration...')
 
-        success_count = 0
-        error_count = 0
+        # Deduplicated uploads share a file, which only needs reading once
+        by_path = {}
+        for video in videos.only('id', 'title', 'video_file', 'duration'):
+            by_path.setdefault(video.video_file.path, []).append(video)
 
-        for video in videos:
+        def read_duration(path):
+            # MP4/MOV durations come from the container header; other
+            # formats are opened with OpenCV
             try:
-                self.stdout.write(f'Processing: {video.title}')
-                
-                if video.extract_duration():
+                if not os.path.isfile(path):
+                    return path, None, 'file not found'
+                probe = media.probe_media(path, poster=False)
+                if probe is None or not probe.duration:
+                    return path, None, 'could not read the duration'
+                return path, int(probe.duration), None
+            except Exception as e:
+                return path, None, str(e)
+
+        success_count = 0
+        error_count = 0
+        changed = []
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as pool:
+            for path, duration, error in pool.map(read_duration, by_path):
+                for video in by_path[path]:
+                    if error:
+                        error_count += 1
+                        self.stdout.write(self.style.ERROR(f'✗ Error processing {video.title}: {error}'))
+                        continue
                     success_count += 1
+                    if video.duration != duration:
+                        video.duration = duration
+                        changed.append(video)
                     self.stdout.write(
-                        self.style.SUCCESS(f'✓ Duration extracted: {video.get_duration_display()}')
+                        self.style.SUCCESS(f'✓ {video.title}: {video.get_duration_display()}')
                     )
-                else:
-                    error_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(f'✗ Failed to extract duration')
-                    )
-                    
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(
-                    self.style.ERROR(f'✗ Error processing {video.title}: {str(e)}')
-                )
+
+        # One batched write instead of a save (and its signals) per video
+        if changed:
+            Video.objects.bulk_update(changed, ['duration'], batch_size=500)
+            bump_catalog_version()
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'\nCompleted! Success: {success_count}, Errors: {error_count}'
+                f'\nCompleted! Success: {success_count}, Errors: {error_count}, Updated: {len(changed)}'
             )
         )
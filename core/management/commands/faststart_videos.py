@@ -0,0 +1,52 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from core import isobmff, media_assets
+from core.models import Video
+import os
+
+
+class Command(BaseCommand):
+    help = 'Move the index (moov box) of MP4/MOV videos in front of the media data so playback starts sooner'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the files that would be rewritten',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        # Video files and media library files, each file once
+        names = set(
+            Video.objects.exclude(video_file='').exclude(video_file__isnull=True)
+            .values_list('video_file', flat=True)
+        )
+        names.update(media_assets.library_assets().values_list('file', flat=True))
+
+        rewritten = 0
+        errors = 0
+        for name in sorted(names):
+            path = default_storage.path(name)
+            if not os.path.isfile(path) or not isobmff.needs_faststart(path):
+                continue
+            if dry_run:
+                rewritten += 1
+                self.stdout.write(f'Would rewrite {name}')
+                continue
+            try:
+                sha256 = isobmff.faststart(path)
+            except Exception as e:
+                errors += 1
+                self.stdout.write(self.style.ERROR(f'✗ {name}: {e}'))
+                continue
+            if sha256:
+                media_assets.rewrote_asset(name, sha256)
+                rewritten += 1
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}'))
+
+        verb = 'Would rewrite' if dry_run else 'Rewrote'
+        self.stdout.write(
+            self.style.SUCCESS(f'\n{verb} {rewritten} of {len(names)} files, {errors} errors.')
+        )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from core.counters import drain_shared_view_counts, write_counts, view_counts
+import time
+
+
+class Command(BaseCommand):
+    help = 'Write buffered video views, likes and comments from the shared cache to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and flush every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between flushes in --loop mode (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.flush()
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def flush(self):
+        # Anything buffered by this process goes through the same path
+        view_counts.flush()
+
+        try:
+            pending = drain_shared_view_counts()
+        except TimeoutError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+
+        if not pending:
+            self.stdout.write('Nothing buffered to flush.')
+            return
+
+        try:
+            updated = write_counts(pending)
+        except Exception:
+            # write_counts is atomic, so none of them were written; put them
+            # back so the next run can retry them
+            view_counts.restore(pending)
+            view_counts.flush()
+            raise
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Flushed {sum(n for (_, metric, _), n in pending.items() if metric == "views")} view(s) '
+                f'across {updated} video(s).'
+            )
+        )
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core import library_thumbnails
+from core.media_assets import is_video_name
+import multiprocessing
+import os
+
+
+class Command(BaseCommand):
+    help = 'Render the thumbnails of every media library video into the thumbnail cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=['jpeg', 'webp', 'both'],
+            default='both',
+            help='Thumbnail formats to render (default: both)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help='Number of videos decoded at once (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Also remove cached thumbnails of files that were changed or deleted',
+        )
+
+    def handle(self, *args, **options):
+        formats = ['jpeg', 'webp'] if options['format'] == 'both' else [options['format']]
+        videos_dir = os.path.join(settings.MEDIA_ROOT, 'videos')
+        files = []
+        if os.path.isdir(videos_dir):
+            with os.scandir(videos_dir) as entries:
+                for entry in entries:
+                    if not entry.name.startswith('.') and is_video_name(entry.name) and entry.is_file():
+                        files.append((entry.name, entry.stat()))
+
+        keys = set()
+        tasks = []
+        for filename, stat in files:
+            for fmt in formats:
+                keys.add(library_thumbnails.thumbnail_key(filename, stat, fmt))
+                tasks.append((filename, fmt, stat))
+
+        def render(task):
+            filename, fmt, stat = task
+            try:
+                library_thumbnails.get_thumbnail(filename, fmt, stat)
+                return None
+            except Exception as e:
+                return f'{filename} ({fmt}): {e}'
+
+        # OpenCV decodes without holding the GIL, so threads run in parallel;
+        # the cache's per-key locks keep them from racing web requests
+        errors = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as pool:
+            for error in pool.map(render, tasks):
+                if error:
+                    errors += 1
+                    self.stdout.write(self.style.ERROR(f'✗ {error}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Thumbnails ready for {len(files)} videos ({len(tasks) - errors} images, {errors} errors).')
+        )
+
+        if options['prune']:
+            removed = library_thumbnails.prune_cache(keys)
+            self.stdout.write(self.style.SUCCESS(f'Pruned {removed} stale cache files.'))
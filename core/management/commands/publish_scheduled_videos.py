@@ -1,52 +1,25 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from core.models import Video
-import logging
+from core.tasks import publish_scheduled_videos
 
-logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'Publish scheduled videos that have reached their scheduled time'
 
     def handle(self, *args, **options):
-        now = timezone.now()
-        
-        # Find videos that are scheduled and ready to be published
-        scheduled_videos = Video.objects.filter(
-            is_active=False,
-            scheduled_publish_at__isnull=False,
-            scheduled_publish_at__lte=now
-        )
-        
-        published_count = 0
-        
-        for video in scheduled_videos:
-            try:
-                video.is_active = True
-                # Keep scheduled_publish_at to preserve the scheduled date for display
-                video.save()
-                
-                published_count += 1
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Successfully published video: {video.title} (ID: {video.id})'
-                    )
-                )
-                logger.info(f'Published scheduled video: {video.title} (ID: {video.id})')
-                
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'Error publishing video {video.title} (ID: {video.id}): {str(e)}'
-                    )
-                )
-                logger.error(f'Error publishing video {video.title} (ID: {video.id}): {str(e)}')
-        
-        if published_count == 0:
+        # One bulk UPDATE; the scheduler's post-publish work is applied too
+        video_ids = publish_scheduled_videos()
+
+        if not video_ids:
             self.stdout.write(
                 self.style.WARNING('No scheduled videos found to publish.')
             )
-        else:
+            return
+
+        for video_id, title in Video.objects.filter(pk__in=video_ids).values_list('id', 'title'):
             self.stdout.write(
-                self.style.SUCCESS(f'Successfully published {published_count} video(s).')
+                self.style.SUCCESS(f'Successfully published video: {title} (ID: {video_id})')
             )
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully published {len(video_ids)} video(s).')
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core.models import Video, VideoSearchToken
+from core.search import reindex_videos
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the video search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of videos indexed per batch (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        video_ids = list(Video.objects.values_list('pk', flat=True))
+        self.stdout.write(f'Indexing {len(video_ids)} videos...')
+
+        # Drop rows left behind for videos that no longer exist
+        VideoSearchToken.objects.exclude(video_id__in=video_ids).delete()
+        reindex_videos(video_ids, batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Search index rebuilt: {VideoSearchToken.objects.count()} tokens for {len(video_ids)} videos.'
+            )
+        )
@@ -0,0 +1,107 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core import jobs
+import multiprocessing
+import time
+
+
+class Command(BaseCommand):
+    help = 'Run queued media processing jobs (durations, thumbnails) in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help='Number of jobs run at once (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2,
+            help='Seconds to wait for new jobs when the queue is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no job is ready instead of waiting for more',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        worker_id = jobs.worker_name()
+        self.stdout.write(f'Worker {worker_id} running up to {concurrency} jobs at once')
+
+        pool = self.make_pool(concurrency)
+        running = {}
+        done_count = failed_count = 0
+        last_recovery = 0
+        try:
+            while True:
+                if time.monotonic() - last_recovery > 60:
+                    recovered = jobs.recover_stale_jobs()
+                    if recovered:
+                        self.stdout.write(self.style.WARNING(f'Recovered {recovered} stale jobs'))
+                    last_recovery = time.monotonic()
+
+                free = concurrency - len(running)
+                if free > 0:
+                    for job in jobs.claim_jobs(free, worker_id):
+                        try:
+                            task = jobs.prepare_job(job)
+                        except Exception as e:
+                            jobs.fail_job(job, e)
+                            continue
+                        if task is not None:
+                            running[pool.submit(*task)] = job
+
+                if not running:
+                    if options['once']:
+                        break
+                    close_old_connections()
+                    time.sleep(poll_interval)
+                    continue
+
+                finished, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in finished:
+                    job = running.pop(future)
+                    try:
+                        jobs.complete_job(job, future.result())
+                        done_count += 1
+                        self.stdout.write(self.style.SUCCESS(f'✓ {job}'))
+                    except Exception as e:
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        jobs.fail_job(job, e)
+                        failed_count += 1
+                        self.stdout.write(self.style.ERROR(f'✗ {job}: {e}'))
+                if broken:
+                    # A child crashed (e.g. OpenCV on a corrupt file); every
+                    # job still in the pool is lost with it
+                    for job in running.values():
+                        jobs.fail_job(job, 'Worker process crashed')
+                        failed_count += 1
+                    running.clear()
+                    pool.shutdown(wait=False)
+                    pool = self.make_pool(concurrency)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping, waiting for running jobs...')
+            for future, job in running.items():
+                try:
+                    jobs.complete_job(job, future.result())
+                    done_count += 1
+                except Exception as e:
+                    jobs.fail_job(job, e)
+                    failed_count += 1
+        finally:
+            pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Finished {done_count} jobs, {failed_count} failed'))
+
+    def make_pool(self, concurrency):
+        # Spawned rather than forked: children never inherit the database
+        # connection, and OpenCV isn't fork-safe
+        return ProcessPoolExecutor(max_workers=concurrency, mp_context=multiprocessing.get_context('spawn'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from core.media_assets import scan_library
+
+
+class Command(BaseCommand):
+    help = 'Sync the media library index with the files in media/videos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rehash',
+            action='store_true',
+            help='Hash every file again, not only new or changed ones',
+        )
+
+    def handle(self, *args, **options):
+        counts = scan_library(rehash=options['rehash'])
+        if counts['errors']:
+            self.stdout.write(self.style.WARNING(f'{counts["errors"]} files could not be indexed'))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Indexed {counts["added"]} new and {counts["updated"]} changed files, '
+                f'removed {counts["removed"]}, {counts["unchanged"]} unchanged.'
+            )
+        )
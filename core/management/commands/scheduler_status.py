@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
-from core.tasks import scheduler
+from core.tasks import scheduler, leader_connection_id, next_publish_at
 from core.models import Video
 from django.utils import timezone
+from django.db import connection
 
 class Command(BaseCommand):
     help = 'Check video scheduler status and scheduled videos'
@@ -10,6 +11,12 @@ class Command(BaseCommand):
         # Check scheduler status
         status = "Running" if scheduler.running else "Stopped"
         self.stdout.write(f'Scheduler Status: {status}')
+        leader = leader_connection_id()
+        if leader is not None:
+            self.stdout.write(f'Leader: database connection {leader}')
+        elif connection.vendor == 'mysql':
+            self.stdout.write(self.style.WARNING('Leader: none (no process holds the scheduler lock)'))
+        self.stdout.write(f'Next publish: {next_publish_at() or "nothing scheduled"}')
         
         # Check scheduled videos
         now = timezone.now()
@@ -0,0 +1,201 @@
+"""
+OpenCV work on video files.
+
+``probe_media`` opens a video once and returns everything ingest needs:
+the stream properties and, optionally, the poster frame encoded as JPEG.
+``render_thumbnail`` is the same probe when only the frame is wanted.
+MP4/MOV files are described from their container header instead, which
+needs no decoding at all (see core.isobmff).
+
+These functions only take a path and return plain values, so the job
+workers can run them in a process pool and write the results back to the
+database in the parent process (see core.jobs).
+"""
+
+import os
+import time
+from collections import namedtuple
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from core import isobmff
+
+# Standard thumbnail size (16:9)
+THUMBNAIL_SIZE = (320, 180)
+
+# Poster frame selection: this many candidates between the requested
+# position and POSTER_RANGE_END of the length (past that come credits),
+# decoded for at most POSTER_TIME_BUDGET seconds and scored at SCORE_WIDTH
+POSTER_CANDIDATES = 6
+POSTER_RANGE_END = 0.7
+POSTER_TIME_BUDGET = 1.0
+SCORE_WIDTH = 160
+# Candidates closer than this many frames are reached with grab() instead
+# of a seek, which restarts decoding at the previous keyframe
+GRAB_LIMIT = 48
+
+# What a single open of a video file tells us. duration is in (fractional)
+# seconds, bitrate in bits per second; poster is image bytes or None.
+MediaProbe = namedtuple('MediaProbe', [
+    'duration', 'fps', 'frame_count', 'width', 'height', 'codec', 'bitrate', 'file_size', 'poster',
+])
+
+
+def _fourcc(value):
+    value = int(value)
+    if value <= 0:
+        return ''
+    return ''.join(chr((value >> 8 * i) & 0xFF) for i in range(4)).strip('\x00 ')
+
+
+def _encode_frame(frame, size, format):
+    image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    image.thumbnail(size, Image.Resampling.LANCZOS)
+    output = BytesIO()
+    image.save(output, format=format, quality=85)
+    return output.getvalue()
+
+
+def frame_score(frame):
+    """
+    How good a poster a BGR frame makes: sharpness (variance of the
+    Laplacian) weighted by exposure (mean luminance away from black or
+    white) and detail (entropy of the luminance histogram). Computed on a
+    copy scaled down to SCORE_WIDTH.
+    """
+    height, width = frame.shape[:2]
+    if width > SCORE_WIDTH:
+        frame = cv2.resize(frame, (SCORE_WIDTH, max(1, height * SCORE_WIDTH // width)), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    luma = gray.astype(np.float32)
+
+    laplacian = (
+        4 * luma[1:-1, 1:-1] - luma[:-2, 1:-1] - luma[2:, 1:-1] - luma[1:-1, :-2] - luma[1:-1, 2:]
+    )
+    sharpness = float(laplacian.var()) if laplacian.size else 0.0
+    exposure = max(0.0, 1 - abs(float(luma.mean()) - 128) / 128)
+    histogram = np.bincount(gray.ravel(), minlength=256)
+    p = histogram[histogram > 0] / gray.size
+    entropy = float(-(p * np.log2(p)).sum()) / 8
+    return float(np.log1p(sharpness)) * exposure * entropy
+
+
+def poster_positions(position, candidates=POSTER_CANDIDATES):
+    """Fractions of the length to take poster candidates at, in order"""
+    end = max(position, POSTER_RANGE_END)
+    if candidates <= 1 or end == position:
+        return [position]
+    step = (end - position) / (candidates - 1)
+    return [position + step * i for i in range(candidates)]
+
+
+def select_poster_frame(cap, frame_count, positions, budget=POSTER_TIME_BUDGET):
+    """
+    Decode candidate frames in one forward pass and return the best
+    scoring one (or None). The first candidate is always decoded; the
+    others only while within ``budget`` seconds.
+    """
+    deadline = time.monotonic() + budget
+    best, best_score = None, -1.0
+    # Index of the frame the next read() returns, if known
+    current = 0
+    targets = sorted({int(frame_count * position) for position in positions})
+    for i, target in enumerate(targets):
+        if i and time.monotonic() > deadline:
+            break
+        if current is not None and 0 <= target - current <= GRAB_LIMIT:
+            for _ in range(target - current):
+                if not cap.grab():
+                    break
+        else:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        ret, frame = cap.read()
+        if not ret:
+            current = None
+            continue
+        current = target + 1
+        score = frame_score(frame)
+        if score > best_score:
+            best, best_score = frame, score
+    return best
+
+
+def _container_probe(info, file_size, poster=None):
+    duration = info.duration_us / 1000000
+    return MediaProbe(
+        duration=duration,
+        fps=info.fps,
+        frame_count=info.frame_count,
+        width=info.width,
+        height=info.height,
+        codec=info.codec,
+        bitrate=int(file_size * 8 / duration),
+        file_size=file_size,
+        poster=poster,
+    )
+
+
+def probe_media(path, poster=True, position=0.1, size=THUMBNAIL_SIZE, format='JPEG'):
+    """
+    Open a video once and read its properties; with ``poster``, also pick
+    the best looking of the frames from ``position`` (a fraction of the
+    length) on (see select_poster_frame), scaled to fit ``size``. Returns
+    a MediaProbe, or None if the file can't be opened.
+
+    MP4/MOV properties come from the container header (core.isobmff), so
+    without ``poster`` those files are never opened with OpenCV.
+    """
+    file_size = os.path.getsize(path)
+    info = isobmff.read_mp4_info(path)
+    if info is not None and not poster:
+        return _container_probe(info, file_size)
+
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return _container_probe(info, file_size) if info is not None else None
+        frame_count = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = max(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 0)
+        height = max(int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), 0)
+        codec = _fourcc(cap.get(cv2.CAP_PROP_FOURCC))
+        # Reported in kbit/s by the FFmpeg backend, where available
+        bitrate = int(cap.get(cv2.CAP_PROP_BITRATE) * 1000) if hasattr(cv2, 'CAP_PROP_BITRATE') else 0
+
+        frame = None
+        if poster:
+            frame = select_poster_frame(cap, frame_count, poster_positions(position))
+    finally:
+        cap.release()
+
+    poster = _encode_frame(frame, size, format) if frame is not None else None
+    if info is not None:
+        return _container_probe(info, file_size, poster)
+
+    duration = frame_count / fps if fps > 0 else 0.0
+    if bitrate <= 0 and duration > 0:
+        bitrate = int(file_size * 8 / duration)
+    return MediaProbe(
+        duration=duration,
+        fps=fps if fps > 0 else 0.0,
+        frame_count=frame_count,
+        width=width,
+        height=height,
+        codec=codec,
+        bitrate=max(bitrate, 0),
+        file_size=file_size,
+        poster=poster,
+    )
+
+
+def render_thumbnail(path, position=0.1, size=THUMBNAIL_SIZE, format='JPEG'):
+    """
+    Image bytes (JPEG or WEBP) of the poster frame of a video, picked from
+    ``position`` (a fraction of the length) on and scaled to fit ``size``,
+    or None if no frame can be read.
+    """
+    probe = probe_media(path, position=position, size=size, format=format)
+    return probe.poster if probe is not None else None
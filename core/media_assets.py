@@ -0,0 +1,384 @@
+"""
+Content-addressed video files.
+
+Every stored video file has a ``MediaAsset`` row holding its SHA-256, which
+is unique. When an upload's content matches an existing asset, the new
+Video is pointed at the existing file instead of storing another copy, and
+takes its duration and a copy of its thumbnail from a video already using
+it, so the OpenCV passes are skipped as well.
+
+Files streamed through core.upload_handlers arrive with their hash already
+computed; other uploads are hashed once before saving. A file rewritten in
+place (faststart) keeps the hash it was uploaded with as ``source_sha256``,
+which uploads of the original content match as well. Existing copies under
+``media/videos/`` are collapsed by the ``dedupe_videos`` command.
+
+The same rows index the media library: ``scan_library`` walks
+``media/videos/`` once and only hashes and probes files that are new or
+whose size or mtime changed, so the library pages sort and page with
+queries instead of listing and stat'ing the directory on every request.
+The upload and delete endpoints update the index directly; files copied in
+by other means show up after the next scan (``scan_media_library``, or the
+throttled background scan started by the library page).
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from core import media
+from core.uploads import move_file, move_into_storage, store_field_file
+
+logger = logging.getLogger(__name__)
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """SHA-256 of a file, read in 1MB pieces"""
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def upload_sha256(uploaded_file):
+    """SHA-256 of an uploaded file, reusing the one computed while streaming"""
+    sha256 = getattr(uploaded_file, 'sha256', None)
+    if sha256:
+        return sha256
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return file_sha256(uploaded_file.temporary_file_path())
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def find_asset(sha256):
+    """The asset with this content, if its file is still on disk"""
+    from core.models import MediaAsset
+
+    asset = (
+        MediaAsset.objects.filter(sha256=sha256).first()
+        or MediaAsset.objects.filter(source_sha256=sha256).first()
+    )
+    if asset is None:
+        return None
+    if not default_storage.exists(asset.file):
+        # The file was removed behind our back; forget it
+        asset.delete()
+        return None
+    return asset
+
+
+def record_asset(name, sha256, size=None):
+    """
+    Register a stored file. Returns (asset, created); if another file with
+    the same content was registered meanwhile, that one is returned and the
+    caller should link to it instead.
+    """
+    from core.models import MediaAsset
+
+    if size is None:
+        size = default_storage.size(name)
+    try:
+        mtime = os.path.getmtime(default_storage.path(name))
+    except OSError:
+        mtime = 0
+    try:
+        with transaction.atomic():
+            # The file at this name may have been replaced with new content
+            MediaAsset.objects.filter(file=name).exclude(sha256=sha256).delete()
+            return MediaAsset.objects.get_or_create(sha256=sha256, defaults={'file': name, 'size': size, 'mtime': mtime})
+    except IntegrityError:
+        return MediaAsset.objects.get(sha256=sha256), False
+
+
+def copy_known_metadata(video, asset):
+    """Take duration and thumbnail from another video using the same file"""
+    from core.models import Video
+
+    sibling = (
+        Video.objects.filter(media_asset=asset).exclude(pk=video.pk)
+        .exclude(duration=0).values('duration', 'thumbnail').first()
+    )
+    if sibling is None:
+        return
+    if not video.duration:
+        video.duration = sibling['duration']
+    if not video.thumbnail and sibling['thumbnail']:
+        # A copy of its own: regenerating or deleting one video's thumbnail
+        # must not touch the other's
+        try:
+            with default_storage.open(sibling['thumbnail'], 'rb') as f:
+                video.thumbnail.save(os.path.basename(sibling['thumbnail']), File(f), save=False)
+        except OSError as e:
+            # The probe renders one instead
+            logger.warning(f"Could not copy thumbnail {sibling['thumbnail']}: {e}")
+
+
+def link_to_asset(video, asset):
+    """Point a video at an existing asset's file"""
+    video.video_file.name = asset.file
+    video.video_file._committed = True
+    video.media_asset = asset
+    copy_known_metadata(video, asset)
+
+
+def store_video_file(video, src_path, file_name, sha256=None):
+    """
+    Counterpart of store_field_file for video files: link to an existing
+    copy of the content if there is one, otherwise move the file into
+    storage and register it. Returns True if the video was linked to an
+    existing file, in which case ``src_path`` is left for the caller to
+    remove once the video is saved.
+    """
+    sha256 = sha256 or file_sha256(src_path)
+    asset = find_asset(sha256)
+    if asset is not None:
+        link_to_asset(video, asset)
+        return True
+
+    size = os.path.getsize(src_path)
+    name = store_field_file(video, 'video_file', src_path, file_name)
+    asset, created = record_asset(name, sha256, size)
+    if not created and asset.file != name:
+        # An identical upload finished first
+        move_file(default_storage.path(name), src_path)
+        link_to_asset(video, asset)
+        return True
+    video.media_asset = asset
+    return False
+
+
+def store_library_file(src_path, file_name, sha256=None):
+    """
+    Put a media library upload into media/videos. If the content is already
+    there the upload is dropped; returns (storage name, duplicate).
+    """
+    sha256 = sha256 or file_sha256(src_path)
+    asset = find_asset(sha256)
+    if asset is not None:
+        os.remove(src_path)
+        return asset.file, True
+
+    size = os.path.getsize(src_path)
+    name = move_into_storage(src_path, os.path.join('videos', file_name), overwrite=True)
+    asset, created = record_asset(name, sha256, size)
+    if not created and asset.file != name:
+        default_storage.delete(name)
+        return asset.file, True
+    return name, False
+
+
+# Media library index
+
+LIBRARY_DIR = 'videos'
+SCAN_LOCK_KEY = 'media_library:scan'
+
+
+def library_scan_interval():
+    return getattr(settings, 'MEDIA_LIBRARY_SCAN_INTERVAL', 300)
+
+
+def is_video_name(filename):
+    mime_type, _ = mimetypes.guess_type(filename)
+    return bool(mime_type and mime_type.startswith('video/'))
+
+
+def library_assets():
+    """The indexed files of the media library"""
+    from core.models import MediaAsset
+
+    return MediaAsset.objects.filter(file__startswith=f'{LIBRARY_DIR}/')
+
+
+def sync_asset(name, asset=None, stat=None, rehash=False):
+    """
+    Bring the index row of a stored file up to date: hash it if it is new
+    or its size or mtime changed, and read its duration, resolution and
+    codec if that wasn't done yet. Returns 'added', 'updated' or None.
+    """
+    from core.models import MediaAsset, Video
+
+    path = default_storage.path(name)
+    if stat is None:
+        stat = os.stat(path)
+    if asset is None:
+        asset = MediaAsset.objects.filter(file=name).first()
+
+    result = None
+    if asset is None or rehash or asset.size != stat.st_size or asset.mtime != stat.st_mtime:
+        if asset is not None and not rehash and not asset.mtime and asset.sha256 and asset.size == stat.st_size:
+            # Registered before mtimes were tracked; trust the stored hash
+            sha256 = asset.sha256
+        else:
+            sha256 = file_sha256(path)
+        if asset is None:
+            asset = MediaAsset(file=name)
+            result = 'added'
+        else:
+            result = 'updated'
+            if asset.sha256 != sha256:
+                asset.probed_at = None
+                if asset.sha256:
+                    # Replaced with other content, not a rewrite we recorded
+                    asset.source_sha256 = None
+        if MediaAsset.objects.filter(sha256=sha256).exclude(pk=asset.pk).exists():
+            # Another copy of indexed content; dedupe_videos collapses them
+            sha256 = None
+        asset.sha256 = sha256
+        asset.size = stat.st_size
+        asset.mtime = stat.st_mtime
+
+    if asset.probed_at is None:
+        try:
+            probe = media.probe_media(path, poster=False)
+        except Exception as e:
+            logger.warning(f'Could not read {name}: {e}')
+            probe = None
+        asset.duration = int(probe.duration) if probe else 0
+        asset.width = probe.width if probe else 0
+        asset.height = probe.height if probe else 0
+        asset.codec = probe.codec if probe else ''
+        asset.fps = probe.fps if probe else 0
+        asset.bitrate = probe.bitrate if probe else 0
+        asset.probed_at = timezone.now()
+        result = result or 'updated'
+
+    if result is None:
+        return None
+    try:
+        with transaction.atomic():
+            asset.save()
+    except IntegrityError:
+        # The same content was registered meanwhile
+        asset.sha256 = None
+        asset.save()
+    if asset.sha256:
+        Video.objects.filter(video_file=name, media_asset__isnull=True).update(media_asset=asset)
+    return result
+
+
+def rewrote_asset(name, sha256):
+    """
+    Update the index row of a file rewritten in place (e.g. by faststart)
+    whose new content hash is already known. The hash it was stored under
+    is kept as ``source_sha256``, so uploads of the original content still
+    link to it.
+    """
+    from core.models import MediaAsset
+
+    stat = os.stat(default_storage.path(name))
+    asset = MediaAsset.objects.filter(file=name).first()
+    if asset is None:
+        return
+    if not asset.source_sha256:
+        asset.source_sha256 = asset.sha256
+    if MediaAsset.objects.filter(sha256=sha256).exclude(pk=asset.pk).exists():
+        sha256 = None
+    asset.sha256 = sha256
+    asset.size = stat.st_size
+    asset.mtime = stat.st_mtime
+    fields = ['sha256', 'source_sha256', 'size', 'mtime']
+    try:
+        with transaction.atomic():
+            asset.save(update_fields=fields)
+    except IntegrityError:
+        asset.sha256 = None
+        asset.save(update_fields=fields)
+
+
+def forget_asset(name):
+    """Drop the index row of a deleted file"""
+    from core.models import MediaAsset
+
+    MediaAsset.objects.filter(file=name).delete()
+
+
+def scan_library(rehash=False):
+    """
+    Sync the index with ``media/videos/``. Unchanged files cost one stat;
+    ``rehash`` hashes everything again. Returns counts per outcome.
+    """
+    counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'errors': 0}
+    directory = default_storage.path(LIBRARY_DIR)
+    known = {asset.file: asset for asset in library_assets()}
+    seen = set()
+    if os.path.isdir(directory):
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not is_video_name(entry.name) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if not stat.st_size:
+                    # A name reserved for a file still being moved in
+                    continue
+                name = f'{LIBRARY_DIR}/{entry.name}'
+                seen.add(name)
+                try:
+                    result = sync_asset(name, known.get(name), stat, rehash)
+                except OSError as e:
+                    # Removed or replaced while scanning
+                    logger.warning(f'Could not index {name}: {e}')
+                    counts['errors'] += 1
+                    continue
+                counts[result or 'unchanged'] += 1
+
+    gone = [asset.pk for name, asset in known.items() if name not in seen]
+    if gone:
+        from core.models import MediaAsset
+        counts['removed'] = MediaAsset.objects.filter(pk__in=gone).delete()[0]
+    return counts
+
+
+class LibraryScanner:
+    """
+    Runs scan_library in a background thread, at most once per
+    ``MEDIA_LIBRARY_SCAN_INTERVAL`` across all processes
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def request_scan(self):
+        """Start a scan unless one ran recently or is running; returns whether it started"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return False
+            if not cache.add(SCAN_LOCK_KEY, True, library_scan_interval()):
+                return False
+            self.thread = threading.Thread(target=self._run_scan, daemon=True)
+            self.thread.start()
+            return True
+
+    def _run_scan(self):
+        try:
+            counts = scan_library()
+            if counts['added'] or counts['updated'] or counts['removed']:
+                logger.info(f'Media library scan: {counts}')
+        except Exception as e:
+            logger.error(f'Media library scan failed: {e}')
+        finally:
+            close_old_connections()
+
+
+# Global scanner instance
+library_scanner = LibraryScanner()
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from core.search import build_tokens
+
+    Video = apps.get_model('core', 'Video')
+    VideoSearchToken = apps.get_model('core', 'VideoSearchToken')
+    rows = []
+    for video in Video.objects.select_related('uploader').prefetch_related('category', 'tags').iterator(chunk_size=500):
+        weights = build_tokens(
+            title=video.title,
+            description=video.description,
+            uploader=video.uploader.name,
+            categories=[c.name for c in video.category.all()],
+            tags=[t.name for t in video.tags.all()],
+        )
+        rows.extend(
+            VideoSearchToken(video_id=video.id, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+        if len(rows) >= 5000:
+            VideoSearchToken.objects.bulk_create(rows)
+            rows = []
+    VideoSearchToken.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_remove_video_core_video_is_acti_7b12ff_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=40)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='core.video')),
+            ],
+            options={
+                'unique_together': {('token', 'video')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_videosearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='video_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['is_active', '-views', '-id'], name='video_active_views_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:50
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_taxonomy_videos(apps, schema_editor):
+    Video = apps.get_model('core', 'Video')
+    for model_name, field, column in (('Category', 'category', 'category_id'), ('Tag', 'tags', 'tag_id')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Video, field).through
+        totals = dict(through.objects.values_list(column).annotate(count=Count('video_id')))
+        active = dict(
+            through.objects.filter(video__is_active=True).values_list(column).annotate(count=Count('video_id'))
+        )
+        rows = list(model.objects.all())
+        for row in rows:
+            row.video_count = totals.get(row.pk, 0)
+            row.active_video_count = active.get(row.pk, 0)
+        model.objects.bulk_update(rows, ['video_count', 'active_video_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_relatedvideo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='active_video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_taxonomy_videos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_taxonomy_video_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(db_index=True)),
+                ('score', models.FloatField()),
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='popularity', to='core.tag')),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+    ]
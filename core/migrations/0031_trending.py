@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_populartag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['is_active', '-trending_score', '-views', '-id'], name='video_active_trending_idx'),
+        ),
+        migrations.AddField(
+            model_name='videohourlystats',
+            name='video',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='core.video'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='videohourlystats',
+            unique_together={('video', 'hour')},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_videodailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoPlaybackStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('reached', models.PositiveIntegerField(default=0)),
+                ('watch_seconds', models.PositiveBigIntegerField(default=0)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playback_stats', to='core.video')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'unique_together': {('video', 'bucket')},
+            },
+        ),
+    ]
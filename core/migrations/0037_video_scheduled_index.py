@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['is_active', 'scheduled_publish_at'], name='video_scheduled_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_video_scheduled_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='codec',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='duration',
+            field=models.PositiveIntegerField(default=0, help_text='Duration in seconds'),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='height',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='mtime',
+            field=models.FloatField(default=0, help_text='File modification time (Unix seconds) when last scanned'),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='probed_at',
+            field=models.DateTimeField(blank=True, help_text='When duration, resolution and codec were read', null=True),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='width',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='mediaasset',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='mediaasset',
+            index=models.Index(fields=['mtime'], name='mediaasset_mtime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediaasset',
+            index=models.Index(fields=['size'], name='mediaasset_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediaasset',
+            index=models.Index(fields=['duration'], name='mediaasset_duration_idx'),
+        ),
+    ]
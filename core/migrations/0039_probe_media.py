@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_media_library_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='bitrate',
+            field=models.PositiveBigIntegerField(default=0, help_text='Bits per second'),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='fps',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('probe_media', 'Probe media'), ('extract_duration', 'Extract duration'), ('generate_thumbnail', 'Generate thumbnail')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_probe_media'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('probe_media', 'Probe media'), ('faststart', 'Move MP4 index to the front'), ('extract_duration', 'Extract duration'), ('generate_thumbnail', 'Generate thumbnail')], max_length=50),
+        ),
+    ]
@@ -1,10 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 import os
-import cv2
-from PIL import Image
 from django.core.files.base import ContentFile
-from io import BytesIO
+from .media import probe_media, render_thumbnail
 
 
 class User(AbstractUser):
@@ -60,6 +59,9 @@ class Category(models.Model):
 	slug = models.SlugField(max_length=140, unique=True)
 	description = models.TextField(blank=True, null=True, help_text="Category description for SEO")
 	image = models.ImageField(upload_to='categories/', blank=True, null=True, help_text="Optional category image")
+	# Maintained by core.taxonomy; rebuild with the recount_taxonomy command
+	video_count = models.PositiveIntegerField(default=0, editable=False)
+	active_video_count = models.PositiveIntegerField(default=0, editable=False)
 
 	class Meta:
 		ordering = ["name"]
@@ -72,6 +74,9 @@ class Tag(models.Model):
 	name = models.CharField(max_length=120, unique=True)
 	slug = models.SlugField(max_length=140, unique=True)
 	description = models.TextField(blank=True, null=True, help_text="Tag description for SEO")
+	# Maintained by core.taxonomy; rebuild with the recount_taxonomy command
+	video_count = models.PositiveIntegerField(default=0, editable=False)
+	active_video_count = models.PositiveIntegerField(default=0, editable=False)
 
 	class Meta:
 		ordering = ["name"]
@@ -88,11 +93,15 @@ class Video(models.Model):
 	category = models.ManyToManyField(Category, related_name='videos', blank=True)
 	tags = models.ManyToManyField(Tag, related_name='videos', blank=True)
 	video_file = models.FileField(upload_to='videos/', blank=True, null=True)
+	# Stored file and content hash, shared by videos with identical files
+	media_asset = models.ForeignKey('MediaAsset', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='videos')
 	thumbnail = models.ImageField(upload_to='thumbnails/', blank=True, null=True)
 	seo_title = models.CharField(max_length=255, blank=True)
 	seo_description = models.TextField(blank=True)
 	views = models.PositiveIntegerField(default=0)
 	likes = models.PositiveIntegerField(default=0)
+	# Time-decayed views/likes, recomputed by the compute_trending command
+	trending_score = models.FloatField(default=0, editable=False)
 	duration = models.PositiveIntegerField(default=0, help_text="Duration in seconds")
 	is_active = models.BooleanField(default=True, help_text="If checked, video will be visible on the site")
 	scheduled_publish_at = models.DateTimeField(blank=True, null=True, help_text="Schedule video to be published at this time")
@@ -100,6 +109,14 @@ class Video(models.Model):
 
 	class Meta:
 		ordering = ["-created_at"]
+		indexes = [
+			# Keyset pagination of the public listings
+			models.Index(fields=['is_active', '-created_at', '-id'], name='video_active_created_idx'),
+			models.Index(fields=['is_active', '-views', '-id'], name='video_active_views_idx'),
+			models.Index(fields=['is_active', '-trending_score', '-views', '-id'], name='video_active_trending_idx'),
+			# Next scheduled publish (core.tasks)
+			models.Index(fields=['is_active', 'scheduled_publish_at'], name='video_scheduled_idx'),
+		]
 
 	def __str__(self) -> str:
 		return self.title
@@ -145,26 +162,49 @@ class Video(models.Model):
 		else:
 			return "Draft"
 
+	def probe_media(self):
+		"""
+		Open the video file once to fill in its duration and, if missing, its
+		thumbnail (see core.media.probe_media). Returns the probe, or None.
+		"""
+		if not self.video_file:
+			return None
+		probe = probe_media(self.video_file.path, poster=not self.thumbnail)
+		if probe is not None:
+			self.apply_probe(probe)
+		return probe
+
+	def apply_probe(self, probe):
+		"""
+		Persist a probe result in a single update_fields save; the stream
+		details go on the video's media asset. Returns whether anything
+		was learned from the probe.
+		"""
+		update_fields = []
+		if probe.duration:
+			self.duration = int(probe.duration)
+			update_fields.append('duration')
+		if probe.poster and not self.thumbnail:
+			self.set_thumbnail(probe.poster)
+			update_fields.append('thumbnail')
+		if update_fields:
+			self.save(update_fields=update_fields)
+		if self.media_asset_id and probe.duration:
+			MediaAsset.objects.filter(pk=self.media_asset_id).update(
+				duration=int(probe.duration), width=probe.width, height=probe.height,
+				codec=probe.codec, fps=probe.fps, bitrate=probe.bitrate, probed_at=timezone.now(),
+			)
+		return bool(update_fields)
+
 	def extract_duration(self):
-		"""Extract duration from video file using OpenCV"""
+		"""Extract duration from the video's container header, or with OpenCV"""
 		if not self.video_file:
 			return False
 		
 		try:
-			# Open video file
-			video_path = self.video_file.path
-			cap = cv2.VideoCapture(video_path)
-			
-			# Get video properties
-			frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-			fps = cap.get(cv2.CAP_PROP_FPS)
-			cap.release()
-			
-			if fps > 0:
-				duration_seconds = int(frame_count / fps)
-				self.duration = duration_seconds
-				self.save(update_fields=['duration'])
-				return True
+			probe = probe_media(self.video_file.path, poster=False)
+			if probe is not None and probe.duration:
+				return self.apply_probe(probe)
 			
 		except Exception as e:
 			print(f"Error extracting duration: {e}")
@@ -177,56 +217,24 @@ class Video(models.Model):
 			return False
 		
 		try:
-			# Open video file
-			video_path = self.video_file.path
-			cap = cv2.VideoCapture(video_path)
-			
-			# Get video properties
-			frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-			fps = cap.get(cv2.CAP_PROP_FPS)
-			
-			# Calculate frame to extract (10% of video duration)
-			frame_to_extract = int(frame_count * 0.1)
-			cap.set(cv2.CAP_PROP_POS_FRAMES, frame_to_extract)
-			
-			# Read frame
-			ret, frame = cap.read()
-			cap.release()
-			
-			if not ret:
+			# Best scoring frame from 10% of the video on, as a 320x180 JPEG
+			thumbnail = render_thumbnail(self.video_file.path)
+			if thumbnail is None:
 				return False
 			
-			# Convert BGR to RGB
-			frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-			
-			# Convert to PIL Image
-			pil_image = Image.fromarray(frame_rgb)
-			
-			# Resize to standard thumbnail size (320x180 for 16:9 aspect ratio)
-			pil_image.thumbnail((320, 180), Image.Resampling.LANCZOS)
-			
-			# Save to BytesIO
-			thumb_io = BytesIO()
-			pil_image.save(thumb_io, format='JPEG', quality=85)
-			thumb_io.seek(0)
-			
-			# Generate filename
-			video_name = os.path.splitext(os.path.basename(self.video_file.name))[0]
-			thumb_filename = f"{video_name}_thumb.jpg"
-			
-			# Save thumbnail
-			self.thumbnail.save(
-				thumb_filename,
-				ContentFile(thumb_io.getvalue()),
-				save=False
-			)
-			
+			self.set_thumbnail(thumbnail)
 			return True
 			
 		except Exception as e:
 			print(f"Error generating thumbnail: {e}")
 			return False
 
+	def set_thumbnail(self, content):
+		"""Store JPEG bytes as the thumbnail (without saving the video)"""
+		video_name = os.path.splitext(os.path.basename(self.video_file.name))[0]
+		thumb_filename = f"{video_name}_thumb.jpg"
+		self.thumbnail.save(thumb_filename, ContentFile(content), save=False)
+
 	def get_thumbnail_url(self):
 		"""Get thumbnail URL if it exists"""
 		if self.thumbnail:
@@ -235,6 +243,156 @@ class Video(models.Model):
 		return None
 
 
+class MediaAsset(models.Model):
+	"""
+	A video file in storage, identified by the SHA-256 of its content.
+	Uploads with the same content link to the existing file instead of
+	storing another copy (see core.media_assets). The rows under videos/
+	double as the media library index, kept in sync with the directory by
+	an incremental scan keyed on size and mtime.
+	"""
+	file = models.CharField(max_length=255, unique=True, help_text="Name of the file in media storage")
+	size = models.PositiveBigIntegerField(default=0)
+	mtime = models.FloatField(default=0, help_text="File modification time (Unix seconds) when last scanned")
+	# Empty for a second copy of content already indexed under another name
+	sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True)
+	# Hash of the content as uploaded, for a file since rewritten in place
+	# (faststart), so re-uploads of the original still find it
+	source_sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+	duration = models.PositiveIntegerField(default=0, help_text="Duration in seconds")
+	width = models.PositiveIntegerField(default=0)
+	height = models.PositiveIntegerField(default=0)
+	codec = models.CharField(max_length=32, blank=True)
+	fps = models.FloatField(default=0)
+	bitrate = models.PositiveBigIntegerField(default=0, help_text="Bits per second")
+	probed_at = models.DateTimeField(null=True, blank=True, help_text="When duration, resolution and codec were read")
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['file']
+		indexes = [
+			# Media library sort orders
+			models.Index(fields=['mtime'], name='mediaasset_mtime_idx'),
+			models.Index(fields=['size'], name='mediaasset_size_idx'),
+			models.Index(fields=['duration'], name='mediaasset_duration_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.file} ({(self.sha256 or 'duplicate')[:12]})"
+
+	@property
+	def filename(self):
+		return os.path.basename(self.file)
+
+	@property
+	def size_mb(self):
+		return round(self.size / (1024 * 1024), 2)
+
+	@property
+	def resolution(self):
+		if self.width and self.height:
+			return f"{self.width}x{self.height}"
+		return ""
+
+	@property
+	def url(self):
+		from django.conf import settings
+		from urllib.parse import quote
+		return f"{settings.MEDIA_URL}{quote(self.file)}"
+
+
+class VideoSearchToken(models.Model):
+	"""Inverted search index: one row per (token, video) with a relevance weight"""
+	token = models.CharField(max_length=40)
+	video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='search_tokens')
+	weight = models.PositiveSmallIntegerField(default=1)
+
+	class Meta:
+		unique_together = [['token', 'video']]
+
+	def __str__(self):
+		return f"{self.token} -> {self.video_id} ({self.weight})"
+
+
+class RelatedVideo(models.Model):
+	"""Precomputed top-N related videos, scored by shared categories and tags"""
+	video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='related_entries')
+	related = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='+')
+	score = models.FloatField()
+
+	class Meta:
+		unique_together = [['video', 'related']]
+		indexes = [
+			models.Index(fields=['video', '-score'], name='related_video_score_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.video_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class VideoHourlyStats(models.Model):
+	"""Views and likes a video received in one hour, feeding the trending score"""
+	video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='hourly_stats')
+	hour = models.DateTimeField(db_index=True)
+	views = models.PositiveIntegerField(default=0)
+	likes = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		unique_together = [['video', 'hour']]
+
+	def __str__(self):
+		return f"{self.video_id} @ {self.hour:%Y-%m-%d %H:00}: {self.views} views, {self.likes} likes"
+
+
+class VideoDailyStats(models.Model):
+	"""Views, likes and comments a video received on one (local) day"""
+	video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='daily_stats')
+	date = models.DateField()
+	views = models.PositiveIntegerField(default=0)
+	likes = models.PositiveIntegerField(default=0)
+	comments = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		unique_together = [['video', 'date']]
+		ordering = ['date']
+
+	def __str__(self):
+		return f"{self.video_id} @ {self.date}: {self.views} views, {self.likes} likes, {self.comments} comments"
+
+
+class VideoPlaybackStats(models.Model):
+	"""
+	Playback histogram of a video, one row per tenth of its length.
+	``reached`` counts sessions that played into the segment (bucket 0 is
+	the number of plays, bucket 10 the number of completions) and
+	``watch_seconds`` the time spent watching it.
+	"""
+	video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='playback_stats')
+	bucket = models.PositiveSmallIntegerField()
+	reached = models.PositiveIntegerField(default=0)
+	watch_seconds = models.PositiveBigIntegerField(default=0)
+
+	class Meta:
+		unique_together = [['video', 'bucket']]
+		ordering = ['bucket']
+
+	def __str__(self):
+		return f"{self.video_id} [{self.bucket}]: {self.reached} reached, {self.watch_seconds}s watched"
+
+
+class PopularTag(models.Model):
+	"""Precomputed tag popularity ranking shown in the navbar"""
+	tag = models.OneToOneField(Tag, on_delete=models.CASCADE, related_name='popularity')
+	rank = models.PositiveIntegerField(db_index=True)
+	score = models.FloatField()
+
+	class Meta:
+		ordering = ['rank']
+
+	def __str__(self):
+		return f"#{self.rank} {self.tag_id} ({self.score:.3f})"
+
+
 class Comment(models.Model):
 	video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='comments')
 	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments', null=True, blank=True)
@@ -275,11 +433,9 @@ class Settings(models.Model):
 
 	@classmethod
 	def get_setting(cls, key, default=None):
-		"""Get a setting value by key"""
-		try:
-			return cls.objects.get(key=key).value
-		except cls.DoesNotExist:
-			return default
+		"""Get a setting value by key, coerced to the type of the default"""
+		from core.settings_registry import site_settings
+		return site_settings.get(key, default)
 
 	@classmethod
 	def set_setting(cls, key, value, description=""):
@@ -418,10 +574,8 @@ class Ad(models.Model):
 	@classmethod
 	def get_ad_by_placement_and_type(cls, placement, ad_type):
 		"""Get active ad by placement and ad_type"""
-		try:
-			return cls.objects.get(placement=placement, ad_type=ad_type, is_active=True)
-		except cls.DoesNotExist:
-			return None
+		from core.ads import ad_registry
+		return ad_registry.get(placement, ad_type)
 
 
 class DMCAReport(models.Model):
@@ -449,3 +603,130 @@ class DMCAReport(models.Model):
 	
 	def __str__(self):
 		return f"DMCA Report from {self.name} - {self.status} ({self.created_at.strftime('%Y-%m-%d')})"
+
+
+class UploadSession(models.Model):
+	"""
+	A resumable chunked upload. Chunks are written straight into a file
+	preallocated to ``file_size`` at ``chunk_number * chunk_size``, in any
+	order and in parallel; ``received`` is a bitmap of the chunks written so
+	far. The upload completes when the last missing chunk arrives.
+	"""
+	PURPOSE_CHOICES = [
+		('video', 'Video'),
+		('media_library', 'Media library'),
+	]
+	STATUS_CHOICES = [
+		('uploading', 'Uploading'),
+		('assembling', 'Assembling'),
+		('complete', 'Complete'),
+		('failed', 'Failed'),
+	]
+
+	upload_id = models.CharField(max_length=100, unique=True)
+	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+	purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES, default='video')
+	file_name = models.CharField(max_length=255)
+	file_size = models.PositiveBigIntegerField()
+	chunk_size = models.PositiveIntegerField()
+	total_chunks = models.PositiveIntegerField()
+	received = models.BinaryField(default=b'')
+	received_count = models.PositiveIntegerField(default=0)
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+	stored_name = models.CharField(max_length=255, blank=True)
+	video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		ordering = ['-created_at']
+
+	def __str__(self):
+		return f"{self.file_name} ({self.received_count}/{self.total_chunks} chunks, {self.status})"
+
+	def has_chunk(self, chunk_number):
+		bitmap = bytes(self.received or b'')
+		return chunk_number // 8 < len(bitmap) and bool(bitmap[chunk_number // 8] & (1 << chunk_number % 8))
+
+	def mark_chunk(self, chunk_number):
+		"""Set the chunk's bit; returns False if it was already set"""
+		bitmap = bytearray(bytes(self.received or b'').ljust((self.total_chunks + 7) // 8, b'\0'))
+		mask = 1 << chunk_number % 8
+		if bitmap[chunk_number // 8] & mask:
+			return False
+		bitmap[chunk_number // 8] |= mask
+		self.received = bytes(bitmap)
+		self.received_count += 1
+		return True
+
+	def missing_chunks(self):
+		return [i for i in range(self.total_chunks) if not self.has_chunk(i)]
+
+	def chunk_range(self, chunk_number):
+		"""Byte range [start, end) of a chunk"""
+		start = chunk_number * self.chunk_size
+		return start, min(start + self.chunk_size, self.file_size)
+
+	def missing_ranges(self):
+		"""Missing byte ranges as [start, end) pairs, adjacent chunks merged"""
+		ranges = []
+		for chunk_number in self.missing_chunks():
+			start, end = self.chunk_range(chunk_number)
+			if ranges and ranges[-1][1] == start:
+				ranges[-1][1] = end
+			else:
+				ranges.append([start, end])
+		return ranges
+
+	def uploaded_offset(self):
+		"""Bytes received contiguously from the start of the file"""
+		missing = self.missing_ranges()
+		return missing[0][0] if missing else self.file_size
+
+	@property
+	def is_complete(self):
+		return self.received_count >= self.total_chunks
+
+
+class Job(models.Model):
+	"""
+	A unit of background media processing on a video, run by the
+	run_workers command (see core.jobs). Failed jobs are retried with
+	exponential backoff until ``max_attempts`` is reached.
+	"""
+	KIND_CHOICES = [
+		('probe_media', 'Probe media'),
+		('faststart', 'Move MP4 index to the front'),
+		# Queued before one probe replaced them; run as probe_media
+		('extract_duration', 'Extract duration'),
+		('generate_thumbnail', 'Generate thumbnail'),
+	]
+	STATUS_CHOICES = [
+		('queued', 'Queued'),
+		('running', 'Running'),
+		('done', 'Done'),
+		('failed', 'Failed'),
+	]
+
+	kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+	video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='jobs')
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+	attempts = models.PositiveSmallIntegerField(default=0)
+	max_attempts = models.PositiveSmallIntegerField(default=5)
+	run_at = models.DateTimeField(default=timezone.now, help_text="Not run before this time")
+	locked_by = models.CharField(max_length=100, blank=True)
+	locked_at = models.DateTimeField(null=True, blank=True)
+	last_error = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	finished_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			# Claiming the next runnable jobs
+			models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.get_kind_display()} for video {self.video_id} ({self.status})"
+
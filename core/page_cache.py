@@ -0,0 +1,83 @@
+"""
+Full-page cache for anonymous visitors on the public listing pages.
+
+Cache keys embed a global catalog version. Saving or deleting anything that
+shows up on those pages (videos, categories, tags, ads, settings, CMS pages)
+bumps the version, so every cached page is invalidated at once and a publish
+is visible immediately instead of after the TTL.
+
+The version lives in the default cache; invalidation across worker processes
+therefore needs a shared cache backend (see ``CACHE_BACKEND`` in settings).
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def catalog_version():
+    """Current catalog version, initialised from the clock on first use"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # A timestamp never collides with versions from before a cache restart
+        cache.add(CATALOG_VERSION_KEY, int(time.time()), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every version-keyed cache entry"""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, int(time.time()), None)
+        return cache.get(CATALOG_VERSION_KEY)
+
+
+def is_cacheable_request(request):
+    """Only anonymous GET/HEAD requests without pending flash messages"""
+    return (
+        getattr(settings, 'PAGE_CACHE_ENABLED', True)
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and 'messages' not in request.COOKIES
+    )
+
+
+def page_cache_key(request):
+    query = request.GET.urlencode()
+    raw = f'{request.get_host()}{request.path}?{query}'
+    return f'page:{catalog_version()}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cache_public_page(view):
+    """Serve a view from the page cache for anonymous visitors"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+                cache.set(key, (response.content, response['Content-Type']), timeout)
+            response['X-Page-Cache'] = 'miss'
+
+        # Cached HTML has no per-visitor CSRF token; AJAX forms read the cookie
+        get_token(request)
+        return response
+    return wrapper
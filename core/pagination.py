@@ -0,0 +1,163 @@
+"""
+Keyset (cursor) pagination for the public video listings.
+
+Instead of ``OFFSET n`` the next page is fetched with a ``WHERE`` on the sort
+keys of the last row seen, e.g. ``(created_at, id) < (last_created_at,
+last_id)``, which stays an index range scan however deep the visitor goes.
+Next/previous links carry an opaque cursor token; plain ``?page=N`` links
+still work and are served with OFFSET. The "Page X of Y" total comes from a
+cached, approximate COUNT instead of a COUNT(*) on every request.
+"""
+
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+
+def encode_cursor(values, direction, number):
+    """Pack sort-key values into an opaque URL-safe token"""
+    payload = json.dumps({'v': values, 'd': direction, 'n': number}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a cursor token; returns None if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data['d'] not in ('next', 'prev') or not isinstance(data['v'], list):
+            return None
+        return data['v'], data['d'], max(1, int(data['n']))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def cached_count(queryset, timeout=None):
+    """COUNT(*) for a queryset, cached by its SQL for a few minutes"""
+    if timeout is None:
+        timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 300)
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    key = f'pagination:count:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class KeysetPage(Page):
+    """A page that knows its neighbours through cursor tokens"""
+
+    def __init__(self, object_list, number, paginator, has_next, has_previous):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return ''
+        return self.paginator.cursor_for(self.object_list[-1], 'next', self.number + 1)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return ''
+        return self.paginator.cursor_for(self.object_list[0], 'prev', self.number - 1)
+
+
+class KeysetPaginator(Paginator):
+    """
+    Paginate a queryset by its sort keys.
+
+    ``keys`` lists the ordering, e.g. ``('-created_at', '-id')``; the last key
+    must be unique so the ordering is total.
+    """
+
+    def __init__(self, object_list, per_page, keys):
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in keys]
+        super().__init__(object_list.order_by(*keys), per_page)
+
+    @property
+    def count(self):
+        return cached_count(self.object_list)
+
+    def cursor_for(self, obj, direction, number):
+        values = [getattr(obj, field) for field, _ in self.keys]
+        return encode_cursor(values, direction, number)
+
+    def _after(self, values, backwards):
+        """Q matching rows strictly after ``values`` in (reversed) key order"""
+        model = self.object_list.model
+        values = [model._meta.get_field(field).to_python(value) for (field, _), value in zip(self.keys, values)]
+        condition = Q()
+        for i, (field, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backwards else 'gt'
+            clause = Q(**{f'{field}__{lookup}': values[i]})
+            for j in range(i):
+                clause &= Q(**{self.keys[j][0]: values[j]})
+            condition |= clause
+        return condition
+
+    def _reversed_ordering(self):
+        return [field if descending else f'-{field}' for field, descending in self.keys]
+
+    def get_cursor_page(self, token):
+        """Return the page addressed by a cursor token (first page if invalid)"""
+        decoded = decode_cursor(token) if token else None
+        if decoded is None:
+            return self.get_page(1)
+        values, direction, number = decoded
+        if len(values) != len(self.keys):
+            return self.get_page(1)
+
+        try:
+            condition = self._after(values, backwards=(direction == 'prev'))
+        except Exception:
+            return self.get_page(1)
+
+        if direction == 'next':
+            rows = list(self.object_list.filter(condition)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            return KeysetPage(rows[:self.per_page], number, self, has_next, True)
+
+        rows = list(self.object_list.filter(condition).order_by(*self._reversed_ordering())[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        # Reaching the start of the list always means page one
+        return KeysetPage(rows, number if has_previous else 1, self, True, has_previous)
+
+    def get_page(self, number):
+        """Numbered page served with OFFSET; neighbours are linked by cursor"""
+        try:
+            number = max(1, int(number))
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        rows = list(self.object_list[offset:offset + self.per_page + 1])
+        if not rows and number > 1 and self.num_pages < number:
+            # Past the end: fall back to the last page by the cached count
+            return self.get_page(self.num_pages)
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], number, self, has_next, number > 1)
+
+
+def paginate(request, queryset, keys, per_page=20):
+    """Page a listing by ``?cursor=`` when present, else by ``?page=``"""
+    paginator = KeysetPaginator(queryset, per_page, keys)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,190 @@
+"""
+Playback beacons.
+
+The video player posts ``start``, ``progress`` and ``complete`` beacons to
+``playback_beacon``. The view only validates the payload and appends a tuple
+to a bounded in-memory ring buffer; a background thread periodically drains
+it and folds the beacons into ``VideoPlaybackStats`` with a handful of bulk
+``F()`` updates. If the buffer fills up between flushes the oldest beacons
+are dropped rather than slowing down requests.
+"""
+
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from core.counters import add_to_rollup
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ('start', 'progress', 'complete')
+SEGMENTS = 10
+# Bucket holding the number of sessions that played to the end
+COMPLETE_BUCKET = SEGMENTS
+# A single beacon cannot claim more watch time than this
+MAX_WATCHED_SECONDS = 120
+
+
+def parse_beacon(video_id, data):
+    """
+    Validate a beacon payload; returns the tuple stored in the buffer or
+    None. Expected keys: event, position and duration (seconds), watched
+    (seconds played since the previous beacon) and reached (segments 0-9
+    entered since the previous beacon).
+    """
+    try:
+        event = data['event']
+        if event not in EVENTS:
+            return None
+        position = float(data.get('position', 0))
+        duration = float(data.get('duration', 0))
+        watched = float(data.get('watched', 0))
+        segments = [float(segment) for segment in data.get('reached', ())]
+        # inf/nan would overflow int() below
+        if not all(math.isfinite(value) for value in (position, duration, watched, *segments)):
+            return None
+        if duration <= 0:
+            return None
+        position = max(0.0, position)
+        watched = min(MAX_WATCHED_SECONDS, max(0.0, watched))
+        reached = tuple(sorted({int(segment) for segment in segments if 0 <= segment < SEGMENTS}))
+        segment = int(min(SEGMENTS - 1, position / duration * SEGMENTS))
+    except (AttributeError, KeyError, TypeError, ValueError, OverflowError):
+        return None
+    return (video_id, event, segment, watched, reached)
+
+
+def aggregate_beacons(beacons):
+    """Fold beacons into {(video_id, bucket): {'reached': n, 'watch_seconds': s}}"""
+    deltas = defaultdict(Counter)
+    watched = defaultdict(float)
+    for video_id, event, segment, seconds, reached in beacons:
+        if event == 'start':
+            deltas[(video_id, 0)]['reached'] += 1
+        elif event == 'complete':
+            deltas[(video_id, COMPLETE_BUCKET)]['reached'] += 1
+        for bucket in reached:
+            # Entering the first segment is already counted by the start beacon
+            if bucket:
+                deltas[(video_id, bucket)]['reached'] += 1
+        watched[(video_id, segment)] += seconds
+    for key, seconds in watched.items():
+        if round(seconds):
+            deltas[key]['watch_seconds'] += round(seconds)
+    return deltas
+
+
+class PlaybackBeaconBuffer:
+    """
+    Bounded ring buffer of playback beacons with a background flusher thread.
+    """
+
+    def __init__(self):
+        self.beacons = deque(maxlen=self.capacity)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.thread = None
+        self.running = False
+
+    @property
+    def capacity(self):
+        return getattr(settings, 'PLAYBACK_BEACON_BUFFER_SIZE', 50000)
+
+    @property
+    def interval(self):
+        return getattr(settings, 'PLAYBACK_BEACON_FLUSH_INTERVAL', 30)
+
+    def record(self, beacon):
+        """Append a parsed beacon; starts the flusher on first use"""
+        with self.lock:
+            if len(self.beacons) == self.beacons.maxlen:
+                self.dropped += 1
+            self.beacons.append(beacon)
+        if not self.running:
+            self.start()
+
+    def take(self):
+        """Swap out the buffer and return its contents"""
+        with self.lock:
+            beacons, self.beacons = self.beacons, deque(maxlen=self.capacity)
+            if self.dropped:
+                logger.warning(f"Playback beacon buffer overflowed, dropped {self.dropped} beacon(s)")
+                self.dropped = 0
+        return beacons
+
+    def flush(self):
+        """Write buffered beacons to the playback histogram"""
+        from core.models import Video, VideoPlaybackStats
+
+        beacons = self.take()
+        if not beacons:
+            return 0
+
+        try:
+            deltas = aggregate_beacons(beacons)
+            # Beacons are not checked against the DB when received
+            known = set(Video.objects.filter(pk__in={video_id for video_id, _ in deltas}).values_list('pk', flat=True))
+            deltas = {key: metrics for key, metrics in deltas.items() if key[0] in known}
+            add_to_rollup(VideoPlaybackStats, 'bucket', deltas)
+            return len(beacons)
+        except Exception as e:
+            logger.error(f"Error flushing playback beacons: {e}")
+            with self.lock:
+                self.beacons.extendleft(reversed(beacons))
+            return 0
+        finally:
+            close_old_connections()
+
+    def start(self):
+        """Start the flusher in a background thread"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_flusher, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the flusher and write out whatever is left"""
+        self.running = False
+        self.flush()
+
+    def _run_flusher(self):
+        """Main flusher loop"""
+        while self.running:
+            time.sleep(self.interval)
+            self.flush()
+
+
+def playback_summary(video):
+    """Plays, completions, watch time and retention of a video from its histogram"""
+    rows = {bucket: (reached, seconds) for bucket, reached, seconds in
+            video.playback_stats.values_list('bucket', 'reached', 'watch_seconds')}
+    plays = rows.get(0, (0, 0))[0]
+    completions = rows.get(COMPLETE_BUCKET, (0, 0))[0]
+    watch_seconds = sum(seconds for _, seconds in rows.values())
+    return {
+        'plays': plays,
+        'completions': completions,
+        'completion_rate': round(completions / plays * 100, 2) if plays else 0,
+        'watch_seconds': watch_seconds,
+        'avg_watch_seconds': round(watch_seconds / plays, 1) if plays else 0,
+        # Share of plays that reached each tenth of the video
+        'retention': [
+            round(rows.get(bucket, (0, 0))[0] / plays * 100, 1) if plays else 0
+            for bucket in range(SEGMENTS)
+        ],
+        'watch_seconds_by_segment': [rows.get(bucket, (0, 0))[1] for bucket in range(SEGMENTS)],
+    }
+
+
+# Global playback beacon buffer instance
+playback_beacons = PlaybackBeaconBuffer()
+
+atexit.register(playback_beacons.stop)
@@ -0,0 +1,89 @@
+"""
+Popular tags ranking for the navbar.
+
+Tags are ranked by how many published videos use them. With
+``POPULAR_TAGS_HALF_LIFE_DAYS`` set, each video instead contributes
+``0.5 ** (age_days / half_life)``, so tags on recent uploads rise and tags
+that are only on old videos fade. The top ``POPULAR_TAGS_COUNT`` are stored
+in ``PopularTag`` by the ``compute_popular_tags`` command (run it
+periodically, or with ``--loop``) and served to templates from the cached
+site chrome snapshot.
+"""
+
+import heapq
+import math
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+# What the navbar needs of a tag
+PopularTagEntry = namedtuple('PopularTagEntry', ['name', 'slug', 'score'])
+
+
+def popular_tags_count():
+    return getattr(settings, 'POPULAR_TAGS_COUNT', 10)
+
+
+def score_tags(half_life_days=None, limit=None):
+    """Return [(score, tag_id)] for the best ``limit`` tags, best first"""
+    from core.models import Tag, Video
+
+    if half_life_days is None:
+        half_life_days = getattr(settings, 'POPULAR_TAGS_HALF_LIFE_DAYS', 0)
+    if limit is None:
+        limit = popular_tags_count()
+
+    if not half_life_days:
+        # The denormalized count is already the plain ranking
+        rows = (
+            Tag.objects.filter(active_video_count__gt=0)
+            .order_by('-active_video_count', 'name')
+            .values_list('active_video_count', 'pk')[:limit]
+        )
+        return [(float(count), tag_id) for count, tag_id in rows]
+
+    now = timezone.now()
+    decay = math.log(2) / (half_life_days * 86400)
+    scores = defaultdict(float)
+    rows = Video.tags.through.objects.filter(video__is_active=True).values_list('tag_id', 'video__created_at')
+    for tag_id, created_at in rows.iterator(chunk_size=5000):
+        age = max(0.0, (now - created_at).total_seconds())
+        scores[tag_id] += math.exp(-decay * age)
+    return heapq.nlargest(limit, ((score, tag_id) for tag_id, score in scores.items()))
+
+
+def compute_popular_tags(half_life_days=None, limit=None):
+    """Recompute and store the ranking; returns the number of tags ranked"""
+    from core.models import PopularTag
+
+    ranked = score_tags(half_life_days, limit)
+    with transaction.atomic():
+        PopularTag.objects.all().delete()
+        PopularTag.objects.bulk_create([
+            PopularTag(tag_id=tag_id, rank=rank, score=score)
+            for rank, (score, tag_id) in enumerate(ranked, start=1)
+        ])
+    return len(ranked)
+
+
+def load_popular_tags(limit=None):
+    """
+    Return the stored ranking as PopularTagEntry tuples. Before the first
+    compute_popular_tags run, fall back to the plain usage ranking.
+    """
+    from core.models import PopularTag, Tag
+
+    if limit is None:
+        limit = popular_tags_count()
+    rows = PopularTag.objects.values_list('tag__name', 'tag__slug', 'score')[:limit]
+    entries = [PopularTagEntry(*row) for row in rows]
+    if entries:
+        return entries
+    rows = (
+        Tag.objects.filter(active_video_count__gt=0)
+        .order_by('-active_video_count', 'name')
+        .values_list('name', 'slug', 'active_video_count')[:limit]
+    )
+    return [PopularTagEntry(name, slug, float(count)) for name, slug, count in rows]
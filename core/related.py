@@ -0,0 +1,263 @@
+"""
+Precomputed related videos.
+
+Two videos are related in proportion to the categories and tags they share,
+scored with a weighted Jaccard index over the taxonomy m2m tables:
+
+    score(a, b) = sum(w(t) for t in a & b) / sum(w(t) for t in a | b)
+
+Each term's weight is its type weight (categories count more than tags)
+times an IDF factor, so sharing a rare tag says more than sharing a huge
+category. The top ``RELATED_VIDEOS_COUNT`` matches for each video are stored
+in ``RelatedVideo`` and the video page reads them with one indexed lookup.
+
+``compute_related_videos`` rebuilds the whole table; taxonomy changes are
+applied incrementally in the background by ``related_updater``.
+"""
+
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_WEIGHT = 2.0
+TAG_WEIGHT = 1.0
+# Only the newest videos of a very large category/tag are scanned as candidates
+MAX_POSTINGS = 2000
+# Candidates kept for exact scoring in an incremental update
+MAX_CANDIDATES = 200
+
+
+def related_count():
+    return getattr(settings, 'RELATED_VIDEOS_COUNT', 12)
+
+
+def _through_models():
+    from core.models import Video
+    return (
+        ('c', Video.category.through, 'category_id', CATEGORY_WEIGHT),
+        ('t', Video.tags.through, 'tag_id', TAG_WEIGHT),
+    )
+
+
+def load_video_terms(video_ids=None, terms=None):
+    """
+    Return {video_id: {term}} for active videos, where a term is ('c', id)
+    for a category or ('t', id) for a tag. Optionally restricted to some
+    videos or to rows matching some terms.
+    """
+    video_terms = defaultdict(set)
+    for kind, through, column, _ in _through_models():
+        rows = through.objects.filter(video__is_active=True)
+        if video_ids is not None:
+            rows = rows.filter(video_id__in=video_ids)
+        if terms is not None:
+            rows = rows.filter(**{f'{column}__in': [term_id for k, term_id in terms if k == kind]})
+        for video_id, term_id in rows.values_list('video_id', column).iterator():
+            video_terms[video_id].add((kind, term_id))
+    return video_terms
+
+
+def load_document_frequencies(terms=None):
+    """Return {term: number of active videos carrying it}"""
+    doc_freq = {}
+    for kind, through, column, _ in _through_models():
+        rows = through.objects.filter(video__is_active=True)
+        if terms is not None:
+            rows = rows.filter(**{f'{column}__in': [term_id for k, term_id in terms if k == kind]})
+        for term_id, count in rows.values_list(column).annotate(count=Count('video_id')):
+            doc_freq[(kind, term_id)] = count
+    return doc_freq
+
+
+class TermWeights:
+    """Type weight x IDF for each taxonomy term"""
+
+    def __init__(self, doc_freq, total_videos):
+        self.doc_freq = doc_freq
+        self.total = max(1, total_videos)
+        self.base = {kind: weight for kind, _, _, weight in _through_models()}
+
+    def __call__(self, term):
+        df = self.doc_freq.get(term, 1)
+        return self.base[term[0]] * math.log(1 + self.total / df)
+
+    def total_weight(self, terms):
+        return sum(self(term) for term in terms)
+
+
+def score_candidates(video_id, terms, candidate_terms, weight, intersections):
+    """Turn intersection weights into weighted Jaccard scores"""
+    own_weight = weight.total_weight(terms)
+    scores = []
+    for candidate_id, shared in intersections.items():
+        union = own_weight + weight.total_weight(candidate_terms[candidate_id]) - shared
+        if union > 0:
+            scores.append((shared / union, candidate_id))
+    return heapq.nlargest(related_count(), scores)
+
+
+def write_related(video_id, scored):
+    """Replace the stored related list of one video"""
+    from core.models import RelatedVideo
+
+    with transaction.atomic():
+        RelatedVideo.objects.filter(video_id=video_id).delete()
+        RelatedVideo.objects.bulk_create([
+            RelatedVideo(video_id=video_id, related_id=related_id, score=score)
+            for score, related_id in scored
+        ])
+
+
+def rebuild_related_videos(batch_size=500):
+    """Recompute the related list of every active video"""
+    from core.models import RelatedVideo
+
+    video_terms = load_video_terms()
+    weight = TermWeights(load_document_frequencies(), len(video_terms))
+
+    # Postings: term -> newest videos carrying it
+    postings = defaultdict(list)
+    for video_id in sorted(video_terms, reverse=True):
+        for term in video_terms[video_id]:
+            if len(postings[term]) < MAX_POSTINGS:
+                postings[term].append(video_id)
+
+    RelatedVideo.objects.exclude(video_id__in=list(video_terms)).delete()
+
+    rows = []
+    batch_ids = []
+    for video_id, terms in video_terms.items():
+        intersections = defaultdict(float)
+        for term in terms:
+            term_weight = weight(term)
+            for candidate_id in postings[term]:
+                if candidate_id != video_id:
+                    intersections[candidate_id] += term_weight
+
+        for score, related_id in score_candidates(video_id, terms, video_terms, weight, intersections):
+            rows.append(RelatedVideo(video_id=video_id, related_id=related_id, score=score))
+
+        batch_ids.append(video_id)
+        if len(batch_ids) >= batch_size:
+            _replace_rows(batch_ids, rows)
+            rows, batch_ids = [], []
+    _replace_rows(batch_ids, rows)
+    return len(video_terms)
+
+
+def _replace_rows(video_ids, rows):
+    from core.models import RelatedVideo
+
+    with transaction.atomic():
+        RelatedVideo.objects.filter(video_id__in=video_ids).delete()
+        RelatedVideo.objects.bulk_create(rows, batch_size=1000)
+
+
+def compute_related_for_video(video_id, terms=None):
+    """Score the best matches of one active video; returns [(score, related_id)]"""
+    from core.models import Video
+
+    if terms is None:
+        terms = load_video_terms(video_ids=[video_id]).get(video_id)
+    if not terms:
+        return []
+
+    weight = TermWeights(load_document_frequencies(terms), Video.objects.filter(is_active=True).count())
+
+    intersections = defaultdict(float)
+    for candidate_id, candidate_terms in load_video_terms(terms=terms).items():
+        if candidate_id != video_id:
+            intersections[candidate_id] = sum(weight(term) for term in candidate_terms & terms)
+
+    best = dict(heapq.nlargest(MAX_CANDIDATES, intersections.items(), key=lambda item: item[1]))
+    candidate_terms = load_video_terms(video_ids=list(best))
+    weight.doc_freq.update(load_document_frequencies(set().union(*candidate_terms.values()) - terms))
+    return score_candidates(video_id, terms, candidate_terms, weight, best)
+
+
+def update_related_for_video(video_id):
+    """
+    Incrementally refresh one video after its taxonomy or status changed:
+    rebuild its own list, then offer it to the lists of its best matches
+    (the score is symmetric). Lists it drops out of are recomputed so they
+    don't stay a slot short.
+    """
+    from core.models import RelatedVideo
+
+    count = related_count()
+    terms = load_video_terms(video_ids=[video_id]).get(video_id)
+
+    listed_in = set(RelatedVideo.objects.filter(related_id=video_id).values_list('video_id', flat=True))
+    RelatedVideo.objects.filter(related_id=video_id).delete()
+    scored = compute_related_for_video(video_id, terms)
+    write_related(video_id, scored)
+
+    for score, related_id in scored:
+        current = list(
+            RelatedVideo.objects.filter(video_id=related_id).order_by('-score').values_list('pk', 'score')
+        )
+        if len(current) < count:
+            RelatedVideo.objects.create(video_id=related_id, related_id=video_id, score=score)
+            listed_in.discard(related_id)
+        elif current[-1][1] < score:
+            with transaction.atomic():
+                RelatedVideo.objects.filter(pk=current[-1][0]).delete()
+                RelatedVideo.objects.create(video_id=related_id, related_id=video_id, score=score)
+
+    # Lists the video left (or that lost a slot to it) pick their next best match
+    for related_id in listed_in:
+        write_related(related_id, compute_related_for_video(related_id))
+    return len(scored)
+
+
+class RelatedVideosUpdater:
+    """
+    Applies incremental related-video updates in a background thread.
+    Changes are debounced so a form save (categories, then tags) is one update.
+    """
+
+    def __init__(self, delay=2):
+        self.delay = delay
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.running = False
+
+    def schedule(self, video_id):
+        """Queue a video for an incremental update"""
+        with self.lock:
+            self.pending.add(video_id)
+            if not self.running:
+                self.running = True
+                self.thread = threading.Thread(target=self._run_updater, daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def _run_updater(self):
+        """Main updater loop"""
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            time.sleep(self.delay)
+            with self.lock:
+                video_ids, self.pending = self.pending, set()
+            for video_id in video_ids:
+                try:
+                    update_related_for_video(video_id)
+                except Exception as e:
+                    logger.error(f"Error updating related videos for {video_id}: {e}")
+            close_old_connections()
+
+
+# Global related-videos updater instance
+related_updater = RelatedVideosUpdater()
@@ -0,0 +1,134 @@
+"""
+Inverted search index for videos.
+
+Every video is broken into lowercase word tokens taken from its title, tags,
+categories, uploader name and description. Each (token, video) pair is stored
+once in ``VideoSearchToken`` with a weight reflecting where the word appeared,
+so a search is an indexed prefix lookup on the token column followed by a
+GROUP BY on video instead of a multi-way join with ``icontains``.
+"""
+
+import re
+import logging
+from collections import Counter
+from functools import reduce
+from operator import add
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 40
+MAX_QUERY_TERMS = 8
+
+# Relative importance of each field a token can come from
+FIELD_WEIGHTS = {
+    'title': 8,
+    'tags': 4,
+    'category': 4,
+    'uploader': 2,
+    'description': 1,
+}
+
+
+def tokenize(text):
+    """Split text into unique lowercase tokens, preserving first-seen order"""
+    if not text:
+        return []
+    seen = {}
+    for token in TOKEN_RE.findall(text.lower()):
+        if len(token) >= MIN_TOKEN_LENGTH:
+            seen.setdefault(token[:MAX_TOKEN_LENGTH], None)
+    return list(seen)
+
+
+def build_tokens(title='', description='', uploader='', categories=(), tags=()):
+    """Return a {token: weight} mapping for the given video fields"""
+    weights = Counter()
+    fields = {
+        'title': [title],
+        'description': [description],
+        'uploader': [uploader],
+        'category': list(categories),
+        'tags': list(tags),
+    }
+    for field, texts in fields.items():
+        tokens = set()
+        for text in texts:
+            tokens.update(tokenize(text))
+        for token in tokens:
+            weights[token] += FIELD_WEIGHTS[field]
+    return weights
+
+
+def index_videos(videos):
+    """
+    Rebuild index rows for the given videos.
+    Videos should have uploader selected and category/tags prefetched.
+    """
+    from core.models import VideoSearchToken
+
+    rows = []
+    video_ids = []
+    for video in videos:
+        video_ids.append(video.id)
+        weights = build_tokens(
+            title=video.title,
+            description=video.description,
+            uploader=video.uploader.name if video.uploader_id else '',
+            categories=[c.name for c in video.category.all()],
+            tags=[t.name for t in video.tags.all()],
+        )
+        rows.extend(
+            VideoSearchToken(video_id=video.id, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+
+    with transaction.atomic():
+        VideoSearchToken.objects.filter(video_id__in=video_ids).delete()
+        VideoSearchToken.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def reindex_videos(video_ids, batch_size=200):
+    """Reindex videos by id, in batches"""
+    from core.models import Video
+
+    video_ids = list(video_ids)
+    for start in range(0, len(video_ids), batch_size):
+        batch = video_ids[start:start + batch_size]
+        videos = Video.objects.filter(pk__in=batch).select_related('uploader').prefetch_related('category', 'tags')
+        index_videos(videos)
+
+
+def search_videos(query):
+    """
+    Return a queryset of {'video_id', 'score'} rows for active videos matching
+    every term of the query (each term as a word prefix), best match first and
+    newest first among equal scores.
+    """
+    from core.models import VideoSearchToken
+
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return VideoSearchToken.objects.none()
+
+    any_term = Q()
+    matched_terms = []
+    for term in terms:
+        any_term |= Q(token__startswith=term)
+        matched_terms.append(
+            Max(Case(When(token__startswith=term, then=1), default=0, output_field=IntegerField()))
+        )
+
+    return (
+        VideoSearchToken.objects
+        .filter(any_term, video__is_active=True)
+        .values('video_id')
+        .annotate(score=Sum('weight'), matched=reduce(add, matched_terms))
+        .filter(matched=len(terms))
+        .order_by('-score', '-video__created_at')
+    )
@@ -0,0 +1,118 @@
+"""
+Process-local registry of the editable site ``Settings``.
+
+All rows are loaded with one query and kept in a dict. A version number in
+the shared cache says when they changed; each lookup compares it with the
+version the dict was loaded at and reloads lazily on a mismatch. Saving or
+deleting a setting (``Settings.set_setting``, the dashboard, the admin)
+bumps the version, so every process picks up the change on its next lookup.
+
+Values are stored as text. ``get`` coerces them to the type of the default,
+so ``get('videos_per_page', 20)`` returns an int and
+``get('maintenance_mode', False)`` a bool.
+"""
+
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_VERSION_KEY = 'settings:version'
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', ''}
+
+
+def coerce(value, default):
+    """Convert a stored text value to the type of ``default``"""
+    if default is None or isinstance(default, str):
+        return value
+    try:
+        if isinstance(default, bool):
+            text = value.strip().lower()
+            if text in TRUE_VALUES:
+                return True
+            if text in FALSE_VALUES:
+                return False
+            return default
+        if isinstance(default, int):
+            return int(value.strip())
+        if isinstance(default, float):
+            return float(value.strip())
+        if isinstance(default, (list, tuple)):
+            return type(default)(item.strip() for item in value.split(',') if item.strip())
+    except (TypeError, ValueError):
+        logger.warning(f"Setting value {value!r} is not a valid {type(default).__name__}")
+        return default
+    return value
+
+
+def settings_version():
+    """Current settings version, initialised from the clock on first use"""
+    version = cache.get(SETTINGS_VERSION_KEY)
+    if version is None:
+        cache.add(SETTINGS_VERSION_KEY, int(time.time()), None)
+        version = cache.get(SETTINGS_VERSION_KEY)
+    return version
+
+
+def bump_settings_version():
+    """Make every process reload its settings on the next lookup"""
+    try:
+        cache.incr(SETTINGS_VERSION_KEY)
+    except ValueError:
+        cache.add(SETTINGS_VERSION_KEY, int(time.time()), None)
+
+
+class SettingsRegistry:
+    """All settings rows, reloaded when the shared version changes"""
+
+    def __init__(self):
+        self.values = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _current(self):
+        """Return the settings dict, reloading it if it is out of date"""
+        version = settings_version()
+        if version == self.version:
+            return self.values
+
+        from core.models import Settings
+
+        with self.lock:
+            if version != self.version:
+                self.values = dict(Settings.objects.values_list('key', 'value'))
+                self.version = version
+        return self.values
+
+    def get(self, key, default=None):
+        """Return a setting coerced to the type of ``default``"""
+        values = self._current()
+        if key not in values:
+            return default
+        return coerce(values[key], default)
+
+    def get_many(self, defaults):
+        """Return {key: value} for a {key: default} mapping with one version check"""
+        values = self._current()
+        return {
+            key: coerce(values[key], default) if key in values else default
+            for key, default in defaults.items()
+        }
+
+    def all(self):
+        """Return a copy of every setting as text"""
+        return dict(self._current())
+
+    def invalidate(self):
+        """Forget the loaded settings here and in every other process"""
+        self.version = None
+        bump_settings_version()
+
+
+# Global settings registry instance
+site_settings = SettingsRegistry()
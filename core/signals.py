@@ -1,53 +1,93 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.db import transaction
 from django.core.signals import request_started
-from .models import Video
+from .models import Video, Category, Tag, User, Ad, Settings, CMS, AgeVerification, MediaAsset
+from .search import reindex_videos
+from .related import related_updater
+from .page_cache import bump_catalog_version
+from .site_chrome import bump_chrome_version
+from .settings_registry import site_settings
+from .ads import ad_registry
+from . import jobs, media_assets, taxonomy
 import logging
 
 logger = logging.getLogger(__name__)
 
+@receiver(pre_save, sender=Video)
+def deduplicate_video_file(sender, instance, update_fields=None, **kwargs):
+    """
+    Link a newly uploaded video file to an identical stored file, if any,
+    instead of saving another copy
+    """
+    field_file = instance.video_file
+    if not field_file or (update_fields and 'video_file' not in update_fields):
+        return
+    try:
+        if not field_file._committed:
+            sha256 = media_assets.upload_sha256(field_file.file)
+            asset = media_assets.find_asset(sha256)
+            if asset is not None:
+                media_assets.link_to_asset(instance, asset)
+            else:
+                # Registered once the file is stored
+                instance._pending_content_hash = (sha256, field_file.file.size)
+        elif instance.media_asset_id is None or instance.media_asset.file != field_file.name:
+            # e.g. a file picked from the media library
+            instance.media_asset = MediaAsset.objects.filter(file=field_file.name).first()
+    except Exception as e:
+        logger.error(f"Error checking video {instance.title} for a duplicate file: {e}")
+
+
 @receiver(post_save, sender=Video)
-def extract_video_duration(sender, instance, created, **kwargs):
+def register_video_asset(sender, instance, **kwargs):
     """
-    Automatically extract video duration when a video is saved
+    Record the content hash of a video file stored by this save
     """
-    if instance.video_file and (created or not instance.duration):
-        try:
-            instance.extract_duration()
-        except Exception as e:
-            logger.error(f"Error extracting duration for video {instance.title}: {e}")
+    pending = instance.__dict__.pop('_pending_content_hash', None)
+    if not pending or not instance.video_file:
+        return
+    try:
+        asset, _ = media_assets.record_asset(instance.video_file.name, *pending)
+        if instance.media_asset_id != asset.pk:
+            instance.media_asset = asset
+            Video.objects.filter(pk=instance.pk).update(media_asset=asset)
+    except Exception as e:
+        logger.error(f"Error registering file of video {instance.title}: {e}")
+
 
 @receiver(post_save, sender=Video)
-def generate_video_thumbnail(sender, instance, created, update_fields, **kwargs):
-    """
-    Automatically generate thumbnail when a video is created and no thumbnail exists
-    """
-    logger.info(f"=== SIGNAL FIRED for video: {instance.title} ===")
-    logger.info(f"created={created}, update_fields={update_fields}")
-    logger.info(f"Has thumbnail: {bool(instance.thumbnail)}")
-    logger.info(f"Has video_file: {bool(instance.video_file)}")
-    
-    # Don't generate if thumbnail is being explicitly saved
-    if update_fields and 'thumbnail' in update_fields:
-        logger.info("SKIP: thumbnail in update_fields")
-        return
-    
-    # Don't generate if thumbnail already exists (user provided one)
-    if instance.thumbnail:
-        logger.info("SKIP: thumbnail already exists")
-        return
-    
-    # Only generate for newly created videos with video files
-    if created and instance.video_file:
-        logger.info("GENERATING thumbnail...")
-        try:
-            if instance.generate_thumbnail():
-                instance.save(update_fields=['thumbnail'])
-                logger.info(f"Generated thumbnail for video {instance.title}")
-        except Exception as e:
-            logger.error(f"Error generating thumbnail for video {instance.title}: {e}")
-    else:
-        logger.info(f"SKIP: created={created}, has_video_file={bool(instance.video_file)}")
+def probe_video_media(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Queue one media probe for a video missing its duration or, when just
+    created, its thumbnail
+    """
+    if not instance.video_file or (update_fields and 'video_file' not in update_fields):
+        return
+    # A video linked to an already known file gets both from there
+    if not instance.duration or (created and not instance.thumbnail):
+        jobs.enqueue('probe_media', instance)
+
+@receiver(pre_save, sender=Video)
+def remember_video_file(sender, instance, update_fields=None, **kwargs):
+    """
+    Remember the stored file name so post_save can tell whether it changed
+    """
+    instance._old_video_file = None
+    if not instance.pk or (update_fields and 'video_file' not in update_fields):
+        return
+    instance._old_video_file = Video.objects.filter(pk=instance.pk).values_list('video_file', flat=True).first()
+
+
+@receiver(post_save, sender=Video)
+def faststart_video_file(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Queue moving the MP4 index to the front of a newly stored video file
+    """
+    if not instance.video_file or (update_fields and 'video_file' not in update_fields):
+        return
+    if created or getattr(instance, '_old_video_file', None) != instance.video_file.name:
+        jobs.enqueue('faststart', instance)
 
 @receiver(request_started)
 def ensure_scheduler_running(sender, **kwargs):
@@ -59,3 +99,279 @@ def ensure_scheduler_running(sender, **kwargs):
         start_video_scheduler()
     except Exception as e:
         logger.error(f"Failed to start video scheduler: {e}")
+
+@receiver(post_save, sender=Video)
+def wake_video_scheduler(sender, instance, update_fields, **kwargs):
+    """
+    Let the scheduler recompute its next wakeup when a publish time is set
+    """
+    if instance.is_active or not instance.scheduled_publish_at:
+        return
+    if update_fields and 'scheduled_publish_at' not in update_fields:
+        return
+    from .tasks import scheduler
+    transaction.on_commit(scheduler.notify)
+
+
+# Search index maintenance
+SEARCH_INDEXED_FIELDS = {'title', 'description', 'uploader'}
+
+
+@receiver(post_save, sender=Video)
+def index_video_for_search(sender, instance, update_fields, **kwargs):
+    """
+    Reindex a video when one of its searchable fields may have changed
+    """
+    if update_fields and not SEARCH_INDEXED_FIELDS.intersection(update_fields):
+        return
+    try:
+        reindex_videos([instance.pk])
+    except Exception as e:
+        logger.error(f"Error indexing video {instance.pk} for search: {e}")
+
+
+@receiver(m2m_changed, sender=Video.category.through)
+@receiver(m2m_changed, sender=Video.tags.through)
+def index_video_taxonomy_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Reindex videos whose categories or tags were added, removed or cleared
+    """
+    if action == 'pre_clear' and reverse:
+        # pk_set is not provided for clear, remember the affected videos
+        instance._cleared_video_ids = list(instance.videos.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        video_ids = [instance.pk]
+    elif action == 'post_clear':
+        video_ids = getattr(instance, '_cleared_video_ids', [])
+    else:
+        video_ids = pk_set or []
+
+    try:
+        reindex_videos(video_ids)
+    except Exception as e:
+        logger.error(f"Error reindexing videos after taxonomy change: {e}")
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Tag)
+@receiver(pre_save, sender=User)
+def remember_indexed_name(sender, instance, update_fields, **kwargs):
+    """
+    Remember the stored name so post_save can tell whether it changed
+    """
+    instance._search_old_name = None
+    if not instance.pk or (update_fields and 'name' not in update_fields):
+        return
+    instance._search_old_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=User)
+def index_renamed_videos(sender, instance, created, **kwargs):
+    """
+    Reindex the videos of a renamed category, tag or uploader
+    """
+    old_name = getattr(instance, '_search_old_name', None)
+    if created or old_name is None or old_name == instance.name:
+        return
+    try:
+        reindex_videos(instance.videos.values_list('pk', flat=True))
+    except Exception as e:
+        logger.error(f"Error reindexing videos for renamed {sender.__name__} {instance.pk}: {e}")
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def remember_taxonomy_videos(sender, instance, **kwargs):
+    """
+    Remember the videos of a category or tag before its m2m rows are deleted
+    """
+    instance._search_video_ids = list(instance.videos.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def index_taxonomy_delete(sender, instance, **kwargs):
+    """
+    Reindex the videos of a deleted category or tag
+    """
+    try:
+        reindex_videos(getattr(instance, '_search_video_ids', []))
+    except Exception as e:
+        logger.error(f"Error reindexing videos for deleted {sender.__name__}: {e}")
+
+
+# Related videos maintenance
+@receiver(m2m_changed, sender=Video.category.through)
+@receiver(m2m_changed, sender=Video.tags.through)
+def update_related_on_taxonomy_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Queue an incremental related-videos update for videos whose taxonomy changed
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        video_ids = [instance.pk]
+    elif action == 'post_clear':
+        video_ids = getattr(instance, '_cleared_video_ids', [])
+    else:
+        video_ids = pk_set or []
+    for video_id in video_ids:
+        related_updater.schedule(video_id)
+
+
+@receiver(pre_save, sender=Video)
+def remember_video_status(sender, instance, update_fields=None, **kwargs):
+    """
+    Remember the stored is_active so post_save can tell whether it changed
+    """
+    instance._old_is_active = None
+    if not instance.pk or (update_fields and 'is_active' not in update_fields):
+        return
+    instance._old_is_active = Video.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+
+
+@receiver(post_save, sender=Video)
+def update_related_on_status_change(sender, instance, created, update_fields, **kwargs):
+    """
+    Queue an incremental related-videos update when a video is published or hidden
+    """
+    if created or (update_fields and 'is_active' not in update_fields):
+        return
+    old_is_active = getattr(instance, '_old_is_active', None)
+    if old_is_active is not None and old_is_active == instance.is_active:
+        # e.g. a title edit; taxonomy changes are handled by the m2m receiver
+        return
+    related_updater.schedule(instance.pk)
+
+
+# Taxonomy video counts
+@receiver(m2m_changed, sender=Video.category.through)
+@receiver(m2m_changed, sender=Video.tags.through)
+def recount_taxonomy_on_link_change(sender, instance, action, reverse, pk_set, model, **kwargs):
+    """
+    Recount the categories or tags whose video links changed
+    """
+    if action == 'pre_clear' and not reverse:
+        # pk_set is not provided for clear, remember the affected categories/tags
+        instance._cleared_taxonomy_ids = list(model.objects.filter(videos=instance).values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    try:
+        if reverse:
+            taxonomy.recount(type(instance), [instance.pk])
+        elif action == 'post_clear':
+            taxonomy.recount(model, getattr(instance, '_cleared_taxonomy_ids', []))
+        else:
+            taxonomy.recount(model, pk_set or [])
+    except Exception as e:
+        logger.error(f"Error recounting {model.__name__} videos: {e}")
+
+
+@receiver(post_save, sender=Video)
+def recount_taxonomy_on_status_change(sender, instance, created, update_fields, **kwargs):
+    """
+    Recount active videos of a video's categories and tags when it is published or hidden
+    """
+    if created or (update_fields and 'is_active' not in update_fields):
+        return
+    old_is_active = getattr(instance, '_old_is_active', None)
+    if old_is_active is not None and old_is_active == instance.is_active:
+        return
+    try:
+        taxonomy.recount_for_videos([instance.pk])
+    except Exception as e:
+        logger.error(f"Error recounting taxonomy for video {instance.pk}: {e}")
+
+
+@receiver(pre_delete, sender=Video)
+def remember_video_taxonomy(sender, instance, **kwargs):
+    """
+    Remember a video's categories and tags before its m2m rows are deleted
+    """
+    instance._taxonomy_ids = taxonomy.taxonomy_ids_for_video(instance)
+
+
+@receiver(post_delete, sender=Video)
+def recount_taxonomy_on_video_delete(sender, instance, **kwargs):
+    """
+    Recount the categories and tags a deleted video belonged to
+    """
+    try:
+        for model, ids in getattr(instance, '_taxonomy_ids', {}).items():
+            taxonomy.recount(model, ids)
+    except Exception as e:
+        logger.error(f"Error recounting taxonomy for deleted video {instance.pk}: {e}")
+
+
+# Page cache invalidation
+CATALOG_MODELS = (Video, Category, Tag, Ad, Settings, CMS, AgeVerification)
+# Counter-only video saves do not change what the cached pages list
+COUNTER_FIELDS = {'views', 'likes'}
+
+
+def invalidate_page_cache(sender, update_fields=None, **kwargs):
+    """
+    Bump the catalog version whenever public page content changes, once
+    the change is committed (a page cached before then would hold the old
+    rows under the new version)
+    """
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+    transaction.on_commit(bump_catalog_version)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Video.category.through)
+@receiver(m2m_changed, sender=Video.tags.through)
+def invalidate_page_cache_on_taxonomy_change(sender, action, **kwargs):
+    """
+    Bump the catalog version when video categories or tags change
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_catalog_version)
+
+
+# Site chrome invalidation
+CHROME_MODELS = (CMS, Settings, AgeVerification, Tag)
+
+
+def invalidate_site_chrome(sender, **kwargs):
+    """
+    Drop the cached layout snapshot once a change to one of its sources is committed
+    """
+    transaction.on_commit(bump_chrome_version)
+
+
+for model in CHROME_MODELS:
+    post_save.connect(invalidate_site_chrome, sender=model, dispatch_uid=f'site_chrome_save_{model.__name__}')
+    post_delete.connect(invalidate_site_chrome, sender=model, dispatch_uid=f'site_chrome_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def invalidate_settings_registry(sender, **kwargs):
+    """
+    Reload settings in every process once the change is committed
+    """
+    transaction.on_commit(site_settings.invalidate)
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+def invalidate_ad_registry(sender, **kwargs):
+    """
+    Recompile the ad lookup in every process once the change is committed
+    """
+    transaction.on_commit(ad_registry.invalidate)
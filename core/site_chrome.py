@@ -0,0 +1,125 @@
+"""
+Site chrome snapshot.
+
+Everything the shared page layout needs (navbar/footer CMS links, site
+settings, the age verification modal and popular tags) is built into one
+snapshot, kept per process and in the shared cache under a version
+number. post_save/post_delete on the source models bump the version, so
+a rendered page costs no queries for its chrome. Settings come from the
+settings registry and its version is part of the snapshot key; ads come
+from the ad registry (core.ads).
+"""
+
+import logging
+import time
+from types import MappingProxyType
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.popular_tags import load_popular_tags
+from core.settings_registry import settings_version, site_settings
+
+logger = logging.getLogger(__name__)
+
+CHROME_VERSION_KEY = 'site_chrome:version'
+CHROME_TIMEOUT = 60 * 60 * 24
+
+# Settings shown in the layout, with their fallback values
+CHROME_SETTINGS = {
+    'site_title': 'Desi Sexy Videos',
+    'site_description': 'Your premier destination for high-quality video content',
+    'contact_email': '',
+    'contact_phone': '',
+    'social_facebook': '',
+    'social_twitter': '',
+    'social_instagram': '',
+    'footer_text': 'Made with ❤️ for video lovers',
+    'meta_verification_script': '',
+}
+
+_process = {'version': None, 'chrome': None}
+
+
+def chrome_version():
+    """Current chrome version, initialised from the clock on first use"""
+    version = cache.get(CHROME_VERSION_KEY)
+    if version is None:
+        cache.add(CHROME_VERSION_KEY, int(time.time()), None)
+        version = cache.get(CHROME_VERSION_KEY)
+    return version
+
+
+def bump_chrome_version():
+    """Invalidate the chrome snapshot in every process"""
+    try:
+        cache.incr(CHROME_VERSION_KEY)
+    except ValueError:
+        cache.add(CHROME_VERSION_KEY, int(time.time()), None)
+
+
+def build_site_chrome():
+    """
+    Query everything the layout needs. Returns (chrome, complete) where
+    complete is False if a section failed and fell back to defaults.
+    """
+    from core.models import CMS, AgeVerification, Tag
+
+    chrome = {}
+    complete = True
+
+    try:
+        # Navbar and footer links in one query, split in Python
+        pages = list(CMS.objects.filter(Q(in_navbar=True) | Q(in_footer=True), is_active=True).order_by('title'))
+        chrome['navbar_pages'] = tuple(page for page in pages if page.in_navbar)
+        chrome['footer_pages'] = tuple(page for page in pages if page.in_footer)
+    except Exception as e:
+        logger.error(f"Error getting CMS pages: {e}")
+        chrome['navbar_pages'] = chrome['footer_pages'] = ()
+        complete = False
+
+    try:
+        chrome.update(site_settings.get_many(CHROME_SETTINGS))
+    except Exception as e:
+        logger.error(f"Error getting settings: {e}")
+        chrome.update(CHROME_SETTINGS)
+        complete = False
+
+    try:
+        chrome['age_verification'] = AgeVerification.get_active()
+    except Exception as e:
+        logger.error(f"Error getting age verification: {e}")
+        chrome['age_verification'] = None
+        complete = False
+
+    try:
+        chrome['popular_tags'] = tuple(load_popular_tags())
+        chrome['tags_count'] = Tag.objects.count()
+        chrome['more_tags_count'] = max(0, chrome['tags_count'] - len(chrome['popular_tags']))
+    except Exception as e:
+        logger.error(f"Error getting tags: {e}")
+        chrome['popular_tags'] = ()
+        chrome['tags_count'] = chrome['more_tags_count'] = 0
+        complete = False
+
+    return chrome, complete
+
+
+def get_site_chrome():
+    """Return the current chrome snapshot as a read-only mapping"""
+    version = (chrome_version(), settings_version())
+    if _process['version'] == version and _process['chrome'] is not None:
+        return _process['chrome']
+
+    key = 'site_chrome:{}:{}'.format(*version)
+    chrome = cache.get(key)
+    if chrome is None:
+        chrome, complete = build_site_chrome()
+        if not complete:
+            # Don't pin a partial snapshot; try again on the next request
+            return MappingProxyType(chrome)
+        cache.set(key, chrome, CHROME_TIMEOUT)
+
+    snapshot = MappingProxyType(chrome)
+    _process.update(version=version, chrome=snapshot)
+    return snapshot
@@ -1,5 +1,6 @@
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
+from django.db.models import Max, Q
 from .models import Video, Category, Tag, CMS
 
 
@@ -22,10 +23,12 @@ class CategorySitemap(Sitemap):
     priority = 0.6
     
     def items(self):
-        return Category.objects.all()
+        return Category.objects.annotate(
+            last_video_at=Max('videos__created_at', filter=Q(videos__is_active=True))
+        )
     
     def lastmod(self, obj):
-        return obj.videos.filter(is_active=True).order_by('-created_at').first().created_at if obj.videos.filter(is_active=True).exists() else None
+        return obj.last_video_at
     
     def location(self, obj):
         return reverse('categories') + f'?category={obj.slug}'
@@ -36,10 +39,12 @@ class TagSitemap(Sitemap):
     priority = 0.5
     
     def items(self):
-        return Tag.objects.all()
+        return Tag.objects.annotate(
+            last_video_at=Max('videos__created_at', filter=Q(videos__is_active=True))
+        )
     
     def lastmod(self, obj):
-        return obj.videos.filter(is_active=True).order_by('-created_at').first().created_at if obj.videos.filter(is_active=True).exists() else None
+        return obj.last_video_at
     
     def location(self, obj):
         return reverse('tags') + f'?tag={obj.slug}'
@@ -1,74 +1,206 @@
-from django.utils import timezone
-from core.models import Video
+"""
+Scheduled publishing.
+
+Every process starts a ``VideoScheduler`` thread (from ``CoreConfig.ready``
+and the ``request_started`` signal), but only one of them in the whole
+cluster publishes: the one holding a database advisory lock
+(``GET_LOCK`` on MySQL). The lock belongs to the leader's database
+connection, so if that process dies the server releases it and one of the
+other processes, which keep retrying every ``VIDEO_SCHEDULER_LEADER_RETRY``
+seconds, takes over.
+
+The leader doesn't poll on a fixed tick: it reads the next
+``scheduled_publish_at`` and sleeps until then, publishing everything due
+with one bulk UPDATE. Scheduling a video in the leader's process wakes it
+early; schedules made in other processes are picked up within
+``VIDEO_SCHEDULER_MAX_SLEEP`` seconds.
+
+A bulk UPDATE skips the Video post_save signals, so ``publish_scheduled_videos``
+applies their effects itself: taxonomy recounts, related-video updates and
+the page cache and site chrome versions.
+"""
+
 import logging
 import threading
-import time
-from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import Video
+from core.page_cache import bump_catalog_version
+from core.related import related_updater
+from core.site_chrome import bump_chrome_version
+from core import taxonomy
 
 logger = logging.getLogger(__name__)
 
-def publish_scheduled_videos():
+
+def scheduler_max_sleep():
+    return getattr(settings, 'VIDEO_SCHEDULER_MAX_SLEEP', 30)
+
+
+def scheduler_leader_retry():
+    return getattr(settings, 'VIDEO_SCHEDULER_LEADER_RETRY', 30)
+
+
+def scheduled_videos():
+    """Unpublished videos with a publish time"""
+    return Video.objects.filter(is_active=False, scheduled_publish_at__isnull=False)
+
+
+def publish_scheduled_videos(now=None):
     """
-    Task to publish videos that are scheduled for release.
-    This function checks for videos that should be published now.
+    Publish every video whose scheduled time has come with one UPDATE.
+    Returns the ids of the published videos.
     """
-    now = timezone.now()
-    
-    # Find videos that are scheduled and ready to be published
-    scheduled_videos = Video.objects.filter(
-        is_active=False,
-        scheduled_publish_at__isnull=False,
-        scheduled_publish_at__lte=now
-    )
-    
-    published_count = 0
-    
-    for video in scheduled_videos:
-        try:
-            video.is_active = True
-            # Keep scheduled_publish_at to preserve the scheduled date for display
-            video.save()
-            
-            published_count += 1
-            logger.info(f'Published scheduled video: {video.title} (ID: {video.id})')
-            
-        except Exception as e:
-            logger.error(f'Error publishing video {video.title} (ID: {video.id}): {str(e)}')
-    
-    return f'Published {published_count} video(s)'
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Keep scheduled_publish_at to preserve the scheduled date for display
+        video_ids = list(
+            scheduled_videos().filter(scheduled_publish_at__lte=now)
+            .select_for_update().values_list('pk', flat=True)
+        )
+        if video_ids:
+            Video.objects.filter(pk__in=video_ids).update(is_active=True)
+    if not video_ids:
+        return []
+
+    # What the post_save signals would have done for each video
+    try:
+        taxonomy.recount_for_videos(video_ids)
+    except Exception as e:
+        logger.error(f'Error recounting taxonomy for published videos: {e}')
+    for video_id in video_ids:
+        related_updater.schedule(video_id)
+    bump_catalog_version()
+    # The popular tags fallback ranks by active video count
+    bump_chrome_version()
+
+    logger.info(f'Published {len(video_ids)} scheduled video(s): {video_ids}')
+    return video_ids
+
+
+def next_publish_at():
+    """When the next scheduled video is due, or None"""
+    return scheduled_videos().aggregate(next=Min('scheduled_publish_at'))['next']
+
+
+def scheduler_lock_name():
+    # Advisory locks are server-wide, so qualify the name with the database
+    return f"{connection.settings_dict['NAME']}:video_scheduler"[-64:]
+
+
+def acquire_leader_lock():
+    """
+    Try to take the scheduler lock on this thread's connection without
+    waiting. Databases without advisory locks run a single process, which
+    is always the leader.
+    """
+    if connection.vendor != 'mysql':
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT GET_LOCK(%s, 0)', [scheduler_lock_name()])
+        return cursor.fetchone()[0] == 1
+
+
+def holds_leader_lock():
+    """Whether this thread's connection still holds the lock"""
+    if connection.vendor != 'mysql':
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT IS_USED_LOCK(%s) = CONNECTION_ID()', [scheduler_lock_name()])
+        return cursor.fetchone()[0] == 1
+
+
+def release_leader_lock():
+    if connection.vendor != 'mysql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT RELEASE_LOCK(%s)', [scheduler_lock_name()])
+
+
+def leader_connection_id():
+    """Database connection id of the current leader, or None"""
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT IS_USED_LOCK(%s)', [scheduler_lock_name()])
+        return cursor.fetchone()[0]
+
 
 class VideoScheduler:
     """
-    A simple video scheduler that runs in a background thread.
-    This replaces the need for external task queues.
+    Background thread publishing scheduled videos, active only in the
+    process elected leader (see the module docstring)
     """
     def __init__(self):
         self.running = False
+        self.is_leader = False
         self.thread = None
-    
+        self.wakeup = threading.Event()
+
     def start(self):
         """Start the scheduler in a background thread"""
         if not self.running:
             self.running = True
             self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
             self.thread.start()
-    
+
     def stop(self):
         """Stop the scheduler"""
         self.running = False
+        self.wakeup.set()
         if self.thread:
             self.thread.join()
-    
+
+    def notify(self):
+        """A schedule changed; recompute the next wakeup"""
+        self.wakeup.set()
+
     def _run_scheduler(self):
         """Main scheduler loop"""
         while self.running:
             try:
-                # Check for videos to publish every 10 seconds
-                publish_scheduled_videos()
-                time.sleep(10)
+                timeout = self._step()
             except Exception as e:
-                logger.error(f"Scheduler error: {e}")
-                time.sleep(60)  # Wait longer on error
+                logger.error(f'Scheduler error: {e}')
+                self._step_down()
+                timeout = 60  # Wait longer on error
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+        if self.is_leader:
+            try:
+                release_leader_lock()
+            except Exception:
+                pass
+            self._step_down()
+
+    def _step(self):
+        """Publish what is due if leader; returns seconds to sleep"""
+        if self.is_leader and not holds_leader_lock():
+            logger.warning('Video scheduler lost its leader lock')
+            self._step_down()
+        if not self.is_leader:
+            if not acquire_leader_lock():
+                # Keep the connection for the next try
+                return scheduler_leader_retry()
+            self.is_leader = True
+            logger.info('Video scheduler elected leader')
+
+        publish_scheduled_videos()
+        next_at = next_publish_at()
+        if next_at is None:
+            return scheduler_max_sleep()
+        delay = (next_at - timezone.now()).total_seconds()
+        return min(max(delay, 1), scheduler_max_sleep())
+
+    def _step_down(self):
+        self.is_leader = False
+        # Closing the connection releases any lock it held
+        connection.close()
+
 
 # Global scheduler instance
 scheduler = VideoScheduler()
@@ -81,4 +213,4 @@ def start_video_scheduler():
 def stop_video_scheduler():
     """Stop the video scheduler"""
     if scheduler.running:
-        scheduler.stop()
\ No newline at end of file
+        scheduler.stop()
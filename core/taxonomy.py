@@ -0,0 +1,75 @@
+"""
+Denormalized video counts on categories and tags.
+
+``Category`` and ``Tag`` carry ``video_count`` (all linked videos) and
+``active_video_count`` (published videos only) so listings can show and sort
+by them without a COUNT per row. The columns are recomputed from the m2m
+tables for just the affected rows whenever links change, a video is
+published or hidden, or a video is deleted (see core.signals);
+``recount_taxonomy`` rebuilds them all.
+"""
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _taxonomy_models():
+    from core.models import Category, Tag, Video
+    return (
+        (Category, Video.category.through, 'category_id'),
+        (Tag, Video.tags.through, 'tag_id'),
+    )
+
+
+def _count_subquery(through, column, active_only):
+    rows = through.objects.filter(**{column: OuterRef('pk')})
+    if active_only:
+        rows = rows.filter(video__is_active=True)
+    counts = rows.order_by().values(column).annotate(count=Count('video_id')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def recount(model, ids=None):
+    """
+    Recompute the counts of some (or all) rows of Category or Tag with one
+    UPDATE. Returns the number of rows updated.
+    """
+    for taxonomy, through, column in _taxonomy_models():
+        if taxonomy is model:
+            break
+    else:
+        raise ValueError(f"{model.__name__} has no video counts")
+
+    rows = model.objects.all()
+    if ids is not None:
+        ids = [pk for pk in ids if pk is not None]
+        if not ids:
+            return 0
+        rows = rows.filter(pk__in=ids)
+    return rows.update(
+        video_count=_count_subquery(through, column, active_only=False),
+        active_video_count=_count_subquery(through, column, active_only=True),
+    )
+
+
+def recount_for_videos(video_ids):
+    """Recompute the counts of every category and tag linked to some videos"""
+    video_ids = list(video_ids)
+    if not video_ids:
+        return
+    for taxonomy, through, column in _taxonomy_models():
+        ids = set(through.objects.filter(video_id__in=video_ids).values_list(column, flat=True))
+        recount(taxonomy, ids)
+
+
+def taxonomy_ids_for_video(video):
+    """Return {model: [ids]} of the categories and tags linked to a video"""
+    return {
+        taxonomy: list(through.objects.filter(video_id=video.pk).values_list(column, flat=True))
+        for taxonomy, through, column in _taxonomy_models()
+    }
+
+
+def recount_all():
+    """Rebuild the counts of every category and tag"""
+    return {taxonomy.__name__: recount(taxonomy) for taxonomy, _, _ in _taxonomy_models()}
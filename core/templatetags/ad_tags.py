@@ -1,3 +1,5 @@
+from collections.abc import Mapping
+
 from django import template
 
 register = template.Library()
@@ -6,7 +8,7 @@ register = template.Library()
 @register.filter
 def get_item(dictionary, key):
 	"""Get an item from a dictionary using a key"""
-	if dictionary and isinstance(dictionary, dict):
+	if dictionary and isinstance(dictionary, Mapping):
 		return dictionary.get(key, '')
 	return ''
 
@@ -14,7 +16,7 @@ def get_item(dictionary, key):
 @register.simple_tag
 def get_ad_script(ads_dict, ad_id):
 	"""Get ad script from ads dictionary by ad_id"""
-	if ads_dict and isinstance(ads_dict, dict):
+	if ads_dict and isinstance(ads_dict, Mapping):
 		return ads_dict.get(ad_id, '')
 	return ''
 
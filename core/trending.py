@@ -0,0 +1,72 @@
+"""
+Trending score for the popular listings.
+
+Views and likes are rolled up per video per hour into ``VideoHourlyStats``
+by the view counter (see core.counters). ``compute_trending_scores`` turns
+the rollup into a time-decayed score
+
+    score = sum((views + TRENDING_LIKE_WEIGHT * likes) * 0.5 ** (age_hours / half_life))
+
+over the last ``TRENDING_WINDOW_DAYS`` and writes it to ``Video.trending_score``,
+which is indexed together with ``is_active`` so the popular page and the
+video page sidebar read the top videos with an index scan. Videos with no
+recent activity score 0 and fall back to all-time views order.
+
+Run ``manage.py compute_trending`` periodically (or with ``--loop``).
+"""
+
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+# Ordering of the popular listings, matching video_active_trending_idx
+TRENDING_ORDERING = ('-trending_score', '-views', '-id')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def compute_trending_scores(now=None, batch_size=500):
+    """
+    Recompute every trending score from the hourly rollup and prune rollup
+    rows older than the window. Returns the number of videos with a score.
+    """
+    from core.models import Video, VideoHourlyStats
+
+    now = now or timezone.now()
+    half_life = _setting('TRENDING_HALF_LIFE_HOURS', 24)
+    like_weight = _setting('TRENDING_LIKE_WEIGHT', 5)
+    since = now - timedelta(days=_setting('TRENDING_WINDOW_DAYS', 7))
+    decay = math.log(2) / (half_life * 3600)
+
+    scores = defaultdict(float)
+    rows = VideoHourlyStats.objects.filter(hour__gte=since).values_list('video_id', 'hour', 'views', 'likes')
+    for video_id, hour, views, likes in rows.iterator(chunk_size=5000):
+        age = max(0.0, (now - hour).total_seconds())
+        scores[video_id] += (views + like_weight * likes) * math.exp(-decay * age)
+
+    with transaction.atomic():
+        # Videos that dropped out of the window lose their score
+        Video.objects.filter(trending_score__gt=0).exclude(pk__in=list(scores)).update(trending_score=0)
+        Video.objects.bulk_update(
+            [Video(pk=video_id, trending_score=round(score, 4)) for video_id, score in scores.items()],
+            ['trending_score'],
+            batch_size=batch_size,
+        )
+
+    VideoHourlyStats.objects.filter(hour__lt=since).delete()
+    return len(scores)
+
+
+def trending_videos(queryset=None):
+    """Active videos, most trending first"""
+    from core.models import Video
+
+    if queryset is None:
+        queryset = Video.objects.all()
+    return queryset.filter(is_active=True).order_by(*TRENDING_ORDERING)
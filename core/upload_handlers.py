@@ -0,0 +1,117 @@
+"""
+Streaming upload handler for video uploads.
+
+Django's default handlers keep uploads up to ``FILE_UPLOAD_MAX_MEMORY_SIZE``
+in memory. ``StreamingUploadHandler`` instead writes every file straight to
+a temporary file in ``UPLOAD_TEMP_DIR`` in 64KB pieces, hashing it with
+SHA-256 as it goes and aborting the request as soon as a file grows past
+its size limit, so an upload only ever holds one piece in memory. Because
+the temporary file shares a filesystem with ``MEDIA_ROOT``, saving it to a
+``FileField`` is a rename.
+
+Install it on a view with ``@stream_uploads(max_size)``; the view can then
+check ``upload_rejected(request)``.
+"""
+
+import hashlib
+import os
+import tempfile
+from functools import wraps
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+from django.template.defaultfilters import filesizeformat
+
+from core.uploads import upload_temp_dir
+
+
+class StreamedUploadedFile(UploadedFile):
+    """
+    An uploaded file streamed to disk, with the SHA-256 of its content. The
+    temporary file is removed when closed, unless it was moved away.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + ext, dir=upload_temp_dir('incoming'))
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = None
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Already moved into storage
+            pass
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    """Write uploaded files to disk as they arrive, within a size limit"""
+
+    chunk_size = 64 * 2**10
+
+    def __init__(self, request=None, max_file_size=None):
+        super().__init__(request)
+        self.max_file_size = max_file_size
+        self.hasher = None
+        self.received = 0
+
+    def reject(self, message):
+        """Stop storing the upload; the view finds the reason in upload_rejected()"""
+        if self.request is not None:
+            self.request._upload_rejected = message
+        # The parser closes (and so deletes) self.file, then reads and
+        # discards the rest of the body so the client receives the 413
+        # rather than a reset connection it would retry
+        raise StopUpload(connection_reset=False)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = StreamedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.max_file_size and self.received > self.max_file_size:
+            self.reject(f"{self.file_name} is too large, the limit is {filesizeformat(self.max_file_size)}")
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+def upload_rejected(request):
+    """Why the request's upload was aborted, or None. Parses the body."""
+    if request.method == 'POST':
+        request.FILES
+    return getattr(request, '_upload_rejected', None)
+
+
+def stream_uploads(max_file_size=None):
+    """
+    Decorator streaming the view's file uploads to disk with
+    StreamingUploadHandler. Apply it outside ``csrf_protect``: the CSRF
+    check reads POST, after which the handlers can't be changed.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            limit = max_file_size() if callable(max_file_size) else max_file_size
+            request.upload_handlers = [StreamingUploadHandler(request, limit)]
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
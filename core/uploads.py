@@ -0,0 +1,347 @@
+"""
+Resumable chunked uploads.
+
+Browsers upload videos in chunks. Each upload has an ``UploadSession``
+whose target file under ``UPLOAD_TEMP_DIR`` is preallocated to the full
+size when the first chunk arrives; every chunk is then written in place
+with ``os.pwrite`` at ``chunk_number * chunk_size``, so chunks may arrive
+in any order, in parallel, or again after a dropped connection. A bitmap
+on the session records which chunks are in; ``upload_status`` reports the
+missing byte ranges so a client can resume, and the request that delivers
+the last missing chunk completes the upload.
+
+The finished file is handed over to the media storage with a rename
+(``move_into_storage``) instead of being copied through ``ContentFile``.
+Keep ``UPLOAD_TEMP_DIR`` on the same filesystem as ``MEDIA_ROOT``; across
+filesystems the handoff falls back to a streamed in-kernel copy
+(``os.copy_file_range``, then ``os.sendfile``, then a small buffer).
+"""
+
+import errno
+import math
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.text import get_valid_filename
+
+# Bytes handed to the kernel per copy call, and the buffer size of the
+# userspace fallback
+COPY_BLOCK_SIZE = 8 * 1024 * 1024
+FALLBACK_BUFFER_SIZE = 1024 * 1024
+
+
+def max_chunk_size():
+    return getattr(settings, 'UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def max_video_size():
+    return getattr(settings, 'VIDEO_UPLOAD_MAX_SIZE', 300 * 1024 * 1024)
+
+
+def upload_temp_dir(*parts):
+    """Directory for in-progress uploads, created on demand"""
+    base = getattr(settings, 'UPLOAD_TEMP_DIR', None) or os.path.join(tempfile.gettempdir(), 'uploads')
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _copy_file_range(src_fd, dst_fd, count):
+    copied = 0
+    while copied < count:
+        sent = os.copy_file_range(src_fd, dst_fd, min(COPY_BLOCK_SIZE, count - copied))
+        if not sent:
+            break
+        copied += sent
+    return copied
+
+
+def _sendfile(src_fd, dst_fd, count):
+    copied = 0
+    while copied < count:
+        sent = os.sendfile(dst_fd, src_fd, copied, min(COPY_BLOCK_SIZE, count - copied))
+        if not sent:
+            break
+        copied += sent
+    return copied
+
+
+def _buffered_copy(src_fd, dst_fd, count):
+    copied = 0
+    buffer = bytearray(FALLBACK_BUFFER_SIZE)
+    view = memoryview(buffer)
+    while copied < count:
+        read = os.readv(src_fd, [buffer])
+        if not read:
+            break
+        written = 0
+        while written < read:
+            written += os.write(dst_fd, view[written:read])
+        copied += read
+    return copied
+
+
+# Tried in order; a strategy the platform or filesystem refuses is skipped
+_COPY_STRATEGIES = [
+    strategy for name, strategy in (
+        ('copy_file_range', _copy_file_range),
+        ('sendfile', _sendfile),
+    ) if hasattr(os, name)
+] + [_buffered_copy]
+
+_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def copy_file(dst_fd, src_path):
+    """
+    Copy the contents of ``src_path`` into the open descriptor ``dst_fd`` at
+    its current position. Returns the number of bytes copied.
+    """
+    src_fd = os.open(src_path, os.O_RDONLY)
+    try:
+        size = os.fstat(src_fd).st_size
+        start = os.lseek(dst_fd, 0, os.SEEK_CUR)
+        for strategy in _COPY_STRATEGIES:
+            try:
+                copied = strategy(src_fd, dst_fd, size)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED or strategy is _buffered_copy:
+                    raise
+                # Start over; the next strategy overwrites any partial copy
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                os.lseek(dst_fd, start, os.SEEK_SET)
+                continue
+            if copied != size:
+                raise IOError(f"Short copy from {src_path}: {copied} of {size} bytes")
+            return copied
+    finally:
+        os.close(src_fd)
+
+
+def move_file(src_path, dest_path):
+    """Rename ``src_path`` to ``dest_path``; copy then rename across filesystems"""
+    try:
+        os.replace(src_path, dest_path)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    # Copy next to the destination first so readers never see a partial file
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(dest_path), prefix='.partial-')
+    try:
+        copy_file(fd, src_path)
+        os.close(fd)
+        fd = None
+        os.replace(partial, dest_path)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.remove(src_path)
+
+
+def move_into_storage(src_path, name, storage=None, max_length=None, overwrite=False):
+    """
+    Move a local file into ``storage`` (default storage) as ``name`` and
+    return the name it was stored under. Unless ``overwrite`` is set, an
+    existing file is kept and an available name is picked, like
+    ``Storage.save`` does. Only filesystem storages are supported.
+    """
+    storage = storage or default_storage
+    dirname, basename = os.path.split(name)
+    name = os.path.join(dirname, get_valid_filename(basename))
+    os.makedirs(os.path.dirname(storage.path(name)), exist_ok=True)
+
+    if overwrite:
+        move_file(src_path, storage.path(name))
+        os.chmod(storage.path(name), settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+        return name
+
+    while True:
+        name = storage.get_available_name(name, max_length=max_length)
+        path = storage.path(name)
+        try:
+            # Claim the name so a concurrent upload can't pick it too
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            break
+        except FileExistsError:
+            continue
+    try:
+        move_file(src_path, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    os.chmod(path, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+    return name
+
+
+def store_field_file(instance, field_name, src_path, file_name):
+    """
+    Move an assembled upload into the storage of ``instance.<field_name>``
+    using the field's ``upload_to``, and point the field at it without
+    reading the file (the counterpart of ``FieldFile.save(..., save=False)``).
+    """
+    field_file = getattr(instance, field_name)
+    field = field_file.field
+    name = field.generate_filename(instance, file_name)
+    field_file.name = move_into_storage(src_path, name, storage=field.storage, max_length=field.max_length)
+    field_file._committed = True
+    return field_file.name
+
+
+class UploadError(Exception):
+    """A chunk that does not fit its upload session"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def session_file_path(session):
+    """Preallocated target file of an upload session"""
+    return os.path.join(upload_temp_dir('sessions'), get_valid_filename(session.upload_id))
+
+
+def _open_target(session):
+    """Open the session's target file, preallocating it on first use"""
+    fd = os.open(session_file_path(session), os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size != session.file_size:
+            try:
+                os.posix_fallocate(fd, 0, session.file_size)
+            except (AttributeError, OSError):
+                # Not supported by the platform or filesystem: size it sparsely
+                os.ftruncate(fd, session.file_size)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def get_upload_session(user, upload_id, purpose, file_name, file_size, total_chunks, chunk_size=None,
+                       chunk_number=None, chunk_length=None):
+    """
+    Return the session of ``upload_id``, creating it on the first chunk.
+    ``chunk_size`` may be omitted by clients that upload sequentially; it is
+    then taken from the length of a chunk that isn't the last one.
+    """
+    from core.models import UploadSession
+
+    if len(upload_id) > UploadSession._meta.get_field('upload_id').max_length:
+        raise UploadError('Upload id is too long')
+    session = UploadSession.objects.filter(upload_id=upload_id).first()
+    if session is None:
+        if not chunk_size:
+            if total_chunks == 1:
+                chunk_size = file_size
+            elif chunk_number is not None and chunk_number < total_chunks - 1 and chunk_length:
+                chunk_size = chunk_length
+            else:
+                raise UploadError('chunk_size is required')
+        if file_size <= 0 or total_chunks <= 0 or math.ceil(file_size / chunk_size) != total_chunks:
+            raise UploadError('file_size, chunk_size and total_chunks do not match')
+        if chunk_size > max_chunk_size():
+            raise UploadError('chunk_size is too large', status=413)
+        if purpose == 'video' and file_size > max_video_size():
+            raise UploadError('File is too large', status=413)
+        session, _ = UploadSession.objects.get_or_create(
+            upload_id=upload_id,
+            defaults={
+                'user': user,
+                'purpose': purpose,
+                'file_name': os.path.basename(file_name or 'video.mp4'),
+                'file_size': file_size,
+                'chunk_size': chunk_size,
+                'total_chunks': total_chunks,
+            },
+        )
+    if session.user_id != user.pk or session.purpose != purpose:
+        raise UploadError('Upload belongs to another user', status=403)
+    if session.file_size != file_size or session.total_chunks != total_chunks:
+        raise UploadError('Upload parameters changed, start a new upload', status=409)
+    return session
+
+
+def write_chunk(session, chunk_number, uploaded_file):
+    """
+    Write a chunk into place and mark it received. Returns True if this
+    request must complete the upload: every chunk is in and no other
+    request has started completing it. Resending a chunk is harmless.
+    """
+    from core.models import UploadSession
+
+    if not 0 <= chunk_number < session.total_chunks:
+        raise UploadError(f'Chunk {chunk_number} out of range')
+    start, end = session.chunk_range(chunk_number)
+    if uploaded_file.size != end - start:
+        raise UploadError(f'Chunk {chunk_number} must be {end - start} bytes, got {uploaded_file.size}')
+
+    if session.status in ('uploading', 'failed'):
+        fd = _open_target(session)
+        try:
+            if hasattr(uploaded_file, 'temporary_file_path'):
+                # Already on disk (see core.upload_handlers): copy in the kernel
+                os.lseek(fd, start, os.SEEK_SET)
+                copy_file(fd, uploaded_file.temporary_file_path())
+            else:
+                offset = start
+                for data in uploaded_file.chunks():
+                    view = memoryview(data)
+                    while view:
+                        written = os.pwrite(fd, view, offset)
+                        view = view[written:]
+                        offset += written
+        finally:
+            os.close(fd)
+
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if locked.mark_chunk(chunk_number):
+            locked.save(update_fields=['received', 'received_count', 'updated_at'])
+        completing = locked.is_complete and locked.status in ('uploading', 'failed')
+        if completing:
+            locked.status = 'assembling'
+            locked.save(update_fields=['status', 'updated_at'])
+    for field in ('received', 'received_count', 'status'):
+        setattr(session, field, getattr(locked, field))
+    return completing
+
+
+def finish_upload_session(session, status, **fields):
+    """Record the outcome of completing an upload"""
+    session.status = status
+    for field, value in fields.items():
+        setattr(session, field, value)
+    session.save(update_fields=['status', 'updated_at', *fields])
+
+
+def upload_status(session):
+    """What a client needs to resume an upload"""
+    return {
+        'upload_id': session.upload_id,
+        'status': session.status,
+        'file_name': session.file_name,
+        'file_size': session.file_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'received_chunks': session.received_count,
+        'offset': session.uploaded_offset(),
+        'missing_chunks': session.missing_chunks(),
+        'missing_ranges': session.missing_ranges(),
+        'video_id': session.video_id,
+        'filename': os.path.basename(session.stored_name) if session.stored_name else None,
+    }
+
+
+def discard_upload_session(session):
+    """Delete a session together with its target file"""
+    try:
+        os.remove(session_file_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
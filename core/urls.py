@@ -41,6 +41,7 @@ urlpatterns = [
 	
 	# Chunked Upload System
 	path('upload-chunk/', views.upload_chunk, name='upload_chunk'),
+	path('uploads/<str:upload_id>/', views.upload_session_status, name='upload_session_status'),
 	path('check-progress/', views.check_upload_progress, name='check_upload_progress'),
 	
 	# Media Library
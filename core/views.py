@@ -1,41 +1,37 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse
 from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 import json
+import logging
 import os
 import tempfile  
-import hashlib
 import mimetypes
 import shutil
-import cv2
-from PIL import Image
-import io
-from io import BytesIO
 from django.core.files.base import ContentFile
-from contextlib import contextmanager
-from .models import Category, Tag, Video, CMS, Settings, AgeVerification, User, Comment, Ad, DMCAReport
+from .models import Category, Tag, Video, CMS, Settings, AgeVerification, User, Comment, Ad, DMCAReport, VideoDailyStats, UploadSession
 from .forms import CategoryForm, TagForm, VideoForm, CMSForm, SettingsForm, AgeVerificationForm, AdForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login as auth_login
 from .analytics_service import ga_service
+from .ads import ad_registry
+from .playback import playback_summary
+from .uploads import (
+	UploadError, get_upload_session, write_chunk, finish_upload_session, upload_status,
+	session_file_path, move_file, max_chunk_size, max_video_size,
+)
+from .media_assets import store_video_file, store_library_file, sync_asset, forget_asset, library_assets, library_scanner
+from .upload_handlers import stream_uploads, upload_rejected
+from . import jobs, library_thumbnails
 from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from datetime import timedelta
 
-
-@contextmanager
-def without_thumbnail_signal():
-    """Context manager to temporarily disable thumbnail generation signal"""
-    from django.db.models.signals import post_save
-    from .signals import generate_video_thumbnail
-    post_save.disconnect(generate_video_thumbnail, sender=Video)
-    try:
-        yield
-    finally:
-        post_save.connect(generate_video_thumbnail, sender=Video)
+logger = logging.getLogger(__name__)
 
 
 def login(request):
@@ -135,6 +131,9 @@ def dashboard(request):
 	pending_dmca_reports = DMCAReport.objects.filter(status='pending').count()
 	recent_dmca_reports = DMCAReport.objects.order_by('-created_at')[:5]
 	
+	# Background media processing queue
+	media_jobs = jobs.job_stats()
+	
 	context = {
 		'total_videos': total_videos,
 		'total_categories': total_categories,
@@ -166,6 +165,8 @@ def dashboard(request):
 		'total_dmca_reports': total_dmca_reports,
 		'pending_dmca_reports': pending_dmca_reports,
 		'recent_dmca_reports': recent_dmca_reports,
+		# Media processing jobs
+		'media_jobs': media_jobs,
 	}
 	return render(request, 'core/dashboard.html', context)
 
@@ -276,8 +277,14 @@ def video_list(request):
 	return render(request, 'core/video_list.html', {"videos": videos})
 
 
+@csrf_exempt
+@stream_uploads(max_video_size)
+@csrf_protect
 @login_required(login_url='login')
 def video_create(request):
+	if request.method == "POST" and upload_rejected(request):
+		messages.error(request, upload_rejected(request))
+		return redirect('video_create')
 	if request.method == "POST":
 		# Check if this is a media library selection
 		selected_filename = request.POST.get('selected_filename')
@@ -355,18 +362,8 @@ def video_create(request):
 				# Set the video file
 				video.video_file.name = f'videos/{selected_filename}'
 				
-				# Check if thumbnail provided and use context manager if so
-				has_thumbnail = bool(video.thumbnail)
-				print(f"DEBUG: About to save video with thumbnail (media library): {has_thumbnail}")
-				
-				if has_thumbnail:
-					print("DEBUG: Using context manager to disable signal (media library)...")
-					with without_thumbnail_signal():
-						video.save()
-				else:
-					video.save()
-				
-				print(f"DEBUG: Video saved (media library). Thumbnail after save: {bool(video.thumbnail)}")
+				# A provided thumbnail is kept; the media probe only fills in a missing one
+				video.save()
 				
 				# Debug: Check thumbnail after save (media library)
 				print(f"DEBUG: Thumbnail after save (media library): {video.thumbnail}")
@@ -409,18 +406,8 @@ def video_create(request):
 					
 					# Publishing options are handled by the form's save() method
 					
-					# Check if thumbnail provided and use context manager if so
-					has_thumbnail = bool(video.thumbnail)
-					print(f"DEBUG: About to save video with thumbnail: {has_thumbnail}")
-					
-					if has_thumbnail:
-						print("DEBUG: Using context manager to disable signal...")
-						with without_thumbnail_signal():
-							video.save()
-					else:
-						video.save()
-					
-					print(f"DEBUG: Video saved. Thumbnail after save: {bool(video.thumbnail)}")
+					# A provided thumbnail is kept; the media probe only fills in a missing one
+					video.save()
 					
 					form.save_m2m()
 					
@@ -449,6 +436,9 @@ def video_create(request):
 	return render(request, 'core/video_form_chunked.html', {"form": form, "title": "Create Video"})
 
 
+@csrf_exempt
+@stream_uploads(max_video_size)
+@csrf_protect
 @login_required(login_url='login')
 def video_update(request, pk: int):
 	video = get_object_or_404(Video, pk=pk)
@@ -458,6 +448,9 @@ def video_update(request, pk: int):
 		messages.error(request, "You don't have permission to edit this video.")
 		return redirect('video_list')
 	
+	if request.method == "POST" and upload_rejected(request):
+		messages.error(request, upload_rejected(request))
+		return redirect('video_update', pk=pk)
 	if request.method == "POST":
 		form = VideoForm(request.POST, request.FILES, instance=video)
 		if form.is_valid():
@@ -525,135 +518,153 @@ def video_toggle_status(request, pk: int):
 @csrf_exempt
 @login_required(login_url='login')
 @require_http_methods(["POST"])
+@stream_uploads(max_chunk_size)
 def upload_chunk(request):
-	"""Handle chunked video uploads"""
+	"""Handle chunked video uploads (resumable, chunks in any order)"""
+	if upload_rejected(request):
+		return JsonResponse({'error': upload_rejected(request)}, status=413)
+	
 	try:
 		# Get upload parameters
 		chunk_number = int(request.POST.get('chunk_number', 0))
 		total_chunks = int(request.POST.get('total_chunks', 1))
+		chunk_size = int(request.POST.get('chunk_size') or 0)
 		file_id = request.POST.get('file_id')
 		file_name = request.POST.get('file_name')
 		file_size = int(request.POST.get('file_size', 0))
 		
-		# Debug: Check what files are being received
-		print(f"DEBUG: Chunked upload - FILES received: {list(request.FILES.keys())}")
-		print(f"DEBUG: Chunked upload - POST data: {list(request.POST.keys())}")
-		
 		if not file_id or 'chunk' not in request.FILES:
 			return JsonResponse({'error': 'Missing file data'}, status=400)
 		
-		# Create temporary directory for chunks
-		temp_dir = os.path.join(tempfile.gettempdir(), 'video_chunks', file_id)
-		os.makedirs(temp_dir, exist_ok=True)
-		
-		# Save chunk
-		chunk_file = os.path.join(temp_dir, f'chunk_{chunk_number}')
-		with open(chunk_file, 'wb') as f:
-			for chunk in request.FILES['chunk'].chunks():
-				f.write(chunk)
+		chunk = request.FILES['chunk']
+		session = get_upload_session(
+			request.user, file_id, 'video', file_name, file_size, total_chunks, chunk_size,
+			chunk_number=chunk_number, chunk_length=chunk.size,
+		)
 		
-		# Check if all chunks are uploaded
-		if chunk_number == total_chunks - 1:
-			# Reassemble file
-			final_file_path = os.path.join(temp_dir, 'final_video.mp4')
-			with open(final_file_path, 'wb') as final_file:
-				for i in range(total_chunks):
-					chunk_path = os.path.join(temp_dir, f'chunk_{i}')
-					if os.path.exists(chunk_path):
-						with open(chunk_path, 'rb') as chunk_file:
-							final_file.write(chunk_file.read())
-						os.remove(chunk_path)  # Clean up chunk
-			
-			# Get publishing options
-			publish_option = request.POST.get('publish_option', 'publish_now')
-			scheduled_publish_at = request.POST.get('scheduled_publish_at')
-			
-			# Handle publishing options
-			is_active = True
-			scheduled_time = None
-			
-			if publish_option == 'publish_now':
-				is_active = True
-				scheduled_time = None
-			elif publish_option == 'draft':
-				is_active = False
-				scheduled_time = None
-			elif publish_option == 'schedule' and scheduled_publish_at:
-				is_active = False
-				# Convert Nepal time to UTC for storage
-				import pytz
-				from datetime import datetime
-				nepal_tz = pytz.timezone('Asia/Kathmandu')
-				scheduled_datetime = datetime.strptime(scheduled_publish_at, '%Y-%m-%dT%H:%M')
-				nepal_time = nepal_tz.localize(scheduled_datetime)
-				scheduled_time = nepal_time.astimezone(pytz.UTC)
-			
-			# Create Video object with the reassembled file
-			video = Video(
-				title=request.POST.get('title', 'Untitled Video'),
-				slug=request.POST.get('slug', 'untitled-video'),
-				description=request.POST.get('description', ''),
-				uploader=request.user,
-				seo_title=request.POST.get('seo_title', ''),
-				seo_description=request.POST.get('seo_description', ''),
-				is_active=is_active,
-				scheduled_publish_at=scheduled_time
-			)
-			
-			# Save the reassembled file
-			with open(final_file_path, 'rb') as f:
-				video.video_file.save(file_name, ContentFile(f.read()), save=False)
-			
-			# Handle thumbnail if provided
-			if 'thumbnail' in request.FILES:
-				video.thumbnail = request.FILES['thumbnail']
-				print(f"DEBUG: Thumbnail file provided in chunked upload: {request.FILES['thumbnail']}")
-			
-			# Check if thumbnail provided and use context manager if so
-			has_thumbnail = bool(video.thumbnail)
-			print(f"DEBUG: About to save video with thumbnail (chunked upload): {has_thumbnail}")
-			
-			if has_thumbnail:
-				print("DEBUG: Using context manager to disable signal (chunked upload)...")
-				with without_thumbnail_signal():
-					video.save()
-			else:
-				video.save()
-			
-			print(f"DEBUG: Video saved (chunked upload). Thumbnail after save: {bool(video.thumbnail)}")
-			
-			# Handle categories and tags
-			category_ids = request.POST.getlist('categories')
-			tag_ids = request.POST.getlist('tags')
-			
-			if category_ids:
-				video.category.set(category_ids)
-			if tag_ids:
-				video.tags.set(tag_ids)
-			
-			
-			# Clean up temporary directory
-			import shutil
-			shutil.rmtree(temp_dir, ignore_errors=True)
-			
+		# Write the chunk into place; only the request that delivers the last
+		# missing chunk goes on to create the video
+		if not write_chunk(session, chunk_number, chunk):
+			if session.status == 'complete':
+				return JsonResponse({
+					'status': 'complete',
+					'video_id': session.video_id,
+					'message': 'Video uploaded successfully!'
+				})
 			return JsonResponse({
-				'status': 'complete',
-				'video_id': video.id,
-				'message': 'Video uploaded successfully!'
+				'status': 'chunk_received',
+				'chunk_number': chunk_number,
+				'total_chunks': total_chunks,
+				'received_chunks': session.received_count
 			})
 		
+		try:
+			video = _create_uploaded_video(request, session)
+		except Exception:
+			finish_upload_session(session, 'failed')
+			raise
+		finish_upload_session(session, 'complete', video=video)
+		
 		return JsonResponse({
-			'status': 'chunk_received',
-			'chunk_number': chunk_number,
-			'total_chunks': total_chunks
+			'status': 'complete',
+			'video_id': video.id,
+			'message': 'Video uploaded successfully!'
 		})
 		
+	except UploadError as e:
+		return JsonResponse({'error': str(e)}, status=e.status)
 	except Exception as e:
 		return JsonResponse({
 			'error': str(e)
 		}, status=500)
 
 
+def _create_uploaded_video(request, session):
+	"""Create the Video of a completed upload session from the form fields"""
+	# Get publishing options
+	publish_option = request.POST.get('publish_option', 'publish_now')
+	scheduled_publish_at = request.POST.get('scheduled_publish_at')
+	
+	# Handle publishing options
+	is_active = True
+	scheduled_time = None
+	
+	if publish_option == 'publish_now':
+		is_active = True
+		scheduled_time = None
+	elif publish_option == 'draft':
+		is_active = False
+		scheduled_time = None
+	elif publish_option == 'schedule' and scheduled_publish_at:
+		is_active = False
+		# Convert Nepal time to UTC for storage
+		import pytz
+		from datetime import datetime
+		nepal_tz = pytz.timezone('Asia/Kathmandu')
+		scheduled_datetime = datetime.strptime(scheduled_publish_at, '%Y-%m-%dT%H:%M')
+		nepal_time = nepal_tz.localize(scheduled_datetime)
+		scheduled_time = nepal_time.astimezone(pytz.UTC)
+	
+	# Create Video object with the uploaded file
+	video = Video(
+		title=request.POST.get('title', 'Untitled Video'),
+		slug=request.POST.get('slug', 'untitled-video'),
+		description=request.POST.get('description', ''),
+		uploader=request.user,
+		seo_title=request.POST.get('seo_title', ''),
+		seo_description=request.POST.get('seo_description', ''),
+		is_active=is_active,
+		scheduled_publish_at=scheduled_time
+	)
+	
+	# Hand the uploaded file over to storage with a rename, or link to an
+	# identical file that is already stored
+	linked = store_video_file(video, session_file_path(session), session.file_name)
+	
+	# Handle thumbnail if provided
+	if 'thumbnail' in request.FILES:
+		video.thumbnail = request.FILES['thumbnail']
+	
+	# A provided thumbnail is kept; the media probe only fills in a missing one
+	try:
+		video.save()
+	except Exception:
+		# Put the file back so the upload can be completed again
+		if not linked:
+			move_file(video.video_file.path, session_file_path(session))
+		raise
+	if linked:
+		os.remove(session_file_path(session))
+	
+	# Handle categories and tags
+	category_ids = request.POST.getlist('categories')
+	tag_ids = request.POST.getlist('tags')
+	
+	if category_ids:
+		video.category.set(category_ids)
+	if tag_ids:
+		video.tags.set(tag_ids)
+	
+	return video
+
+
+@login_required(login_url='login')
+@require_http_methods(["GET", "HEAD"])
+def upload_session_status(request, upload_id):
+	"""Received and missing parts of a resumable upload"""
+	session = UploadSession.objects.filter(upload_id=upload_id, user=request.user).first()
+	if session is None:
+		return JsonResponse({'error': 'Upload not found'}, status=404)
+	
+	status = upload_status(session)
+	response = JsonResponse(status)
+	# tus-style headers, enough for a HEAD request to resume from
+	response['Upload-Offset'] = status['offset']
+	response['Upload-Length'] = session.file_size
+	response['Cache-Control'] = 'no-store'
+	return response
+
+
 @csrf_exempt
 @login_required(login_url='login')
 @require_http_methods(["POST"])
@@ -664,13 +675,12 @@ def check_upload_progress(request):
 		if not file_id:
 			return JsonResponse({'error': 'File ID required'}, status=400)
 		
-		temp_dir = os.path.join(tempfile.gettempdir(), 'video_chunks', file_id)
-		if not os.path.exists(temp_dir):
+		session = UploadSession.objects.filter(upload_id=file_id, user=request.user).first()
+		if session is None:
 			return JsonResponse({'progress': 0, 'status': 'not_started'})
 		
 		# Count uploaded chunks
-		chunk_files = [f for f in os.listdir(temp_dir) if f.startswith('chunk_')]
-		progress = len(chunk_files)
+		progress = session.received_count
 		
 		return JsonResponse({
 			'progress': progress,
@@ -682,6 +692,19 @@ def check_upload_progress(request):
 
 
 # Media Library Views
+# ?sort= values of the library listings
+MEDIA_LIBRARY_SORTS = {
+	'name': ('file',),
+	'-name': ('-file',),
+	'size': ('size', 'file'),
+	'-size': ('-size', 'file'),
+	'date': ('mtime', 'file'),
+	'-date': ('-mtime', 'file'),
+	'duration': ('duration', 'file'),
+	'-duration': ('-duration', 'file'),
+}
+
+
 @login_required(login_url='login')
 def media_library(request):
 	"""List all videos in media/videos folder"""
@@ -690,35 +713,19 @@ def media_library(request):
 		messages.error(request, "You don't have permission to access the media library.")
 		return redirect('dashboard')
 	
-	from django.conf import settings
+	# Pick up files copied in behind the index's back
+	library_scanner.request_scan()
 	
-	media_videos_dir = os.path.join(settings.MEDIA_ROOT, 'videos')
-	videos = []
-	
-	if os.path.exists(media_videos_dir):
-		for filename in os.listdir(media_videos_dir):
-			file_path = os.path.join(media_videos_dir, filename)
-			if os.path.isfile(file_path):
-				# Check if it's a video file
-				mime_type, _ = mimetypes.guess_type(file_path)
-				if mime_type and mime_type.startswith('video/'):
-					file_size = os.path.getsize(file_path)
-					file_size_mb = round(file_size / (1024 * 1024), 2)
-					
-					from urllib.parse import quote
-					videos.append({
-						'filename': filename,
-						'file_path': file_path,
-						'file_size': file_size_mb,
-						'duration': 0,
-						'url': f"{settings.MEDIA_URL}videos/{quote(filename)}"
-					})
-	
-	# Sort by filename
-	videos.sort(key=lambda x: x['filename'])
+	from django.core.paginator import Paginator
+	
+	sort = request.GET.get('sort', 'name')
+	paginator = Paginator(library_assets().order_by(*MEDIA_LIBRARY_SORTS.get(sort, ('file',))), 48)
+	page_obj = paginator.get_page(request.GET.get('page'))
 	
 	context = {
-		'videos': videos,
+		'videos': page_obj,
+		'page_obj': page_obj,
+		'sort': sort if sort in MEDIA_LIBRARY_SORTS else 'name',
 	}
 	return render(request, 'core/media_library.html', context)
 
@@ -742,97 +749,101 @@ def media_library_api(request):
 	referer = request.META.get('HTTP_REFERER', '')
 	is_video_form = 'video' in referer and ('create' in referer or 'edit' in referer)
 	
-	from django.conf import settings
+	from django.core.paginator import Paginator
 	
-	media_videos_dir = os.path.join(settings.MEDIA_ROOT, 'videos')
-	videos = []
-	
-	if os.path.exists(media_videos_dir):
-		for filename in os.listdir(media_videos_dir):
-			file_path = os.path.join(media_videos_dir, filename)
-			if os.path.isfile(file_path):
-				# Check if it's a video file
-				mime_type, _ = mimetypes.guess_type(file_path)
-				if mime_type and mime_type.startswith('video/'):
-					file_size = os.path.getsize(file_path)
-					file_size_mb = round(file_size / (1024 * 1024), 2)
-					
-					from urllib.parse import quote
-					videos.append({
-						'filename': filename,
-						'file_size': file_size_mb,
-						'duration': 0,
-						'url': f"{settings.MEDIA_URL}videos/{quote(filename)}"
-					})
+	library_scanner.request_scan()
 	
-	# Sort by filename
-	videos.sort(key=lambda x: x['filename'])
+	sort = request.GET.get('sort', 'name')
+	try:
+		per_page = min(max(int(request.GET.get('per_page', 100)), 1), 500)
+	except ValueError:
+		per_page = 100
+	paginator = Paginator(library_assets().order_by(*MEDIA_LIBRARY_SORTS.get(sort, ('file',))), per_page)
+	page_obj = paginator.get_page(request.GET.get('page'))
+	
+	videos = [{
+		'filename': asset.filename,
+		'file_size': asset.size_mb,
+		'duration': asset.duration,
+		'resolution': asset.resolution,
+		'codec': asset.codec,
+		'url': asset.url,
+	} for asset in page_obj]
 	
-	return JsonResponse({'videos': videos})
+	return JsonResponse({
+		'videos': videos,
+		'page': page_obj.number,
+		'num_pages': paginator.num_pages,
+		'total': paginator.count,
+		'has_next': page_obj.has_next(),
+	})
 
 
 @csrf_exempt
 @login_required(login_url='login')
 @require_http_methods(["POST"])
+@stream_uploads(max_chunk_size)
 def media_library_upload(request):
 	"""Upload video directly to media/videos folder"""
 	# Only superusers can access media library
 	if not request.user.is_superuser:
 		return JsonResponse({'error': 'Permission denied'}, status=403)
-	
-	from django.conf import settings
+	if upload_rejected(request):
+		return JsonResponse({'error': upload_rejected(request)}, status=413)
 	
 	try:
 		file_id = request.POST.get('file_id')
 		chunk_number = int(request.POST.get('chunk_number', 0))
 		total_chunks = int(request.POST.get('total_chunks', 1))
+		chunk_size = int(request.POST.get('chunk_size') or 0)
 		file_name = request.POST.get('file_name', 'video.mp4')
 		file_size = int(request.POST.get('file_size', 0))
 		
-		# Create temp directory for this upload
-		temp_dir = os.path.join(tempfile.gettempdir(), 'media_uploads', file_id)
-		os.makedirs(temp_dir, exist_ok=True)
+		if not file_id or 'chunk' not in request.FILES:
+			return JsonResponse({'error': 'Missing file data'}, status=400)
 		
-		# Save chunk
-		chunk_path = os.path.join(temp_dir, f'chunk_{chunk_number}')
-		with open(chunk_path, 'wb') as f:
-			for chunk in request.FILES['chunk'].chunks():
-				f.write(chunk)
+		chunk = request.FILES['chunk']
+		session = get_upload_session(
+			request.user, file_id, 'media_library', file_name, file_size, total_chunks, chunk_size,
+			chunk_number=chunk_number, chunk_length=chunk.size,
+		)
 		
-		# Check if all chunks are uploaded
-		if chunk_number == total_chunks - 1:
-			# Reassemble file
-			final_file_path = os.path.join(temp_dir, 'final_video.mp4')
-			with open(final_file_path, 'wb') as final_file:
-				for i in range(total_chunks):
-					chunk_path = os.path.join(temp_dir, f'chunk_{i}')
-					if os.path.exists(chunk_path):
-						with open(chunk_path, 'rb') as chunk_file:
-							final_file.write(chunk_file.read())
-						os.remove(chunk_path)  # Clean up chunk
-			
-			# Move to media/videos directory
-			media_videos_dir = os.path.join(settings.MEDIA_ROOT, 'videos')
-			os.makedirs(media_videos_dir, exist_ok=True)
-			
-			final_destination = os.path.join(media_videos_dir, file_name)
-			shutil.move(final_file_path, final_destination)
-			
-			# Clean up temporary directory
-			shutil.rmtree(temp_dir, ignore_errors=True)
-			
+		duplicate = False
+		if write_chunk(session, chunk_number, chunk):
+			# Move to media/videos directory (replacing a file of the same name),
+			# unless the library already has this content
+			try:
+				stored_name, duplicate = store_library_file(session_file_path(session), session.file_name)
+			except Exception:
+				finish_upload_session(session, 'failed')
+				raise
+			finish_upload_session(session, 'complete', stored_name=stored_name)
+			try:
+				sync_asset(stored_name)
+			except Exception as e:
+				# The background scan indexes it later
+				logger.warning(f"Error indexing {stored_name}: {e}")
+		
+		if session.status == 'complete':
 			return JsonResponse({
 				'status': 'complete',
-				'message': 'Video uploaded to media library successfully!',
-				'filename': file_name
+				'message': (
+					'This video is already in the media library.' if duplicate
+					else 'Video uploaded to media library successfully!'
+				),
+				'filename': os.path.basename(session.stored_name),
+				'duplicate': duplicate
 			})
 		
 		return JsonResponse({
 			'status': 'chunk_received',
 			'chunk_number': chunk_number,
-			'total_chunks': total_chunks
+			'total_chunks': total_chunks,
+			'received_chunks': session.received_count
 		})
 		
+	except UploadError as e:
+		return JsonResponse({'error': str(e)}, status=e.status)
 	except Exception as e:
 		return JsonResponse({
 			'error': str(e)
@@ -855,10 +866,14 @@ def media_library_delete(request):
 		if not filename:
 			return JsonResponse({'error': 'Filename required'}, status=400)
 		
+		if os.path.basename(filename) != filename:
+			return JsonResponse({'error': 'Invalid filename'}, status=400)
+		
 		file_path = os.path.join(settings.MEDIA_ROOT, 'videos', filename)
 		
 		if os.path.exists(file_path):
 			os.remove(file_path)
+			forget_asset(f'videos/{filename}')
 			return JsonResponse({
 				'status': 'success',
 				'message': f'Video {filename} deleted successfully!'
@@ -883,57 +898,29 @@ def media_library_thumbnail(request, filename):
 	if not request.user.is_superuser:
 		return HttpResponse('Permission denied', status=403)
 	
-	from django.conf import settings
+	source = library_thumbnails.library_file_path(filename)
+	if source is None:
+		return HttpResponse('File not found', status=404)
 	
 	try:
-		file_path = os.path.join(settings.MEDIA_ROOT, 'videos', filename)
-		
-		if not os.path.exists(file_path):
-			return HttpResponse('File not found', status=404)
-		
-		# Generate thumbnail using OpenCV
-		cap = cv2.VideoCapture(file_path)
-		if not cap.isOpened():
-			return HttpResponse('Cannot open video', status=400)
-		
-		# Get frame at 10% of video duration
-		total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-		frame_number = int(total_frames * 0.1)
-		cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-		
-		ret, frame = cap.read()
-		cap.release()
-		
-		if not ret:
-			return HttpResponse('Cannot read frame', status=400)
-		
-		# Convert BGR to RGB
-		frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-		
-		# Resize to thumbnail size
-		height, width = frame_rgb.shape[:2]
-		max_size = 300
-		if width > height:
-			new_width = max_size
-			new_height = int((height * max_size) / width)
+		# Cached per (filename, size, mtime); the cache key is the ETag
+		fmt = library_thumbnails.negotiate_format(request)
+		stat = os.stat(source)
+		etag = f'"{library_thumbnails.thumbnail_key(filename, stat, fmt)}"'
+		if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+			response = HttpResponse(status=304)
 		else:
-			new_height = max_size
-			new_width = int((width * max_size) / height)
-		
-		frame_resized = cv2.resize(frame_rgb, (new_width, new_height))
-		
-		# Convert to PIL Image
-		pil_image = Image.fromarray(frame_resized)
-		
-		# Save to BytesIO
-		img_io = io.BytesIO()
-		pil_image.save(img_io, format='JPEG', quality=85)
-		img_io.seek(0)
-		
-		response = HttpResponse(img_io.getvalue(), content_type='image/jpeg')
-		response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
+			thumbnail_path, _ = library_thumbnails.get_thumbnail(filename, fmt, stat)
+			response = FileResponse(open(thumbnail_path, 'rb'), content_type=library_thumbnails.FORMATS[fmt][1])
+		response['ETag'] = etag
+		response['Cache-Control'] = 'private, max-age=86400'
+		patch_vary_headers(response, ['Accept'])
 		return response
 		
+	except FileNotFoundError:
+		return HttpResponse('File not found', status=404)
+	except library_thumbnails.ThumbnailError:
+		return HttpResponse('Cannot read frame', status=400)
 	except Exception as e:
 		return HttpResponse(f'Error generating thumbnail: {str(e)}', status=500)
 
@@ -1359,66 +1346,33 @@ def video_analytics_api(request, video_id):
 		if end_date:
 			end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
 		else:
-			end_date = timezone.now().date()
+			end_date = timezone.localdate()
 		
 		# Get video analytics data
 		views_over_time = []
 		recent_comments = []
 		
-		# Generate realistic views over time data for the specified date range
-		# Based on video creation date and current metrics
-		import random
+		# Nothing to show before the video existed
+		start_date = max(start_date, timezone.localtime(video.created_at).date())
+		total_days = (end_date - start_date).days + 1
 		
-		# Calculate days in the date range
-		date_range_days = (end_date - start_date).days + 1
-		total_days = min(date_range_days, (timezone.now().date() - video.created_at.date()).days + 1)
-		
-		# Generate realistic view progression
-		if total_days > 0:
-			# Distribute views across days with some realistic patterns
-			remaining_views = video.views
-			base_views_per_day = max(1, video.views // total_days) if total_days > 0 else 0
-			
-			for i in range(total_days):
-				date = end_date - timedelta(days=i)
-				
-				# Create realistic patterns:
-				# - Higher views in first few days (viral effect)
-				# - Some random variation
-				# - Gradual decline over time
-				if i < 3:  # First 3 days - higher activity
-					multiplier = 1.5 + (random.random() * 0.5)  # 1.5-2.0x
-				elif i < 7:  # First week - moderate activity
-					multiplier = 1.0 + (random.random() * 0.3)  # 1.0-1.3x
-				else:  # After first week - declining
-					multiplier = max(0.1, 1.0 - (i * 0.05) + (random.random() * 0.2))  # Declining with variation
-				
-				# Calculate views for this day
-				day_views = max(0, int(base_views_per_day * multiplier))
-				
-				# Ensure we don't exceed total views
-				day_views = min(day_views, remaining_views)
-				remaining_views = max(0, remaining_views - day_views)
-				
-				views_over_time.append({
-					'date': date.strftime('%Y-%m-%d'),
-					'views': day_views
-				})
-			
-			# If we have remaining views, distribute them randomly
-			if remaining_views > 0:
-				for i in range(min(remaining_views, len(views_over_time))):
-					views_over_time[i]['views'] += 1
-		else:
-			# Video created today
+		# Daily rollup for the range in one indexed query, zero-filled
+		daily_stats = {
+			row['date']: row
+			for row in VideoDailyStats.objects.filter(
+				video=video, date__range=(start_date, end_date)
+			).values('date', 'views', 'likes', 'comments')
+		}
+		for i in range(max(0, total_days)):
+			date = start_date + timedelta(days=i)
+			day = daily_stats.get(date, {})
 			views_over_time.append({
-				'date': timezone.now().date().strftime('%Y-%m-%d'),
-				'views': video.views
+				'date': date.strftime('%Y-%m-%d'),
+				'views': day.get('views', 0),
+				'likes': day.get('likes', 0),
+				'comments': day.get('comments', 0),
 			})
 		
-		# Reverse to show chronological order (oldest first)
-		views_over_time.reverse()
-		
 		# Get recent comments within date range
 		comments = video.comments.filter(
 			created_at__date__gte=start_date,
@@ -1435,7 +1389,8 @@ def video_analytics_api(request, video_id):
 		engagement_rate = (video.likes / video.views * 100) if video.views > 0 else 0
 		
 		# Calculate additional metrics
-		avg_views_per_day = video.views / max(1, total_days) if total_days > 0 else 0
+		range_views = sum(day['views'] for day in views_over_time)
+		avg_views_per_day = range_views / total_days if total_days > 0 else 0
 		peak_day_views = max([day['views'] for day in views_over_time]) if views_over_time else 0
 		
 		video_data = {
@@ -1451,6 +1406,7 @@ def video_analytics_api(request, video_id):
 			'avg_views_per_day': round(avg_views_per_day, 1),
 			'peak_day_views': peak_day_views,
 			'views_over_time': views_over_time,
+			'playback': playback_summary(video),
 			'recent_comments': recent_comments,
 			'date_range': {
 				'start_date': start_date.isoformat(),
@@ -1508,7 +1464,7 @@ def user_analytics_api(request, user_id):
 		if end_date:
 			end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
 		else:
-			end_date = timezone.now().date()
+			end_date = timezone.localdate()
 		
 		# Get user
 		user = User.objects.get(id=user_id)
@@ -1632,6 +1588,7 @@ def ad_list(request):
 	ads = Ad.objects.all()
 	context = {
 		'ads': ads,
+		'ad_registry': ad_registry.current(),
 	}
 	return render(request, 'core/ad_list.html', context)
 